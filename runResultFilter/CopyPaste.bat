@@ -2,5 +2,5 @@
 REM Map the network drive (replace \\server\share with your UNC path, and Z: with your preferred drive letter)
 net use U:\\gar.corp.intel.com\ec\proj\mdl\pg\intel\engineering\dev\team_client_cmv\users\Hs\script\Process-Improvement\runResultFilter /persistent:yes
 
-REM Run the Python script (replace U:\folder\your_script.py with the full path on the mapped drive)
-python U:\users\Hs\script\Process-Improvement\runResultFilter\filterfx_pilot_release.py
\ No newline at end of file
+REM Run every enabled product profile of filterfx_profiles.json in one job (add --profile NAME to run only one)
+python U:\users\Hs\script\Process-Improvement\runResultFilter\filterfx_engine.py
\ No newline at end of file
@@ -0,0 +1,285 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import builtins
+import tempfile
+import statistics
+import threading
+from contextlib import contextmanager
+import host_scan
+from scan_walker import make_scan_rules, iter_scan_targets
+from host_scan import get_latest_timestamp_folder, scan_hosts, merge_host_results
+from scan_index import ScanIndex
+from work_plan import build_work_plan
+from copy_engine import configure_copy_engine, copy_with_timeout
+from synthetic_tree import PRODUCT_PATH, generate_tree
+from pipeline import CopyFeed
+
+PHASES = ("walk", "latest", "scan", "rescan_indexed", "select", "copy", "scan_copy_pipelined")
+
+
+class _CountedEntry:
+    """os.DirEntry stand-in that reports is_dir, is_file and stat calls to a LatencyInjector."""
+
+    def __init__(self, entry, injector):
+        self._entry = entry
+        self._injector = injector
+        self._stat_fetched = False
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_dir(self, *args, **kwargs):
+        self._injector.record("entry_is_dir", delay=False)
+        return self._entry.is_dir(*args, **kwargs)
+
+    def is_file(self, *args, **kwargs):
+        self._injector.record("entry_is_file", delay=False)
+        return self._entry.is_file(*args, **kwargs)
+
+    def stat(self, *args, **kwargs):
+        # Only the first stat can be a round trip (DirEntry caches it), and only off
+        # Windows, where the listing does not already carry the stat data
+        self._injector.record("entry_stat", delay=not self._stat_fetched and os.name != "nt")
+        self._stat_fetched = True
+        return self._entry.stat(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def __fspath__(self):
+        return self.path
+
+
+class _CountedScandir:
+    """os.scandir iterator whose entries are _CountedEntry objects."""
+
+    def __init__(self, iterator, injector):
+        self._iterator = iterator
+        self._injector = injector
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return _CountedEntry(next(self._iterator), self._injector)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._iterator.close()
+
+
+class LatencyInjector:
+    """Adds a fixed delay to every filesystem call on paths under root, to mimic SMB round trips.
+
+    os.scandir, os.listdir, os.stat (and so os.path.isdir/getmtime) and open are wrapped
+    while the injector is active; calls elsewhere are untouched. The DirEntry objects of a
+    wrapped scandir count their is_dir, is_file and stat calls too, so a cache that moves
+    work onto the entries is not credited with calls it still makes; only an entry's first
+    stat off Windows is delayed, the others are answered from the listing. Calls are counted
+    per function so phases can be compared by round trips as well as by time.
+    """
+
+    def __init__(self, root, seconds):
+        self.root = os.path.abspath(root)
+        self.seconds = seconds
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def record(self, name, delay=True):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if delay and self.seconds:
+            time.sleep(self.seconds)
+
+    def _wrap(self, name, function, wrap_result=None):
+        def wrapped(path=".", *args, **kwargs):
+            if isinstance(path, (str, os.PathLike)) and os.path.abspath(os.fspath(path)).startswith(self.root):
+                self.record(name)
+                result = function(path, *args, **kwargs)
+                return wrap_result(result, self) if wrap_result is not None else result
+            return function(path, *args, **kwargs)
+        return wrapped
+
+    def take_calls(self):
+        with self.lock:
+            calls, self.calls = self.calls, {}
+        return calls
+
+    @contextmanager
+    def active(self):
+        originals = {"scandir": os.scandir, "listdir": os.listdir, "stat": os.stat, "open": builtins.open}
+        os.scandir = self._wrap("scandir", originals["scandir"], _CountedScandir)
+        os.listdir = self._wrap("listdir", originals["listdir"])
+        os.stat = self._wrap("stat", originals["stat"])
+        builtins.open = self._wrap("open", originals["open"])
+        try:
+            yield self
+        finally:
+            os.scandir, os.listdir, os.stat, builtins.open = (originals["scandir"], originals["listdir"],
+                                                              originals["stat"], originals["open"])
+
+
+def _clear_caches():
+    with host_scan._required_file_cache_lock:
+        host_scan._required_file_cache.clear()
+
+
+def run_phases(source_folders, work_dir, scan_workers=4, copy_workers=8, keywords=("HotVmin.xlsx", "GNG.xlsx"),
+               injector=None):
+    """Yield (phase, seconds, items) for one pass of every phase over the synthetic tree.
+
+    Filesystem calls made to set a phase up are dropped from the injector's counts.
+    """
+    rules = make_scan_rules()
+    destination_folder = os.path.join(work_dir, "dest")
+    scan_jobs = {source_folder: (source_folder, destination_folder, rules, list(keywords)) for source_folder in source_folders}
+
+    start_time = time.perf_counter()
+    test_folders = [path for source_folder in source_folders
+                    for kind, _, _, path in iter_scan_targets(source_folder, rules) if kind == "test"]
+    yield "walk", time.perf_counter() - start_time, len(test_folders)
+
+    start_time = time.perf_counter()
+    for test_folder in test_folders:
+        get_latest_timestamp_folder(test_folder)
+    yield "latest", time.perf_counter() - start_time, len(test_folders)
+
+    _clear_caches()
+    start_time = time.perf_counter()
+    job_reports = scan_hosts(scan_jobs, scan_workers, host_timeout=3600)
+    yield "scan", time.perf_counter() - start_time, sum(len(report["info"]) for report in job_reports.values())
+
+    index_path = os.path.join(work_dir, "scan_index.sqlite")
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    scan_index = ScanIndex(index_path)
+    _clear_caches()
+    scan_hosts(scan_jobs, scan_workers, host_timeout=3600, scan_index=scan_index)
+    _clear_caches()
+    if injector is not None:
+        injector.take_calls()
+    start_time = time.perf_counter()
+    scan_hosts(scan_jobs, scan_workers, host_timeout=3600, scan_index=scan_index)
+    yield "rescan_indexed", time.perf_counter() - start_time, scan_index.hits
+    scan_index.close()
+
+    start_time = time.perf_counter()
+    latest_timestamp_info = merge_host_results(job_reports, source_folders)
+    plan = build_work_plan(latest_timestamp_info, job_reports, source_folders, destination_folder)
+    yield "select", time.perf_counter() - start_time, len(plan.timestamp_copies)
+
+    if os.path.exists(destination_folder):
+        shutil.rmtree(destination_folder)
+    configure_copy_engine(copy_workers, file_timeout=3600)
+    start_time = time.perf_counter()
+    files = 0
+    for item in plan.timestamp_copies:
+        files += copy_with_timeout(item.latest_folder, item.dest_timestamp_folder, timeout=3600)[0]
+    yield "copy", time.perf_counter() - start_time, files
+    shutil.rmtree(destination_folder)
+
+    # Scan and copy together, copying each folder once the hosts that held it at the indexed scan have reported
+    scan_index = ScanIndex(index_path)
+    feed = CopyFeed(source_folders, scan_index.test_folder_hosts())
+    scan_index.close()
+    _clear_caches()
+    if injector is not None:
+        injector.take_calls()
+
+    def scan():
+        try:
+            scan_hosts(scan_jobs, scan_workers, host_timeout=3600, on_report=feed.host_done)
+        finally:
+            feed.finish()
+
+    start_time = time.perf_counter()
+    scan_thread = threading.Thread(target=scan, name="bench-pipeline-scan")
+    scan_thread.start()
+    files = 0
+    for item in feed:
+        files += copy_with_timeout(item.latest_folder, item.dest_timestamp_folder, timeout=3600)[0]
+    scan_thread.join()
+    yield "scan_copy_pipelined", time.perf_counter() - start_time, files
+    shutil.rmtree(destination_folder)
+
+
+def benchmark(source_folders, work_dir, repeat=3, latency=0.0, scan_workers=4, copy_workers=8):
+    """Run every phase `repeat` times and return {phase: {"median_s", "min_s", "items", "calls", "calls_by_kind"}}."""
+    injector = LatencyInjector(os.path.commonpath(source_folders), latency)
+    timings = {}
+    with injector.active():
+        for _ in range(repeat):
+            for phase, seconds, items in run_phases(source_folders, work_dir, scan_workers, copy_workers, injector=injector):
+                entry = timings.setdefault(phase, {"seconds": [], "items": items, "calls": {}})
+                entry["seconds"].append(seconds)
+                entry["calls"] = injector.take_calls()
+    return {phase: {"median_s": statistics.median(entry["seconds"]), "min_s": min(entry["seconds"]),
+                    "items": entry["items"], "calls": sum(entry["calls"].values()), "calls_by_kind": entry["calls"]}
+            for phase, entry in timings.items()}
+
+
+def format_results(results, baseline=None):
+    lines = [f"{'phase':<20} {'median s':>9} {'min s':>9} {'items':>7} {'fs calls':>9}" + ("   vs baseline" if baseline else "")]
+    for phase in PHASES:
+        row = results.get(phase)
+        if row is None:
+            continue
+        line = f"{phase:<20} {row['median_s']:>9.3f} {row['min_s']:>9.3f} {row['items']:>7} {row['calls']:>9}"
+        if baseline and phase in baseline and baseline[phase]["median_s"]:
+            change = 100.0 * (row["median_s"] - baseline[phase]["median_s"]) / baseline[phase]["median_s"]
+            line += f"   {change:+6.1f}% ({baseline[phase]['median_s']:.3f} s)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Time the scan, select and copy phases on a synthetic result tree, optionally against a saved baseline."""
+    parser = argparse.ArgumentParser(description="Benchmark the filter phases on a synthetic result tree.")
+    parser.add_argument("--tree", help="Existing tree from synthetic_tree.py (default: generate one in a temporary folder)")
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--units", type=int, default=6)
+    parser.add_argument("--timestamps", type=int, default=3)
+    parser.add_argument("--unitlog-files", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every filesystem call, to mimic SMB")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scan-workers", type=int, default=4)
+    parser.add_argument("--copy-workers", type=int, default=8)
+    parser.add_argument("--save", help="Write the results as JSON, e.g. to keep as a baseline")
+    parser.add_argument("--compare", help="Baseline JSON written by --save to compare against")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    work_dir = tempfile.mkdtemp(prefix="filterfx_bench_")
+    try:
+        if args.tree:
+            source_folders = sorted(os.path.join(args.tree, host, PRODUCT_PATH) for host in os.listdir(args.tree))
+        else:
+            source_folders = generate_tree(os.path.join(work_dir, "hosts"), args.hosts, args.units,
+                                           timestamps=args.timestamps, unitlog_files=args.unitlog_files)
+        results = benchmark(source_folders, work_dir, args.repeat, args.latency_ms / 1000.0,
+                            args.scan_workers, args.copy_workers)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print(format_results(results, baseline))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args), "results": results}, f, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+import os
+import json
+import time
+import queue
+import shutil
+import hashlib
+import logging
+import threading
+from contextlib import nullcontext
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+
+# Read/write in 1 MiB blocks; small UnitLogs files still fit in a single round trip
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+# Files are written under this suffix and renamed when complete, so a cut-off copy never looks finished
+PARTIAL_SUFFIX = ".filterfx_partial"
+
+
+def share_key(path):
+    """Return the host/share a path lives on: '//host/share' for UNC paths, the drive letter, or 'local'."""
+    normalized = path.replace("\\", "/")
+    if normalized.startswith("//"):
+        parts = normalized[2:].split("/")
+        return "//" + "/".join(parts[:2]).lower()
+    drive, _ = os.path.splitdrive(path)
+    if not drive and len(normalized) > 1 and normalized[1] == ":":
+        drive = normalized[:2]
+    return drive.upper() if drive else "local"
+
+
+def host_key(path):
+    """Return the machine a path lives on ('//host' for UNC paths), used for per-tester limits."""
+    key = share_key(path)
+    return "//" + key[2:].split("/")[0] if key.startswith("//") else key
+
+
+def build_file_list(source, dest, copy_filter=None):
+    """List a source tree once and return (dirs, files) as (src, dst) and (src, dst, size, mtime) tuples.
+
+    With a copy_filter (copy_filter.CopyFilter), files it rejects are left out, and so are
+    folders that end up with nothing to copy below them.
+    """
+    dirs = [(source, dest)]
+    files = []
+    pending = [(source, dest, "")]
+    while pending:
+        current_source, current_dest, current_relative = pending.pop()
+        with os.scandir(current_source) as entries:
+            for entry in entries:
+                target = os.path.join(current_dest, entry.name)
+                relative = os.path.join(current_relative, entry.name) if current_relative else entry.name
+                if entry.is_dir():
+                    dirs.append((entry.path, target))
+                    pending.append((entry.path, target, relative))
+                else:
+                    stat = entry.stat()
+                    if copy_filter is None or copy_filter.allows(entry.path, relative, stat.st_size):
+                        files.append((entry.path, target, stat.st_size, stat.st_mtime))
+    if copy_filter is not None:
+        used = {source}
+        for src, _, _, _ in files:
+            parent = os.path.dirname(src)
+            while parent not in used and len(parent) > len(source):
+                used.add(parent)
+                parent = os.path.dirname(parent)
+        dirs = [(src, dst) for src, dst in dirs if src in used]
+    return dirs, files
+
+
+class CopyJournal:
+    """Append-only record of the files of one destination folder that were copied completely.
+
+    The journal lives outside the destination (one JSON-lines file per folder under
+    journal_dir) so readers of the share never see it. A folder that was cut off by a
+    timeout is resumed on the next run by skipping every file whose journal entry still
+    matches the source size and mtime; the journal is discarded once the folder completes.
+    """
+
+    def __init__(self, journal_dir, dest):
+        os.makedirs(journal_dir, exist_ok=True)
+        digest = hashlib.sha1(os.path.normcase(os.path.abspath(dest)).encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(journal_dir, f"{digest}.jsonl")
+        self.dest = dest
+        self.done = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # last line of a journal cut off mid-write
+                    self.done[record["path"]] = (record["size"], record["mtime"])
+        self.handle = open(self.path, "a", encoding="utf-8")
+
+    def is_done(self, dst, size, mtime):
+        return self.done.get(os.path.relpath(dst, self.dest)) == (size, mtime)
+
+    def record(self, dst, size, mtime):
+        relative_path = os.path.relpath(dst, self.dest)
+        self.done[relative_path] = (size, mtime)
+        self.handle.write(json.dumps({"path": relative_path, "size": size, "mtime": mtime}) + "\n")
+        self.handle.flush()
+
+    def close(self):
+        self.handle.close()
+
+    def discard(self):
+        self.handle.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class _DaemonPool:
+    """Minimal thread pool on daemon threads.
+
+    Unlike ThreadPoolExecutor, a worker stuck in a network call can be written off:
+    replace_stuck_worker() starts a fresh thread, and the stuck one exits as soon as
+    its call returns. Daemon threads also never block interpreter exit.
+    """
+
+    def __init__(self, size, name):
+        self.tasks = queue.Queue()
+        self.name = name
+        self.lock = threading.Lock()
+        self.retire = 0
+        self.spawned = 0
+        for _ in range(size):
+            self._spawn()
+
+    def _spawn(self):
+        self.spawned += 1
+        threading.Thread(target=self._worker, name=f"{self.name}-{self.spawned}", daemon=True).start()
+
+    def _worker(self):
+        while True:
+            future, fn, args = self.tasks.get()
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self.lock:
+                if self.retire > 0:
+                    self.retire -= 1
+                    return
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.tasks.put((future, fn, args))
+        return future
+
+    def replace_stuck_worker(self):
+        with self.lock:
+            self.retire += 1
+            self._spawn()
+
+
+class _SlotLease:
+    """Per-host and per-share slots held by one file copy, and when the copy started.
+
+    The slots are released by the copy itself when it ends. A copy written off by
+    copy_files keeps them until its worker has actually stopped (it is cancelled, so
+    that is the next block unless it hangs inside a network call): the replacement
+    worker must not push a slow tester or share past its cap.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.held = []
+        self.started = None
+
+    def acquire(self, semaphore, cancel_event=None):
+        # Waits in short steps so a copy queued behind stuck ones still sees its cancel
+        while not semaphore.acquire(timeout=1.0):
+            if cancel_event is not None and cancel_event.is_set():
+                raise TimeoutError("Copy cancelled while waiting for a free slot")
+        with self.lock:
+            self.held.append(semaphore)
+
+    def release(self):
+        with self.lock:
+            held, self.held = self.held, []
+        for semaphore in held:
+            semaphore.release()
+
+
+class CopyEngine:
+    """File-level copier running on a shared worker pool.
+
+    Every file is copied by a pool worker with large buffers. Besides the pool size,
+    concurrency is capped per source host (so one tester is not flooded with opens)
+    and per destination share. Each file has its own deadline (file_timeout) and each
+    copy_files()/copy_tree() call can have a folder deadline; workers stuck past the
+    file deadline are written off and replaced so the rest of the run keeps moving.
+    An optional governor (throttle.Governor) caps bytes/sec and open files on top of that.
+    """
+
+    def __init__(self, max_workers=8, per_source_host=4, per_dest_share=6, buffer_size=DEFAULT_BUFFER_SIZE,
+                 file_timeout=120, journal_dir=None, governor=None):
+        self.max_workers = max_workers
+        self.per_source_host = per_source_host
+        self.per_dest_share = per_dest_share
+        self.buffer_size = buffer_size
+        self.file_timeout = file_timeout
+        self.journal_dir = journal_dir
+        self.governor = governor
+        self.pool = _DaemonPool(max_workers, "copy")
+        self.lock = threading.Lock()
+        self.slots = {}
+
+    def _slot(self, key, limit):
+        with self.lock:
+            if key not in self.slots:
+                self.slots[key] = threading.BoundedSemaphore(limit)
+            return self.slots[key]
+
+    def copy_file(self, src, dst, cancel_event=None, lease=None):
+        """Copy one file with data and metadata (like shutil.copy2) and return its size.
+
+        Data goes to a partial file of this worker's own that is renamed into place only
+        when complete, so a retry never writes into the partial of a written-off copy. The
+        copy stops between blocks once cancel_event is set, or while it still waits for
+        a per-host or per-share slot. lease (a _SlotLease) records the slots and the start.
+        """
+        if cancel_event is not None and cancel_event.is_set():
+            raise TimeoutError(f"Copy of '{src}' cancelled before it started")
+        lease = lease if lease is not None else _SlotLease()
+        try:
+            lease.acquire(self._slot("src:" + host_key(src), self.per_source_host), cancel_event)
+            lease.acquire(self._slot("dst:" + share_key(dst), self.per_dest_share), cancel_event)
+            lease.started = time.time()
+            partial = f"{dst}.{threading.get_ident()}{PARTIAL_SUFFIX}"
+            governor = self.governor
+            try:
+                with governor.open_files() if governor is not None else nullcontext():
+                    with open(src, "rb") as fsrc, open(partial, "wb") as fdst:
+                        while True:
+                            block = fsrc.read(self.buffer_size)
+                            if not block:
+                                break
+                            if cancel_event is not None and cancel_event.is_set():
+                                raise TimeoutError(f"Copy of '{src}' cancelled")
+                            if governor is not None:
+                                governor.throttle(src, dst, len(block), cancel_event)
+                            fdst.write(block)
+                shutil.copystat(src, partial)
+                os.replace(partial, dst)
+            except BaseException:
+                try:
+                    os.remove(partial)
+                except OSError:
+                    pass
+                raise
+        finally:
+            lease.release()
+        return os.path.getsize(dst)
+
+    def copy_files(self, files, timeout=None, journal=None):
+        """Copy (src, dst, size, mtime) tuples in parallel; return (files_copied, bytes_copied, errors).
+
+        Files still running when the folder deadline (timeout seconds) passes, or running
+        longer than file_timeout, are cancelled and reported in errors. Each file has its
+        own cancel event, so writing one off stops that copy and no other.
+        """
+        folder_deadline = time.time() + timeout if timeout else None
+        running = {}
+        for src, dst, size, mtime in files:
+            lease, cancel_event = _SlotLease(), threading.Event()
+            future = self.pool.submit(self.copy_file, src, dst, cancel_event, lease)
+            running[future] = (src, dst, size, mtime, lease, cancel_event)
+
+        files_copied, bytes_copied, errors = 0, 0, []
+        while running:
+            done, _ = wait(list(running), timeout=1.0, return_when=FIRST_COMPLETED)
+            for future in done:
+                src, dst, size, mtime, _, _ = running.pop(future)
+                try:
+                    bytes_copied += future.result()
+                    files_copied += 1
+                    if journal is not None:
+                        journal.record(dst, size, mtime)
+                except (OSError, TimeoutError) as e:
+                    errors.append((src, dst, str(e)))
+
+            now = time.time()
+            if folder_deadline is not None and now >= folder_deadline:
+                for future, (src, dst, _, _, lease, cancel_event) in list(running.items()):
+                    cancel_event.set()
+                    future.cancel()
+                    if lease.started is not None:
+                        self.pool.replace_stuck_worker()
+                    errors.append((src, dst, f"folder deadline of {timeout} seconds exceeded"))
+                running.clear()
+                break
+            for future, (src, dst, _, _, lease, cancel_event) in list(running.items()):
+                if lease.started is not None and now - lease.started >= self.file_timeout:
+                    # Stop the copy and let a fresh worker take the queue; the slots stay with the
+                    # cancelled copy until it has stopped, so the caps hold on a slow share too
+                    running.pop(future)
+                    cancel_event.set()
+                    self.pool.replace_stuck_worker()
+                    errors.append((src, dst, f"file deadline of {self.file_timeout} seconds exceeded"))
+        return files_copied, bytes_copied, errors
+
+    def copy_tree(self, source, dest, timeout=None, copy_filter=None):
+        """Parallel replacement for shutil.copytree(source, dest, dirs_exist_ok=True).
+
+        Raises shutil.Error with the list of (src, dst, reason) after all files were tried,
+        like copytree does. With a journal_dir, files completed by an earlier interrupted
+        run are skipped. Only files allowed by copy_filter, if any, are copied.
+        Returns (files_copied, bytes_copied).
+        """
+        dirs, files = build_file_list(source, dest, copy_filter)
+        dest_existed = os.path.isdir(dest)
+        for _, directory in dirs:
+            os.makedirs(directory, exist_ok=True)
+        journal = CopyJournal(self.journal_dir, dest) if self.journal_dir else None
+        if journal is not None and not dest_existed:
+            # The partial copy the journal describes is gone; start over
+            journal.discard()
+            journal = CopyJournal(self.journal_dir, dest)
+        if journal is not None:
+            remaining = [f for f in files if not journal.is_done(f[1], f[2], f[3])]
+            if len(remaining) < len(files):
+                logging.info(f"Resuming copy to '{dest}': {len(files) - len(remaining)} files already copied by an earlier run")
+            files = remaining
+        files_copied, bytes_copied, errors = self.copy_files(files, timeout, journal)
+        if errors:
+            if journal is not None:
+                journal.close()
+            raise shutil.Error(errors)
+        if journal is not None:
+            journal.discard()
+        # Directory times last, as copytree does, since writing files changes them
+        for directory_source, directory_dest in reversed(dirs):
+            shutil.copystat(directory_source, directory_dest)
+        return files_copied, bytes_copied
+
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def get_copy_engine():
+    """Return the process-wide CopyEngine, creating it with default limits on first use."""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = CopyEngine()
+        return _default_engine
+
+
+def configure_copy_engine(max_workers=8, per_source_host=4, per_dest_share=6, buffer_size=DEFAULT_BUFFER_SIZE,
+                          file_timeout=120, journal_dir=None, governor=None):
+    """Replace the process-wide CopyEngine with one using the given limits."""
+    global _default_engine
+    with _default_engine_lock:
+        _default_engine = CopyEngine(max_workers, per_source_host, per_dest_share, buffer_size,
+                                     file_timeout, journal_dir, governor)
+        return _default_engine
+
+
+def copy_with_timeout(source, dest, timeout=300, copy_filter=None):
+    """Copy directory, cancelling whatever is still running after `timeout` seconds; return (files, bytes)."""
+    start_time = time.time()
+    try:
+        files_copied, bytes_copied = get_copy_engine().copy_tree(source, dest, timeout, copy_filter)
+        elapsed_time = time.time() - start_time
+        logging.debug(f"Completed copy of '{os.path.basename(source)}' to '{dest}' "
+                     f"({files_copied} files, {bytes_copied} bytes in {elapsed_time:.1f} s)")
+        return files_copied, bytes_copied
+    except Exception as e:
+        elapsed_time = time.time() - start_time
+        if elapsed_time >= timeout:
+            logging.error(f"Copy of '{source}' to '{dest}' timed out after {timeout} seconds: {str(e)}")
+        else:
+            logging.error(f"Error copying '{source}' to '{dest}': {str(e)}")
+        raise
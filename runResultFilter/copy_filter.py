@@ -0,0 +1,56 @@
+import fnmatch
+import threading
+
+
+class CopyFilter:
+    """Decides which files of a timestamp folder are copied, and counts what it left out.
+
+    Patterns are fnmatch globs. A pattern containing '/' is matched against the path
+    relative to the timestamp folder (e.g. 'UnitLogs/*'), any other pattern against the
+    file name (e.g. '*.xlsx'). A file is copied if it matches one of include (or include
+    is empty) and none of exclude. Files whose name contains one of the always keywords
+    (the profile's required workbooks) are copied regardless.
+    """
+
+    def __init__(self, include=None, exclude=None, always=None):
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.always = list(always or [])
+        self.lock = threading.Lock()
+        self.filtered = {}  # {source path: size}; a folder checked twice (e.g. a retried copy) counts once
+
+    @property
+    def files_filtered(self):
+        return len(self.filtered)
+
+    @property
+    def bytes_filtered(self):
+        with self.lock:
+            return sum(self.filtered.values())
+
+    @staticmethod
+    def _matches(relative_path, name, patterns):
+        return any(fnmatch.fnmatch(relative_path if "/" in pattern else name, pattern) for pattern in patterns)
+
+    def allows(self, path, relative_path, size=0):
+        """Check one source file, given with its path relative to the copied folder; a file left out is recorded."""
+        relative_path = relative_path.replace("\\", "/")
+        name = relative_path.rsplit("/", 1)[-1]
+        if any(keyword in name for keyword in self.always):
+            return True
+        if (not self.include or self._matches(relative_path, name, self.include)) and \
+                not self._matches(relative_path, name, self.exclude):
+            return True
+        with self.lock:
+            self.filtered[path] = size
+        return False
+
+
+def make_copy_filter(rules, always=None):
+    """Return a CopyFilter for a profile's copy_filter rules ({"include": [...], "exclude": [...]}), or None if empty."""
+    unknown = set(rules) - {"include", "exclude"}
+    if unknown:
+        raise KeyError(f"Unknown copy filter rule(s): {', '.join(sorted(unknown))}")
+    if not rules.get("include") and not rules.get("exclude"):
+        return None
+    return CopyFilter(rules.get("include"), rules.get("exclude"), always)
@@ -0,0 +1,57 @@
+import os
+import threading
+
+
+class DirCache:
+    """Memo of directory listings for one scan, shared by every phase that looks at the testers.
+
+    Listings are kept as the os.DirEntry objects os.scandir returned, so a later
+    is_dir() or stat() on an entry reuses what the listing already fetched (on Windows
+    the listing itself carries the stat data, so no extra SMB round trip at all). A
+    folder's stat is taken from its parent's listing when that was listed. Create one
+    per scan: nothing is ever invalidated, so it must not outlive the run.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.listings = {}  # {path: {name: DirEntry}}
+        self.hits = 0
+        self.misses = 0
+
+    def scandir(self, path):
+        """Return the DirEntry objects of path, listing it only the first time."""
+        with self.lock:
+            listing = self.listings.get(path)
+            if listing is not None:
+                self.hits += 1
+                return list(listing.values())
+            self.misses += 1
+        with os.scandir(path) as entries:
+            listing = {entry.name: entry for entry in entries}
+        with self.lock:
+            self.listings.setdefault(path, listing)
+        return list(listing.values())
+
+    def stat(self, path):
+        """Return os.stat(path), from the DirEntry in its parent's listing when the parent was listed."""
+        parent, name = os.path.split(path)
+        with self.lock:
+            entry = self.listings.get(parent, {}).get(name)
+            if entry is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry.stat() if entry is not None else os.stat(path)
+
+
+def list_dir(path, dir_cache=None):
+    """Return the DirEntry objects of path, through dir_cache if one is given."""
+    if dir_cache is not None:
+        return dir_cache.scandir(path)
+    with os.scandir(path) as entries:
+        return list(entries)
+
+
+def stat_path(path, dir_cache=None):
+    """Return os.stat(path), through dir_cache if one is given."""
+    return dir_cache.stat(path) if dir_cache is not None else os.stat(path)
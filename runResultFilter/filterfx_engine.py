@@ -0,0 +1,794 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import itertools
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from scan_walker import make_scan_rules
+from host_scan import scan_hosts, merge_host_results
+from incremental_sync import new_sync_stats, sync_folder
+from scan_index import ScanIndex
+from copy_engine import configure_copy_engine, copy_with_timeout
+from staged_swap import DeferredDeleter, staged_copy, retire_old_timestamp_folders
+from work_plan import WorkPlan, build_work_plan
+from run_journal import RunJournal, retry
+from transfer_estimate import ThroughputHistory, estimate_work_plan, format_estimate, format_size
+from throttle import Governor, DEFAULT_CONTROL_PATH
+from run_log import setup_run_logging, count, span, log_summary, reset_totals
+from watch import HostWatcher
+from copy_filter import make_copy_filter
+from packed_transfer import PACK_MODES, pack_folder, packed_folder_current
+from rollup import ROLLUP_OUTPUTS, compile_rollup
+from verify import VERIFY_MODES, HashCache, Verifier
+from metrics import write_metrics
+from pipeline import CopyFeed
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "filterfx_profiles.json")
+
+# Settings shared by every profile of a run; the "settings" block of the config file overrides these
+DEFAULT_SETTINGS = {
+    "log_dir": r"U:/users/Hs/script/Process-Improvement/runResultFilter/debuglog",
+    "scan_workers": 4,                  # source folders scanned concurrently, over all profiles
+    "host_scan_timeout": 600,           # seconds per source folder scan
+    "incremental_sync": True,           # only copy new or changed files into existing timestamp folders
+    "scan_index_path": "~/filterfx/scan_index.sqlite",  # null disables the index
+    "copy_workers": 8,                  # shared copy pool, over all profiles
+    "copy_per_source_host": 4,
+    "copy_per_dest_share": 6,
+    "copy_folder_timeout": 300,
+    "copy_file_timeout": 120,
+    "copy_journal_dir": "~/filterfx/copy_journal",
+    "run_journal_dir": "~/filterfx/run_journal",  # folders completed per profile, for --resume
+    "retry_attempts": 3,                # tries per folder when the share or a tester drops
+    "retry_base_delay": 5,              # seconds before the first retry, doubled each time
+    "retry_max_delay": 120,
+    "deferred_delete_timeout": 600,
+    "shmoo_hash_check": False,
+    # Check every copied timestamp folder against its source: null (off), "fast" (file list, sizes,
+    # mtimes) or "strict" (also SHA-1 of every file, source hashes cached in hash_cache_path).
+    # A folder that fails is retired and copied once more
+    "verify_copies": None,
+    "verify_workers": 4,
+    "hash_cache_path": "~/filterfx/hash_cache.sqlite",
+    # null copies file by file; "store" keeps each timestamp folder as one tar plus index on the
+    # share, read in place through its index. packed_compression: null or "gz"
+    "packed_transfer": None,
+    "packed_compression": None,
+    "throughput_history_path": "~/filterfx/throughput_history.jsonl",  # past copy rates, for dry-run estimates
+    # Copy throttle (null = unlimited); rates accept "20MB"-style strings. Running jobs also follow
+    # the overrides written to throttle_control_path by `python throttle.py set ...`
+    "source_host_bytes_per_sec": None,
+    "dest_bytes_per_sec": None,
+    "max_open_files": None,
+    "throttle_control_path": DEFAULT_CONTROL_PATH,
+    "watch_poll_interval": 120,         # --watch: seconds between mtime polls of a reachable tester
+    "watch_max_backoff": 1800,          # --watch: longest wait between polls of an unreachable tester
+    # filterfx.prom (OpenMetrics, for a node_exporter textfile collector) and filterfx_metrics.json
+    # are rewritten here after every run and watch cycle (null = no metrics files)
+    "metrics_dir": "~/filterfx/metrics",
+    "pipeline_copy": False,             # start copying folders while the scan is still running
+    "pipeline_queue_size": 256,         # released folders a profile may have waiting before the scan is held back
+    # Rollup of the copied HotVmin/GNG workbooks, one rollup_<profile>.sqlite per profile (null = no rollup);
+    # rollup_output "parquet" writes the rows to rollup_<profile>_parquet/ instead
+    "rollup_dir": None,
+    "rollup_output": "sqlite",
+    "rollup_workers": None,             # workbook reader processes (null = one per CPU)
+}
+
+
+@dataclass
+class Profile:
+    """One product: where its testers put results, where they go and which folders count."""
+    name: str
+    source_folders: list
+    destination_folder: str
+    required_file_keywords: list = field(default_factory=lambda: ["HotVmin.xlsx", "GNG.xlsx"])
+    scan_rules: dict = field(default_factory=make_scan_rules)
+    enabled: bool = True
+    throttle: dict = field(default_factory=dict)  # source_host_bytes_per_sec / dest_bytes_per_sec for this product
+    copy_filter: dict = field(default_factory=dict)  # include / exclude globs for files inside timestamp folders
+
+
+def load_config(path):
+    """Read the config file and return (settings, profiles)."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    settings = dict(DEFAULT_SETTINGS)
+    for key, value in data.get("settings", {}).items():
+        if key not in settings:
+            raise KeyError(f"Unknown setting '{key}' in '{path}'")
+        settings[key] = value
+    if settings["packed_transfer"] == "expand":
+        # Unpacking on the share read the archive back and wrote every file out again
+        logging.warning(f"packed_transfer 'expand' is no longer supported in '{path}'; using 'store'")
+        settings["packed_transfer"] = "store"
+    if settings["packed_transfer"] not in (None,) + PACK_MODES:
+        raise ValueError(f"packed_transfer must be null or 'store' in '{path}'")
+    if settings["verify_copies"] not in (None,) + VERIFY_MODES:
+        raise ValueError(f"verify_copies must be null, 'fast' or 'strict' in '{path}'")
+    if settings["rollup_output"] not in ROLLUP_OUTPUTS:
+        raise ValueError(f"rollup_output must be 'sqlite' or 'parquet' in '{path}'")
+    for key in ("scan_index_path", "copy_journal_dir", "run_journal_dir", "throughput_history_path", "throttle_control_path",
+                "hash_cache_path", "rollup_dir", "metrics_dir"):
+        if settings[key]:
+            settings[key] = os.path.expanduser(settings[key])
+
+    profiles = []
+    for entry in data["profiles"]:
+        entry = dict(entry)
+        entry.pop("inactive_source_folders", None)  # kept in the file for reference only
+        entry["scan_rules"] = make_scan_rules(**entry.get("scan_rules", {}))
+        profile = Profile(**entry)
+        make_copy_filter(profile.copy_filter)  # reject unknown rules when the config is loaded
+        profiles.append(profile)
+    names = [profile.name for profile in profiles]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate profile names in '{path}'")
+    return settings, profiles
+
+
+def select_profiles(profiles, names=None):
+    """Return the named profiles, or every enabled profile when no names are given."""
+    if not names:
+        return [profile for profile in profiles if profile.enabled]
+    by_name = {profile.name: profile for profile in profiles}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise KeyError(f"Unknown profile(s): {', '.join(unknown)}")
+    return [by_name[name] for name in names]
+
+
+def build_scan_jobs(profiles):
+    """Group the source folders of all profiles into scan jobs, one per distinct (folder, rules, keywords).
+
+    A source folder listed by several profiles with the same rules is scanned once. Jobs scan
+    into relative destination paths, which rebase_report joins to each profile's destination.
+    Returns (scan_jobs, profile_jobs) where profile_jobs is {profile_name: [(source_folder, job_key)]}.
+    """
+    scan_jobs = {}
+    profile_jobs = {}
+    for profile in profiles:
+        rules_key = json.dumps(profile.scan_rules, sort_keys=True)
+        profile_jobs[profile.name] = []
+        for source_folder in dict.fromkeys(profile.source_folders):
+            job_key = (source_folder, rules_key, tuple(profile.required_file_keywords))
+            scan_jobs.setdefault(job_key, (source_folder, "", profile.scan_rules, profile.required_file_keywords))
+            profile_jobs[profile.name].append((source_folder, job_key))
+    return scan_jobs, profile_jobs
+
+
+def rebase_report(report, destination_folder):
+    """Return a copy of a scan report with its relative destination paths placed under destination_folder."""
+    rebased = dict(report)
+    rebased["info"] = {os.path.join(destination_folder, relative): value
+                       for relative, value in report["info"].items()}
+    rebased["shmoo"] = [(shmoo_source, os.path.join(destination_folder, relative))
+                        for shmoo_source, relative in report["shmoo"]]
+    return rebased
+
+
+def _copy_timestamp_folder(item, settings, copy_filter, deleter, sync_stats):
+    """Bring one selected timestamp folder up to date at the destination; return the span fields (mode, files, bytes)."""
+    dest_folder_path, latest_timestamp_folder = item.dest_folder_path, item.latest_folder
+    dest_timestamp_folder = item.dest_timestamp_folder
+    os.makedirs(dest_folder_path, exist_ok=True)
+    packed = settings["packed_transfer"]
+    if packed == "store" and packed_folder_current(latest_timestamp_folder, dest_timestamp_folder, copy_filter):
+        fields = {"mode": "packed_store", "files": 0, "bytes": 0}
+    elif packed != "store" and settings["incremental_sync"] and os.path.isdir(dest_timestamp_folder):
+        files_before, bytes_before = sync_stats["files_copied"], sync_stats["bytes_copied"]
+        sync_folder(latest_timestamp_folder, dest_timestamp_folder, mirror=True, stats=sync_stats,
+                    timeout=settings["copy_folder_timeout"], copy_filter=copy_filter)
+        fields = {"mode": "sync", "files": sync_stats["files_copied"] - files_before,
+                  "bytes": sync_stats["bytes_copied"] - bytes_before}
+    else:
+        if packed:
+            copy_fn = lambda source, staging: pack_folder(source, staging, settings["packed_compression"],
+                                                          settings["copy_folder_timeout"], copy_filter)
+        else:
+            copy_fn = lambda source, staging: copy_with_timeout(source, staging, settings["copy_folder_timeout"], copy_filter)
+        files_copied, bytes_copied = staged_copy(latest_timestamp_folder, dest_timestamp_folder, copy_fn, deleter)
+        fields = {"mode": "packed_" + packed if packed else "staged", "files": files_copied, "bytes": bytes_copied}
+    # Older timestamp folders are only retired once the new one is in place
+    retire_old_timestamp_folders(dest_folder_path, os.path.basename(latest_timestamp_folder), deleter)
+    return fields
+
+
+def _retry(fn, settings, what):
+    return retry(fn, settings["retry_attempts"], settings["retry_base_delay"], settings["retry_max_delay"], what)
+
+
+def run_profile(profile, host_reports, settings, run_stamp, dry_run=False, dest_prefixes=None, resume=None, feed=None):
+    """Execute the copy phase of one profile from its share of the scan results; return a result dict.
+
+    With dry_run, the work plan is built, saved and costed but nothing is copied or created
+    at the destination. With dest_prefixes, only the destination folders under one of
+    those paths are copied (watch mode passes the units that changed). Full runs keep a
+    RunJournal; with resume (the journal of an interrupted run), that run's saved work
+    plan is executed again, skipping the folders the journal lists as done. With feed (a
+    pipeline.CopyFeed), folders are copied as the feed releases them while the scan is
+    still running; the work plan is built once the scan has finished and whatever it
+    selects beyond what the feed released is copied after that.
+    """
+    result = {"profile": profile.name, "status": "failed", "hosts_ok": 0, "hosts_total": len(host_reports),
+              "timestamp_copies": 0, "incomplete": 0}
+    start_time = time.time()
+    destination_folder = profile.destination_folder
+    try:
+        # Check if destination parent directory exists
+        destination_parent = os.path.dirname(destination_folder)
+        if not os.path.exists(destination_parent):
+            raise OSError(f"Parent directory '{destination_parent}' does not exist. Please create it first.")
+        if not dry_run:
+            os.makedirs(destination_folder, exist_ok=True)
+        history = ThroughputHistory(settings["throughput_history_path"])
+        copy_filter = make_copy_filter(profile.copy_filter, always=profile.required_file_keywords)
+        journal = resume
+
+        # Seconds spent copying, summed per folder: in pipelined mode the wall clock also
+        # counts the waits for the scan, which would make the throughput history too low
+        copy_seconds = 0.0
+        sync_stats = new_sync_stats()
+        staged_bytes = 0
+        deleter = DeferredDeleter(destination_folder) if not dry_run else None
+        hash_cache = HashCache(settings["hash_cache_path"]) if settings["verify_copies"] == "strict" and not dry_run else None
+        verifier = Verifier(settings["verify_copies"], settings["verify_workers"], hash_cache) if settings["verify_copies"] and not dry_run else None
+        recopied = set()
+        attempted = set()  # (dest_timestamp_folder, latest_folder) of every folder copied (or tried) so far
+        copied = set()
+
+        def copy_items(items):
+            """Copy the latest timestamp folders in items (a list, or a feed that blocks until the next one is ready)."""
+            nonlocal staged_bytes, copy_seconds
+            recopies = deque()
+
+            def then_recopies():
+                while recopies:
+                    yield recopies.popleft()
+
+            for item in itertools.chain(items, then_recopies()):
+                dest_folder_path = item.dest_folder_path
+                attempted.add((item.dest_timestamp_folder, item.latest_folder))
+                if journal is not None and journal.is_done(item.dest_timestamp_folder):
+                    continue
+                item_start_time = time.time()
+                try:
+                    with span("copy_folder", profile=profile.name, source_folder=item.source_folder,
+                              source=item.latest_folder, dest=item.dest_timestamp_folder) as fields:
+                        fields.update(_retry(lambda: _copy_timestamp_folder(item, settings, copy_filter, deleter, sync_stats),
+                                             settings, f"[{profile.name}] Copy to '{item.dest_timestamp_folder}'"))
+                        problems = []
+                        if verifier is not None and fields["files"]:
+                            problems = verifier.verify_folder(item.latest_folder, item.dest_timestamp_folder, copy_filter)
+                            fields["verify_problems"] = len(problems)
+                    count("files_copied", fields["files"])
+                    count("bytes_copied", fields["bytes"])
+                    if fields["mode"] != "sync":
+                        staged_bytes += fields["bytes"]
+                    if problems:
+                        count("verify_failed")
+                        details = "; ".join(problems[:5]) + (f" (and {len(problems) - 5} more)" if len(problems) > 5 else "")
+                        if item.dest_timestamp_folder not in recopied:
+                            recopied.add(item.dest_timestamp_folder)
+                            # Retired so the recopy starts from an empty folder instead of trusting what is there
+                            deleter.retire(item.dest_timestamp_folder)
+                            recopies.append(item)
+                            logging.warning(f"[{profile.name}] '{item.dest_timestamp_folder}' failed verification, "
+                                            f"queued for recopy: {details}")
+                            continue
+                        # The older timestamp folders are gone by now, so the recopy is kept rather than
+                        # leaving the test folder empty (a tester still writing the folder fails every time)
+                        logging.error(f"[{profile.name}] '{item.dest_timestamp_folder}' failed verification again "
+                                      f"after a recopy, kept as copied: {details}")
+                        result["incomplete"] += 1
+                        continue
+                    if verifier is not None and fields["files"]:
+                        count("folders_verified")
+                    copied.add((item.dest_timestamp_folder, item.latest_folder))
+                    if journal is not None:
+                        journal.record_done(item.dest_timestamp_folder)
+                    continue
+                except PermissionError:
+                    logging.error(f"[{profile.name}] Permission denied while copying to '{dest_folder_path}'. Check access rights.")
+                except OSError as e:
+                    logging.error(f"[{profile.name}] OSError while copying to '{dest_folder_path}': {str(e)}")
+                except Exception as e:
+                    logging.error(f"[{profile.name}] Unexpected error copying to '{dest_folder_path}': {str(e)}")
+                finally:
+                    copy_seconds += time.time() - item_start_time
+                result["incomplete"] += 1
+
+        if feed is not None:
+            try:
+                with span("copy_pipelined", profile=profile.name) as fields:
+                    copy_items(feed)
+                    fields.update(folders=len(attempted))
+            finally:
+                feed.close()
+            host_reports = feed.host_reports
+            result["hosts_total"] = len(host_reports)
+            logging.info(f"[{profile.name}] Scan finished; {len(attempted)} timestamp folders were copied while it ran")
+
+        if resume is not None:
+            plan = WorkPlan.load(resume.plan_path)
+            result["hosts_total"] = len(plan.hosts)
+            result["hosts_ok"] = sum(1 for host in plan.hosts if host.status == "ok")
+            logging.info(f"[{profile.name}] Resuming run {resume.run_stamp} from '{resume.plan_path}': "
+                         f"{len(resume.done)} of {len(plan.timestamp_copies) + len(plan.shmoo_syncs)} folders already done")
+        else:
+            result["hosts_ok"] = sum(1 for report in host_reports.values() if report["status"] == "ok")
+            with span("select", profile=profile.name) as fields:
+                latest_timestamp_info = merge_host_results(host_reports, profile.source_folders)
+                plan = build_work_plan(latest_timestamp_info, host_reports, profile.source_folders, destination_folder)
+                if dest_prefixes is not None:
+                    plan.timestamp_copies = [item for item in plan.timestamp_copies
+                                             if _under_any(item.dest_folder_path, dest_prefixes)]
+                    plan.shmoo_syncs = [item for item in plan.shmoo_syncs if _under_any(item.dest_shmoo_path, dest_prefixes)]
+                fields.update(timestamp_copies=len(plan.timestamp_copies), shmoo_syncs=len(plan.shmoo_syncs),
+                              skipped=len(plan.skipped))
+            count("folders_selected", len(plan.timestamp_copies))
+            count("folders_skipped", len(plan.skipped))
+            plan_filename = os.path.join(settings["log_dir"], f"work_plan_{profile.name}_{run_stamp}.json")
+            logging.info(f"[{profile.name}] Work plan saved to '{plan.save(plan_filename)}'\n{plan.summary()}")
+            if not dry_run and dest_prefixes is None:
+                journal = RunJournal.start(settings["run_journal_dir"], profile.name, run_stamp, plan_filename)
+                # Folders the feed copied before the plan existed
+                for item in plan.timestamp_copies:
+                    if (item.dest_timestamp_folder, item.latest_folder) in copied:
+                        journal.record_done(item.dest_timestamp_folder)
+        result["timestamp_copies"] = len(plan.timestamp_copies)
+        if dry_run:
+            estimate = estimate_work_plan(plan, settings["incremental_sync"], copy_filter=copy_filter)
+            logging.info(f"[{profile.name}] Dry run, nothing copied. Transfer estimate:\n"
+                         f"{format_estimate(estimate, history.bytes_per_second(profile.name))}")
+            result["estimate"] = estimate
+            result["status"] = "ok"
+            return result
+
+        # Copy the latest timestamp folders (those the feed has not already handled)
+        remaining = [item for item in plan.timestamp_copies if (item.dest_timestamp_folder, item.latest_folder) not in attempted]
+        with span("copy", profile=profile.name, folders=len(remaining)):
+            copy_items(remaining)
+
+        if verifier is not None:
+            verifier.close()
+            result["verify_failed"] = len(recopied)
+            if hash_cache is not None:
+                logging.info(f"[{profile.name}] Hash cache '{settings['hash_cache_path']}': {hash_cache.hits} source hashes reused, "
+                             f"{hash_cache.misses} computed")
+                hash_cache.close()
+
+        # Sync source "Shmoo" folders: only new or changed shmoo files are copied
+        shmoo_stats = new_sync_stats()
+        shmoo_start_time = time.time()
+        with span("shmoo", profile=profile.name, folders=len(plan.shmoo_syncs)):
+            for item in plan.shmoo_syncs:
+                shmoo_source, dest_shmoo_path = item.shmoo_source, item.dest_shmoo_path
+                if journal is not None and journal.is_done(dest_shmoo_path):
+                    continue
+                try:
+                    with span("shmoo_folder", profile=profile.name, source_folder=item.source_folder,
+                              source=shmoo_source, dest=dest_shmoo_path) as fields:
+                        files_before, bytes_before = shmoo_stats["files_copied"], shmoo_stats["bytes_copied"]
+
+                        def sync_shmoo():
+                            os.makedirs(dest_shmoo_path, exist_ok=True)
+                            sync_folder(shmoo_source, dest_shmoo_path, mirror=False, stats=shmoo_stats,
+                                        timeout=settings["copy_folder_timeout"], hash_check=settings["shmoo_hash_check"])
+
+                        _retry(sync_shmoo, settings, f"[{profile.name}] Shmoo sync to '{dest_shmoo_path}'")
+                        fields.update(files=shmoo_stats["files_copied"] - files_before,
+                                      bytes=shmoo_stats["bytes_copied"] - bytes_before)
+                    count("files_copied", fields["files"])
+                    count("bytes_copied", fields["bytes"])
+                    if journal is not None:
+                        journal.record_done(dest_shmoo_path)
+                except OSError as e:
+                    logging.error(f"[{profile.name}] Error syncing Shmoo folder '{shmoo_source}' to '{dest_shmoo_path}': {str(e)}")
+                    result["incomplete"] += 1
+        logging.info(f"[{profile.name}] Shmoo sync: {shmoo_stats['bytes_copied']} bytes transferred ({shmoo_stats['files_copied']} files), "
+                     f"{shmoo_stats['bytes_skipped']} bytes skipped as already current ({shmoo_stats['files_skipped']} files)")
+
+        copy_seconds += time.time() - shmoo_start_time
+        history.record(profile.name, staged_bytes + sync_stats["bytes_copied"] + shmoo_stats["bytes_copied"], copy_seconds)
+        with span("delete_wait", profile=profile.name):
+            deleter.close(timeout=settings["deferred_delete_timeout"])
+
+        if copy_filter is not None:
+            count("files_filtered", copy_filter.files_filtered)
+            count("bytes_filtered", copy_filter.bytes_filtered)
+            result["bytes_filtered"] = copy_filter.bytes_filtered
+            logging.info(f"[{profile.name}] Copy filter: {copy_filter.files_filtered} files ({format_size(copy_filter.bytes_filtered)}) "
+                         f"of the selected timestamp folders left out")
+        if settings["incremental_sync"]:
+            logging.info(f"[{profile.name}] Incremental sync: {sync_stats['files_copied']} files ({sync_stats['bytes_copied']} bytes) copied, "
+                         f"{sync_stats['files_skipped']} files ({sync_stats['bytes_skipped']} bytes) already current, "
+                         f"{sync_stats['files_removed']} stale files removed")
+        if journal is not None and not result["incomplete"]:
+            journal.finish()
+        if settings["rollup_dir"]:
+            _update_rollup(profile, settings, result)
+        result["status"] = "ok"
+    except PermissionError:
+        logging.error(f"[{profile.name}] Error: Permission denied while accessing a source or '{destination_folder}'. Ensure you have appropriate rights.")
+    except OSError as e:
+        logging.error(f"[{profile.name}] Error: Failed to copy folder. {str(e)}")
+    except Exception as e:
+        logging.error(f"[{profile.name}] Unexpected error: {str(e)}")
+    finally:
+        if feed is not None:
+            feed.close()
+        result["elapsed"] = time.time() - start_time
+    return result
+
+
+def _update_rollup(profile, settings, result):
+    """Bring the profile's workbook rollup up to date with its destination; a failed rollup leaves the copy result alone."""
+    state_path = os.path.join(settings["rollup_dir"], f"rollup_{profile.name}.sqlite")
+    try:
+        with span("rollup", profile=profile.name, db=state_path) as fields:
+            stats = compile_rollup(profile.destination_folder, state_path, keywords=tuple(profile.required_file_keywords),
+                                   output=settings["rollup_output"], scan_index_path=settings["scan_index_path"],
+                                   workers=settings["rollup_workers"])
+            fields.update(stats)
+        count("rollup_rows", stats["rows"])
+        result["rollup"] = stats
+        logging.info(f"[{profile.name}] Rollup '{state_path}': {stats['ingested']} workbooks read ({stats['rows']} rows), "
+                     f"{stats['unchanged']} unchanged, {stats['removed']} removed, {stats['failed']} unreadable, {stats['no_sheet']} without their sheets")
+    except Exception as e:
+        logging.error(f"[{profile.name}] Rollup failed: {str(e)}")
+
+
+def _export_metrics(settings, mode, started_at, results, failed_profiles=0):
+    """Rewrite the metrics files for the run so far; a failed write is logged, never raised."""
+    if not settings["metrics_dir"]:
+        return
+    try:
+        write_metrics(settings["metrics_dir"], mode, started_at, results, failed_profiles)
+    except OSError as e:
+        logging.warning(f"Could not write metrics to '{settings['metrics_dir']}': {str(e)}")
+
+
+def _under_any(path, prefixes):
+    return any(path == prefix or path.startswith(prefix + os.sep) for prefix in prefixes)
+
+
+def _start_copy_engine(profiles, settings):
+    """Configure the process-wide copy engine with a started Governor and return the governor.
+
+    A profile's "throttle" applies to its testers and its destination share, which other
+    profiles may use too; conflicting rates are resolved by the Governor (lowest wins).
+    """
+    governor = Governor(settings["source_host_bytes_per_sec"], settings["dest_bytes_per_sec"],
+                        settings["max_open_files"], settings["throttle_control_path"])
+    for profile in profiles:
+        if "source_host_bytes_per_sec" in profile.throttle:
+            for source_folder in profile.source_folders:
+                governor.set_source_host_rate(source_folder, profile.throttle["source_host_bytes_per_sec"], profile.name)
+        if "dest_bytes_per_sec" in profile.throttle:
+            governor.set_dest_rate(profile.destination_folder, profile.throttle["dest_bytes_per_sec"], profile.name)
+    configure_copy_engine(settings["copy_workers"], settings["copy_per_source_host"], settings["copy_per_dest_share"],
+                          file_timeout=settings["copy_file_timeout"], journal_dir=settings["copy_journal_dir"],
+                          governor=governor.start())
+    return governor
+
+
+def _run_profiles(profiles, profile_jobs, job_reports, settings, run_stamp, dry_run=False, dest_prefixes=None,
+                  resumes=None, feeds=None):
+    """Run the copy phase of the given profiles on one thread each; return {profile_name: result}.
+
+    dest_prefixes, if given, is {profile_name: [destination paths]}, resumes is
+    {profile_name: RunJournal} and feeds is {profile_name: CopyFeed}; all are passed on
+    to run_profile. Resumed and fed profiles need no scan results.
+    """
+    results = {}
+    threads = []
+    for profile in profiles:
+        resume = resumes[profile.name] if resumes is not None else None
+        feed = feeds[profile.name] if feeds is not None else None
+        host_reports = {} if resume is not None or feed is not None else {
+            source_folder: rebase_report(job_reports[job_key], profile.destination_folder)
+            for source_folder, job_key in profile_jobs[profile.name]}
+        prefixes = dest_prefixes[profile.name] if dest_prefixes is not None else None
+
+        def run(profile=profile, host_reports=host_reports, prefixes=prefixes, resume=resume, feed=feed):
+            results[profile.name] = run_profile(profile, host_reports, settings, run_stamp, dry_run, prefixes, resume, feed)
+
+        thread = threading.Thread(target=run, name=f"profile-{profile.name}")
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def resume_engine(profiles, settings, run_stamp=None):
+    """Finish the interrupted runs of the given profiles from their run journals, without scanning.
+
+    Profiles whose last run finished are left alone. Returns {profile_name: result} for
+    the profiles that were resumed.
+    """
+    journals = {profile.name: RunJournal.load_unfinished(settings["run_journal_dir"], profile.name) for profile in profiles}
+    for profile in profiles:
+        if journals[profile.name] is None:
+            logging.info(f"[{profile.name}] Last run finished, nothing to resume")
+    profiles = [profile for profile in profiles if journals[profile.name] is not None]
+    if not profiles:
+        return {}
+    governor = _start_copy_engine(profiles, settings)
+    results = _run_profiles(profiles, {}, {}, settings, run_stamp or time.strftime("%Y%m%d_%H%M%S"), resumes=journals)
+    governor.stop()
+    return results
+
+
+def run_engine(profiles, settings, run_stamp=None, dry_run=False):
+    """Scan the hosts of all profiles once, then run the copy phase of every profile concurrently.
+
+    Profiles share the scan pool, the scan index and the process-wide copy engine, so the
+    per-tester and per-share limits hold across products. With the pipeline_copy setting
+    (and not dry_run), copying starts while the scan is still running (see _run_pipelined).
+    Returns {profile_name: result}.
+    """
+    run_stamp = run_stamp or time.strftime("%Y%m%d_%H%M%S")
+    governor = _start_copy_engine(profiles, settings)
+    scan_jobs, profile_jobs = build_scan_jobs(profiles)
+    logging.info(f"Running profiles {', '.join(profile.name for profile in profiles)}: "
+                 f"{sum(len(jobs) for jobs in profile_jobs.values())} source folders, {len(scan_jobs)} scans")
+    scan_index = ScanIndex(settings["scan_index_path"]) if settings["scan_index_path"] else None
+    pipelined = settings["pipeline_copy"] and not dry_run
+    if pipelined:
+        results = _run_pipelined(profiles, scan_jobs, profile_jobs, settings, run_stamp, scan_index)
+    else:
+        with span("scan", scans=len(scan_jobs)):
+            job_reports = scan_hosts(scan_jobs, settings["scan_workers"], settings["host_scan_timeout"], scan_index)
+    if scan_index is not None:
+        logging.info(f"Scan index '{settings['scan_index_path']}': {scan_index.hits} test folders unchanged, {scan_index.misses} probed")
+        scan_index.close()
+
+    if not pipelined:
+        results = _run_profiles(profiles, profile_jobs, job_reports, settings, run_stamp, dry_run)
+    governor.stop()
+    return results
+
+
+def _run_pipelined(profiles, scan_jobs, profile_jobs, settings, run_stamp, scan_index=None):
+    """Scan on a background thread and feed each profile's copy phase as the source folders report.
+
+    Each profile gets a CopyFeed that releases a destination folder once every source
+    folder that held it at the last scan (per the scan index; all of them without one)
+    has reported, so the run takes about as long as the slower of scan and copy instead
+    of their sum. Returns {profile_name: result}.
+    """
+    holders = scan_index.test_folder_hosts() if scan_index is not None else {}
+    feeds = {profile.name: CopyFeed(profile.source_folders,
+                                    {os.path.join(profile.destination_folder, relative): hosts
+                                     for relative, hosts in holders.items()},
+                                    settings["pipeline_queue_size"])
+             for profile in profiles}
+    job_profiles = {}  # {job_key: [(profile, source_folder)]}
+    for profile in profiles:
+        for source_folder, job_key in profile_jobs[profile.name]:
+            job_profiles.setdefault(job_key, []).append((profile, source_folder))
+
+    def on_report(job_key, report):
+        for profile, source_folder in job_profiles[job_key]:
+            feeds[profile.name].host_done(source_folder, rebase_report(report, profile.destination_folder))
+
+    def scan():
+        try:
+            with span("scan", scans=len(scan_jobs), pipelined=True):
+                scan_hosts(scan_jobs, settings["scan_workers"], settings["host_scan_timeout"], scan_index,
+                           on_report=on_report)
+        finally:
+            # Also ends the feeds if the scan itself failed, so no copy phase waits forever
+            for feed in feeds.values():
+                feed.finish()
+
+    scan_thread = threading.Thread(target=scan, name="pipeline-scan")
+    scan_thread.start()
+    results = _run_profiles(profiles, profile_jobs, {}, settings, run_stamp, feeds=feeds)
+    scan_thread.join()
+    return results
+
+
+def _pending_test_folders(report):
+    """Test folders of a scan report still waiting for a timestamp folder or their required file."""
+    return [path for path, reason in report["skipped"] if reason != "excluded name"]
+
+
+def _poll_watchers(watchers, poll_threads, timeout):
+    """Poll every due watcher on its own daemon thread; return {job_key: changed units}.
+
+    A poll still hanging on an unreachable share after timeout seconds counts as a failure
+    and its watcher is not polled again until that thread returns.
+    """
+    changes = {}
+    started = {}
+    now = time.time()
+    for job_key, watcher in watchers.items():
+        if not watcher.due(now) or (job_key in poll_threads and poll_threads[job_key].is_alive()):
+            continue
+
+        def poll(job_key=job_key, watcher=watcher):
+            changes[job_key] = watcher.poll()
+
+        started[job_key] = poll_threads[job_key] = threading.Thread(target=poll, name=f"poll-{job_key[0]}", daemon=True)
+        started[job_key].start()
+    deadline = time.time() + timeout
+    # Polls still hanging from earlier cycles were already counted as failures; waiting on
+    # them again would stall every cycle behind one unreachable tester
+    for job_key, thread in started.items():
+        thread.join(max(0.0, deadline - time.time()))
+        if thread.is_alive() and job_key not in changes:
+            watchers[job_key].record_failure(f"poll still running after {timeout} s")
+    return {job_key: units for job_key, units in changes.items() if units}
+
+
+def watch_engine(profiles, settings, stop_event=None, max_cycles=None):
+    """Keep the destinations current by polling the testers instead of running on a schedule.
+
+    After one full pass like run_engine, each source folder is polled for directory mtime
+    changes (see HostWatcher); a source folder with changed units is rescanned through the
+    scan index and only the changed units are copied. Runs until stop_event is set or
+    after max_cycles polls. Returns the number of polls.
+    The metrics files describe the last cycle only: after each export the cycle's totals
+    are logged as a summary and reset.
+    """
+    stop_event = stop_event or threading.Event()
+    started_at = time.time()
+    governor = _start_copy_engine(profiles, settings)
+    scan_jobs, profile_jobs = build_scan_jobs(profiles)
+    watchers = {job_key: HostWatcher(source_folder, scan_rules, settings["watch_poll_interval"], settings["watch_max_backoff"])
+                for job_key, (source_folder, _, scan_rules, _) in scan_jobs.items()}
+    poll_threads = {}
+    # The baseline is taken before the full pass so results landing during it are picked up by the first poll
+    _poll_watchers(watchers, poll_threads, settings["host_scan_timeout"])
+    logging.info(f"Watching profiles {', '.join(profile.name for profile in profiles)}: {len(scan_jobs)} source folders, "
+                 f"polled every {settings['watch_poll_interval']} s")
+    scan_index = ScanIndex(settings["scan_index_path"]) if settings["scan_index_path"] else None
+    cycle = 0
+    try:
+        with span("scan", scans=len(scan_jobs)):
+            job_reports = scan_hosts(scan_jobs, settings["scan_workers"], settings["host_scan_timeout"], scan_index)
+        for job_key, report in job_reports.items():
+            if report["status"] == "ok":
+                watchers[job_key].set_pending(_pending_test_folders(report))
+            elif report["status"] != "skipped":
+                watchers[job_key].record_failure(f"scan {report['status']}")
+        latest_results = _run_profiles(profiles, profile_jobs, job_reports, settings, time.strftime("%Y%m%d_%H%M%S"))
+        _export_metrics(settings, "watch", started_at, latest_results)
+        _end_watch_cycle(profiles, cycle)
+
+        while max_cycles is None or cycle < max_cycles:
+            if stop_event.wait(max(0.0, min(watcher.next_poll for watcher in watchers.values()) - time.time())):
+                break
+            cycle += 1
+            changes = _poll_watchers(watchers, poll_threads, settings["host_scan_timeout"])
+            if not changes:
+                continue
+            cycle_started_at = time.time()
+            logging.info(f"Watch poll {cycle}: changes in " + ", ".join(
+                f"'{job_key[0]}' ({', '.join(sorted(units))})" for job_key, units in changes.items()))
+            with span("watch_cycle", cycle=cycle, source_folders=len(changes)):
+                with span("scan", scans=len(changes)):
+                    new_reports = scan_hosts({job_key: scan_jobs[job_key] for job_key in changes},
+                                             settings["scan_workers"], settings["host_scan_timeout"], scan_index)
+                for job_key, report in new_reports.items():
+                    if report["status"] == "ok":
+                        job_reports[job_key] = report
+                        watchers[job_key].set_pending(_pending_test_folders(report))
+                    else:
+                        watchers[job_key].record_failure(f"scan {report['status']}")
+                        del changes[job_key]
+                dest_prefixes = {}
+                for profile in profiles:
+                    prefixes = [os.path.join(profile.destination_folder, unit)
+                                for _, job_key in profile_jobs[profile.name] for unit in sorted(changes.get(job_key, ()))]
+                    if prefixes:
+                        dest_prefixes[profile.name] = prefixes
+                affected = [profile for profile in profiles if profile.name in dest_prefixes]
+                results = _run_profiles(affected, profile_jobs, job_reports, settings, time.strftime("%Y%m%d_%H%M%S"),
+                                        dest_prefixes=dest_prefixes)
+            latest_results.update(results)
+            _export_metrics(settings, "watch", cycle_started_at, latest_results)
+            _end_watch_cycle(profiles, cycle)
+            for profile in affected:
+                if results[profile.name]["status"] != "ok":
+                    logging.error(f"[{profile.name}] Watch update failed after {results[profile.name]['elapsed']:.1f} s")
+                else:
+                    logging.info(f"[{profile.name}] Watch update: {results[profile.name]['timestamp_copies']} timestamp folders "
+                                 f"in {len(dest_prefixes[profile.name])} units, {results[profile.name]['elapsed']:.1f} s")
+    finally:
+        if scan_index is not None:
+            scan_index.close()
+        governor.stop()
+    return cycle
+
+
+def _end_watch_cycle(profiles, cycle):
+    """Log the totals of a watch cycle and start the next one from zero."""
+    log_summary(profiles=[profile.name for profile in profiles], watch=True, watch_cycle=cycle)
+    reset_totals()
+
+
+def main(argv=None):
+    """Run one or more product profiles from the config file in a single job."""
+    parser = argparse.ArgumentParser(description="Copy the latest valid run results of every product to the share.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="Profiles config file (default: %(default)s)")
+    parser.add_argument("--profile", action="append", dest="profiles",
+                        help="Profile to run; repeat for several (default: every enabled profile)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Scan and plan only: report what would be copied and how long it should take")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running: poll the testers and copy the units that changed (stop with Ctrl+C)")
+    parser.add_argument("--poll-interval", type=float, help="Seconds between polls in --watch mode")
+    parser.add_argument("--resume", action="store_true",
+                        help="Finish the last interrupted run of each profile from its journal instead of starting over")
+    args = parser.parse_args(argv)
+    if sum((args.watch, args.dry_run, args.resume)) > 1:
+        parser.error("--watch, --dry-run and --resume cannot be combined")
+
+    settings, profiles = load_config(args.config)
+    profiles = select_profiles(profiles, args.profiles)
+    if args.poll_interval:
+        settings["watch_poll_interval"] = args.poll_interval
+    _, listener = setup_run_logging(settings["log_dir"])
+    try:
+        return _run_and_report(args, profiles, settings)
+    finally:
+        listener.stop()
+
+
+def _run_and_report(args, profiles, settings):
+    started_at = time.time()
+    if not profiles:
+        logging.warning(f"No enabled profiles in '{args.config}'.")
+        return 1
+    if args.watch:
+        try:
+            watch_engine(profiles, settings)
+        except KeyboardInterrupt:
+            logging.info("Watch stopped.")
+        log_summary(profiles=[profile.name for profile in profiles], watch=True)
+        return 0
+
+    if args.resume:
+        results = resume_engine(profiles, settings)
+    else:
+        results = run_engine(profiles, settings, dry_run=args.dry_run)
+    failed = 0
+    for profile in profiles:
+        result = results.get(profile.name)
+        if result is None:
+            continue
+        if result["status"] != "ok":
+            failed += 1
+            logging.error(f"[{profile.name}] Profile failed after {result['elapsed']:.1f} s")
+            continue
+        if args.dry_run:
+            continue
+        if result["incomplete"]:
+            logging.warning(f"[{profile.name}] {result['incomplete']} folders are incomplete after {result['elapsed']:.1f} s; "
+                            f"rerun with --resume to finish them")
+        elif result["hosts_ok"] > 0:
+            logging.info(f"[{profile.name}] All desired folders and files from all processed sources are copied "
+                         f"({result['timestamp_copies']} timestamp folders in {result['elapsed']:.1f} s)")
+        else:
+            logging.warning(f"[{profile.name}] No source folders were processed successfully.")
+        if result["hosts_ok"] < result["hosts_total"]:
+            logging.warning(f"[{profile.name}] Only {result['hosts_ok']} out of {result['hosts_total']} source folders were processed.")
+
+    # Log the completion time
+    current_time = time.strftime("%H:%M:%S %Z, %Y-%m-%d", time.localtime())
+    logging.info(f"{'Dry run' if args.dry_run else 'Copy'} completed at {current_time} (e.g., 09:42 +08, 2025-09-17)")
+    log_summary(profiles=[profile.name for profile in profiles], failed_profiles=failed, dry_run=args.dry_run)
+    _export_metrics(settings, "dry_run" if args.dry_run else "resume" if args.resume else "run", started_at, results, failed)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,212 +1,7 @@
-import os
-import shutil
-import time
-import logging
-from datetime import datetime
+import sys
+from filterfx_engine import main
 
-# Define multiple source folders and a single destination
-source_folders = [
-    r"//PG07TCMV0080/c$/Results/NVL/S16C/A0", 
-    r"//PG07TCMV0081/c$/Results/NVL/S16C/A0", 
-    #r"//PG07TCMV0082/c$/Results/NVL/S16C/A0",
-    r"//PG07TCMV0083/c$/Results/NVL/S16C/A0",
-    r"//PG07TCMV0084/c$/Results/NVL/S16C/A0",
-    #r"//PG07TCMV0085/c$/Results/NVL/S16C/A0",
-    r"//PG07TCMV0086/c$/Results/NVL/S16C/A0",
-    r"//PG07TCMV0087/c$/Results/NVL/S16C/A0",
-    r"//PG07TCMV0088/c$/Results/NVL/S16C/A0",
-    #r"//PG07TCMV0089/c$/Results/NVL/S16C/A0",
-
-]
-destination_folder = r"U:/NVL/S16C/A0/results_production"
-
-# Required file keywords to check
-required_file_keywords = ["HotVmin.xlsx", "GNG.xlsx"]
-
-# Define custom log directory
-custom_log_dir = r"U:/users/Hs/script/Process-Improvement/runResultFilter/debuglog"
-os.makedirs(custom_log_dir, exist_ok=True)
-log_filename = os.path.join(custom_log_dir, f"copy_log_{time.strftime('%Y%m%d_%H%M%S')}.log")
-
-# === FIXED LOGGING SETUP WITH UTF-8 ENCODING ===
-file_handler = logging.FileHandler(log_filename, encoding='utf-8')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logging.basicConfig(level=logging.INFO, handlers=[file_handler, console_handler])
-# ================================================
-
-def get_latest_hotvmin_file(folder_path, keyword):
-    """Check if a folder contains a file with the required keyword and get the latest modified file."""
-    hotvmin_files = []
-    for root, _, files in os.walk(folder_path):
-        hotvmin_files.extend([os.path.join(root, f) for f in files if keyword in f])
-    if not hotvmin_files:
-        return None, False
-    latest_file = max(hotvmin_files, key=os.path.getmtime, default=None)
-    return latest_file, True
-
-def parse_timestamp_folder_name(folder_name):
-    """Parse timestamp from folder name (e.g., '2025.07.25_19.28.10') and return datetime object."""
-    try:
-        return datetime.strptime(folder_name, "%Y.%m.%d_%H.%M.%S")
-    except ValueError:
-        return None
-
-def get_latest_timestamp_folder(folder_path):
-    """Get the latest timestamp folder under a HotVmin or GNG folder."""
-    timestamp_folders = []
-    for item in os.listdir(folder_path):
-        item_path = os.path.join(folder_path, item)
-        if os.path.isdir(item_path):
-            timestamp = parse_timestamp_folder_name(item)
-            if timestamp:
-                timestamp_folders.append((item_path, timestamp))
-    if not timestamp_folders:
-        return None, None
-    latest_folder, latest_timestamp = max(timestamp_folders, key=lambda x: x[1])
-    return latest_folder, latest_timestamp
-
-def copy_with_timeout(source, dest, timeout=300):
-    """Copy directory with a timeout to prevent hanging."""
-    start_time = time.time()
-    try:
-        shutil.copytree(source, dest, dirs_exist_ok=True)
-        logging.info(f"Completed copy of '{os.path.basename(source)}' to '{dest}'")
-    except Exception as e:
-        elapsed_time = time.time() - start_time
-        if elapsed_time >= timeout:
-            logging.error(f"Copy of '{source}' to '{dest}' timed out after {timeout} seconds: {str(e)}")
-        else:
-            logging.error(f"Error copying '{source}' to '{dest}': {str(e)}")
-        raise
-
-try:
-    # Check if destination parent directory exists
-    destination_parent = os.path.dirname(destination_folder)
-    if not os.path.exists(destination_parent):
-        raise OSError(f"Parent directory '{destination_parent}' does not exist. Please create it first.")
-
-    # Create destination folder
-    os.makedirs(destination_folder, exist_ok=True)
-
-    # Dictionary to track the latest timestamp folder and its timestamp for each HotVmin/GNG folder across all paths
-    latest_timestamp_info = {}  # {dest_folder_path: (latest_folder, latest_timestamp, source_folder)}
-
-    # Process each source folder to find the latest timestamp
-    paths_processed = 0
-    total_paths = len(source_folders)
-    for source_folder in source_folders:
-        try:
-            if not os.path.isdir(source_folder):
-                logging.warning(f"Source folder '{source_folder}' is not accessible or does not exist. Skipping...")
-                continue
-
-            logging.info(f"Started processing source folder: {source_folder}")
-            for root, dirs, _ in os.walk(source_folder):
-                relative_path = os.path.relpath(root, source_folder)
-                if "M6" in relative_path or "M7" in relative_path:
-                    for dir_name in dirs:
-                        dir_full_path = os.path.join(root, dir_name)
-                        # Ignore the 99999999_999_+99_+99 folder and its subtrees
-                        if "99999999_999_+99_+99" in dir_full_path or "DOE" in dir_full_path:
-                            logging.info(f"Ignoring folder '{dir_full_path}' and its subtrees as it contains the excluded name '99999999_999_+99_+99'.")
-                            continue
-                        if "HotVmin" in dir_name or "GNG" in dir_name:
-                            latest_timestamp_folder, latest_timestamp = get_latest_timestamp_folder(dir_full_path)
-                            if latest_timestamp_folder:
-                                # Check for the presence of required files
-                                has_file = False
-                                for keyword in required_file_keywords:
-                                    latest_file, file_exists = get_latest_hotvmin_file(latest_timestamp_folder, keyword)
-                                    if file_exists:
-                                        has_file = True
-                                        break
-                                if not has_file:
-                                    logging.info(f"Ignoring folder '{dir_full_path}' as the latest timestamp folder lacks a '{keyword}' file.")
-                                    continue
-                                # Update latest timestamp info if newer
-                                dest_relative_path = os.path.join(os.path.relpath(root, source_folder), dir_name)
-                                dest_folder_path = os.path.join(destination_folder, dest_relative_path)
-                                current_latest = latest_timestamp_info.get(dest_folder_path, (None, None, None))
-                                if current_latest[1] is None or latest_timestamp > current_latest[1]:
-                                    latest_timestamp_info[dest_folder_path] = (latest_timestamp_folder, latest_timestamp, source_folder)
-                                    logging.info(f"Updated latest timestamp for '{dest_folder_path}' to '{os.path.basename(latest_timestamp_folder)}' from '{source_folder}' (modified: {time.ctime(os.path.getmtime(latest_timestamp_folder))})")
-
-            logging.info(f"Completed processing source folder: {source_folder}")
-            paths_processed += 1
-
-        except PermissionError:
-            logging.error(f"Permission denied accessing source folder '{source_folder}'. Check network credentials or access rights.")
-        except FileNotFoundError:
-            logging.error(f"Source folder '{source_folder}' not found. Verify network path and connectivity.")
-        except Exception as e:
-            logging.error(f"Unexpected error processing source folder '{source_folder}': {str(e)}")
-
-    # Copy the latest timestamp folders after processing all paths
-    for dest_folder_path, (latest_timestamp_folder, latest_timestamp, source_folder) in latest_timestamp_info.items():
-        try:
-            logging.info(f"Preparing to copy latest timestamp folder for '{dest_folder_path}' from '{source_folder}'")
-            if os.path.exists(dest_folder_path):
-                for item in os.listdir(dest_folder_path):
-                    item_path = os.path.join(dest_folder_path, item)
-                    if os.path.isdir(item_path):
-                        item_timestamp = parse_timestamp_folder_name(item)
-                        if item_timestamp:
-                            shutil.rmtree(item_path)
-                            logging.info(f"Removed timestamp folder '{item_path}'.")
-                dest_timestamp_folder = os.path.join(dest_folder_path, os.path.basename(latest_timestamp_folder))
-                if os.path.exists(dest_timestamp_folder):
-                    shutil.rmtree(dest_timestamp_folder)
-                    logging.info(f"Removed existing '{os.path.basename(dest_timestamp_folder)}' to replace with latest.")
-            else:
-                os.makedirs(dest_folder_path, exist_ok=True)
-            dest_timestamp_folder = os.path.join(dest_folder_path, os.path.basename(latest_timestamp_folder))
-            copy_with_timeout(latest_timestamp_folder, dest_timestamp_folder)
-            logging.info(f"Copied latest timestamp folder '{os.path.basename(latest_timestamp_folder)}' to '{dest_timestamp_folder}'")
-        except PermissionError:
-            logging.error(f"Permission denied while copying to '{dest_folder_path}'. Check access rights.")
-        except OSError as e:
-            logging.error(f"OSError while copying to '{dest_folder_path}': {str(e)}")
-        except Exception as e:
-            logging.error(f"Unexpected error copying to '{dest_folder_path}': {str(e)}")
-
-    # === NEW: Copy entire source "Shmoo" folder (if exists) under M6/M7 ===
-    logging.info("Starting additional Shmoo folder copy (all contents)...")
-    for source_folder in source_folders:
-        if not os.path.isdir(source_folder):
-            continue
-        for root, dirs, _ in os.walk(source_folder):
-            rel = os.path.relpath(root, source_folder)
-            if "M6" in rel or "M7" in rel:
-                shmoo_source = os.path.join(root, "Shmoo")
-                if os.path.exists(shmoo_source) and os.path.isdir(shmoo_source):
-                    # Build destination path: U:/.../M6/Shmoo or U:/.../M7/Shmoo
-                    dest_shmoo_path = os.path.join(destination_folder,
-                                                   os.path.relpath(root, source_folder), "Shmoo")
-                    os.makedirs(dest_shmoo_path, exist_ok=True)
-                    logging.info(f"Copying entire source Shmoo folder: {shmoo_source} → {dest_shmoo_path}")
-                    copy_with_timeout(shmoo_source, dest_shmoo_path)
-
-    if paths_processed > 0:
-        logging.info("All desired folders and files from all processed sources are copied")
-    else:
-        logging.warning("No source folders were processed successfully.")
-    if paths_processed < total_paths:
-        logging.warning(f"Only {paths_processed} out of {total_paths} source folders were processed.")
-
-    # Log the completion time
-    current_time = time.strftime("%H:%M:%S %Z, %Y-%m-%d", time.localtime())
-    logging.info(f"Copy completed at {current_time} (e.g., 09:42 +08, 2025-09-17)")
-
-except PermissionError:
-    logging.error(f"Error: Permission denied while accessing a source or '{destination_folder}'. Ensure you have appropriate rights.")
-except FileNotFoundError as e:
-    logging.error(f"Error: {str(e)}")
-except OSError as e:
-    logging.error(f"Error: Failed to copy folder. {str(e)}")
-except Exception as e:
-    logging.error(f"Unexpected error: {str(e)}")
\ No newline at end of file
+# Source folders, destination and scan rules of this product live in the "NVL_S16C_A0" profile of
+# filterfx_profiles.json; run filterfx_engine.py without --profile to copy every product in one job
+if __name__ == "__main__":
+    sys.exit(main(["--profile", "NVL_S16C_A0"] + sys.argv[1:]))
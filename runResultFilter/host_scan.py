@@ -0,0 +1,327 @@
+import os
+import time
+import queue
+import logging
+import itertools
+import threading
+from datetime import datetime
+from scan_walker import new_scan_stats, iter_scan_targets
+from run_log import count, log_event, add_host_totals
+from dir_cache import DirCache, list_dir, stat_path
+from scan_index import scan_key
+
+
+def parse_timestamp_folder_name(folder_name):
+    """Parse timestamp from folder name (e.g., '2025.07.25_19.28.10') and return datetime object."""
+    try:
+        return datetime.strptime(folder_name, "%Y.%m.%d_%H.%M.%S")
+    except ValueError:
+        return None
+
+def get_latest_timestamp_folder(folder_path, dir_cache=None):
+    """Get the latest timestamp folder under a HotVmin or GNG folder."""
+    timestamp_folders = []
+    for entry in list_dir(folder_path, dir_cache):
+        timestamp = parse_timestamp_folder_name(entry.name)
+        if timestamp and entry.is_dir():
+            timestamp_folders.append((entry.path, timestamp))
+    if not timestamp_folders:
+        return None, None
+    latest_folder, latest_timestamp = max(timestamp_folders, key=lambda x: x[1])
+    return latest_folder, latest_timestamp
+
+
+# Cached answers of find_required_file: {(folder, keywords): (folder_mtime, checked_at, found_path)}
+_required_file_cache = {}
+_required_file_cache_lock = threading.Lock()
+# A negative answer can go stale without the folder mtime changing (the workbook may land in a
+# subfolder), so it is only trusted for this long; a positive answer is kept until the mtime changes
+NEGATIVE_CACHE_SECONDS = 300
+
+
+def find_required_file(folder_path, keywords, dir_cache=None):
+    """Return the path of the first file in folder_path whose name contains one of keywords, or None.
+
+    Levels are listed breadth-first, so the workbook that normally sits directly in the
+    timestamp folder is found with a single listing and UnitLogs is never opened. The
+    answer is cached per (folder, mtime).
+    """
+    keywords = tuple(keywords)
+    try:
+        folder_mtime = stat_path(folder_path, dir_cache).st_mtime
+    except OSError:
+        return None
+    cache_key = (folder_path, keywords)
+    with _required_file_cache_lock:
+        cached = _required_file_cache.get(cache_key)
+    if cached is not None and cached[0] == folder_mtime:
+        if cached[2] is not None or time.time() - cached[1] < NEGATIVE_CACHE_SECONDS:
+            return cached[2]
+
+    found = None
+    level = [folder_path]
+    while level and found is None:
+        next_level = []
+        for current in level:
+            try:
+                for entry in list_dir(current, dir_cache):
+                    if entry.is_dir():
+                        next_level.append(entry.path)
+                    elif any(keyword in entry.name for keyword in keywords):
+                        found = entry.path
+                        break
+            except OSError as e:
+                logging.warning(f"Could not list folder '{current}': {str(e)}")
+            if found is not None:
+                break
+        level = next_level
+    with _required_file_cache_lock:
+        _required_file_cache[cache_key] = (folder_mtime, time.time(), found)
+    return found
+
+
+def probe_test_folder(dir_full_path, required_file_keywords, dir_cache=None):
+    """Select the latest timestamp folder of a test folder and check it holds a required file.
+
+    Returns (latest_folder, latest_timestamp, has_file, missing_keywords).
+    """
+    latest_timestamp_folder, latest_timestamp = get_latest_timestamp_folder(dir_full_path, dir_cache)
+    if not latest_timestamp_folder:
+        return None, None, False, None
+    # Check for the presence of required files
+    if find_required_file(latest_timestamp_folder, required_file_keywords, dir_cache):
+        return latest_timestamp_folder, latest_timestamp, True, None
+    return latest_timestamp_folder, latest_timestamp, False, "' or '".join(required_file_keywords)
+
+
+def scan_source_folder(source_folder, destination_folder, scan_rules, required_file_keywords,
+                       cancel_event=None, scan_index=None, dir_cache=None):
+    """Find the latest valid timestamp folder for every HotVmin/GNG folder of one tester.
+
+    Shmoo folders and skipped test folders are collected in the same walk. With a
+    ScanIndex, test folders whose mtime is unchanged since the last run reuse the stored
+    selection instead of being listed and walked again. With a DirCache, every listing and
+    folder stat of the scan goes through it.
+    Returns (host_info, shmoo_folders, skipped, scan_stats) where host_info is
+    {dest_folder_path: (latest_folder, latest_timestamp, modified_time)}, shmoo_folders is
+    a list of (shmoo_source, dest_shmoo_path) and skipped a list of (path, reason).
+    Raises TimeoutError if cancel_event is set while the tree is being walked.
+    """
+    host_info = {}
+    shmoo_folders = []
+    skipped = []
+    scan_stats = new_scan_stats()
+    index_key = scan_key(scan_rules, required_file_keywords) if scan_index is not None else None
+    for kind, root, dir_name, dir_full_path in iter_scan_targets(source_folder, scan_rules, scan_stats, dir_cache=dir_cache):
+        if cancel_event is not None and cancel_event.is_set():
+            raise TimeoutError(f"Scan of '{source_folder}' was cancelled")
+        dest_relative_path = os.path.join(os.path.relpath(root, source_folder), dir_name)
+        dest_folder_path = os.path.join(destination_folder, dest_relative_path)
+        if kind == "shmoo":
+            shmoo_folders.append((dir_full_path, dest_folder_path))
+            continue
+        if kind != "test":
+            continue  # a test folder below Shmoo; the Shmoo sync brings it over
+
+        try:
+            if scan_index is not None:
+                dir_mtime = stat_path(dir_full_path, dir_cache).st_mtime
+                cached = scan_index.lookup_test_folder(dir_full_path, dir_mtime, index_key)
+                if cached:
+                    host_info[dest_folder_path] = cached
+                    continue
+
+            latest_timestamp_folder, latest_timestamp, has_file, missing_keywords = probe_test_folder(
+                dir_full_path, required_file_keywords, dir_cache)
+            modified_time = stat_path(latest_timestamp_folder, dir_cache).st_mtime if has_file else None
+        except OSError as e:
+            # A test folder removed or locked mid-scan costs that folder, not the whole host
+            scan_stats["list_errors"] += 1
+            logging.warning(f"Could not read test folder '{dir_full_path}': {str(e)}")
+            skipped.append((dir_full_path, f"not readable: {str(e)}"))
+            continue
+        if scan_index is not None:
+            scan_index.record_test_folder(dir_full_path, source_folder, dest_folder_path, dir_mtime,
+                                          latest_timestamp_folder, latest_timestamp, modified_time, has_file, index_key)
+        if not latest_timestamp_folder:
+            skipped.append((dir_full_path, "no timestamp folder"))
+            continue
+        if not has_file:
+            count("folders_missing_required_file")
+            logging.debug(f"Ignoring folder '{dir_full_path}' as the latest timestamp folder lacks a '{missing_keywords}' file.")
+            skipped.append((dir_full_path, f"latest timestamp folder lacks a '{missing_keywords}' file"))
+            continue
+        host_info[dest_folder_path] = (latest_timestamp_folder, latest_timestamp, modified_time)
+    skipped.extend((pruned_path, "excluded name") for pruned_path in scan_stats["pruned_paths"])
+    return host_info, shmoo_folders, skipped, scan_stats
+
+
+def _run_host_scan(source_folder, destination_folder, scan_rules, required_file_keywords, cancel_event, scan_index=None,
+                   dir_cache=None):
+    """Scan one source folder and return its report dict; never raises."""
+    report = {"source_folder": source_folder, "status": "failed", "elapsed": 0.0,
+              "info": {}, "shmoo": [], "skipped": [], "stats": None}
+    start_time = time.time()
+    try:
+        if not os.path.isdir(source_folder):
+            logging.warning(f"Source folder '{source_folder}' is not accessible or does not exist. Skipping...")
+            report["status"] = "skipped"
+            return report
+        logging.debug(f"Started processing source folder: {source_folder}")
+        report["info"], report["shmoo"], report["skipped"], report["stats"] = scan_source_folder(
+            source_folder, destination_folder, scan_rules, required_file_keywords, cancel_event, scan_index, dir_cache)
+        report["status"] = "ok"
+    except TimeoutError:
+        report["status"] = "timeout"
+    except PermissionError:
+        logging.error(f"Permission denied accessing source folder '{source_folder}'. Check network credentials or access rights.")
+    except FileNotFoundError:
+        logging.error(f"Source folder '{source_folder}' not found. Verify network path and connectivity.")
+    except Exception as e:
+        logging.error(f"Unexpected error processing source folder '{source_folder}': {str(e)}")
+    finally:
+        report["elapsed"] = time.time() - start_time
+    return report
+
+
+def merge_host_results(host_reports, source_folders):
+    """Merge per-host results into latest_timestamp_info, newest timestamp wins.
+
+    Hosts are merged in source_folders order and ties keep the earlier host, so the
+    result is the same as a sequential scan no matter which host finished first.
+    """
+    latest_timestamp_info = {}  # {dest_folder_path: (latest_folder, latest_timestamp, source_folder)}
+    for source_folder in source_folders:
+        report = host_reports.get(source_folder)
+        if not report or report["status"] != "ok":
+            continue
+        for dest_folder_path in sorted(report["info"]):
+            latest_timestamp_folder, latest_timestamp, modified_time = report["info"][dest_folder_path]
+            current_latest = latest_timestamp_info.get(dest_folder_path, (None, None, None))
+            if current_latest[1] is None or latest_timestamp > current_latest[1]:
+                latest_timestamp_info[dest_folder_path] = (latest_timestamp_folder, latest_timestamp, source_folder)
+                logging.debug(f"Updated latest timestamp for '{dest_folder_path}' to '{os.path.basename(latest_timestamp_folder)}' from '{source_folder}' (modified: {time.ctime(modified_time)})")
+    return latest_timestamp_info
+
+
+def scan_hosts(scan_jobs, max_workers=4, host_timeout=600, scan_index=None, dir_cache=None, on_report=None):
+    """Run scan jobs on a bounded pool of worker threads and return {job_key: report}.
+
+    scan_jobs is {job_key: (source_folder, destination_folder, scan_rules, required_file_keywords)}.
+    Each job gets its own deadline of host_timeout seconds, counted from the moment a
+    worker picks it up. A job that misses its deadline is cancelled and reported as
+    'timeout', and a new worker takes over the queue from its thread; the workers are
+    daemon threads so a share that hangs inside a single network call cannot keep the
+    job alive, and the written-off worker exits if the call ever returns. scan_index (a ScanIndex) is shared by all
+    workers, and so is dir_cache (a DirCache, a new one per call if not given), so a
+    source folder listed by several jobs is only listed once. on_report, if given, is
+    called as on_report(job_key, report) as soon as each job has its report (timeouts
+    included), from the thread that produced it; it may block to hold the scan back.
+    """
+    dir_cache = dir_cache if dir_cache is not None else DirCache()
+    hits_before, misses_before = dir_cache.hits, dir_cache.misses
+    jobs = queue.Queue()
+    for job_key in scan_jobs:
+        jobs.put(job_key)
+    host_reports = {}
+    started = {}  # {job_key: (start_time, cancel_event)}
+    lock = threading.Lock()
+    done = threading.Condition(lock)
+    reporting = set()  # jobs whose on_report call has not returned yet
+
+    def worker():
+        while True:
+            try:
+                job_key = jobs.get_nowait()
+            except queue.Empty:
+                return
+            cancel_event = threading.Event()
+            with lock:
+                started[job_key] = (time.time(), cancel_event)
+            source_folder, destination_folder, scan_rules, required_file_keywords = scan_jobs[job_key]
+            report = _run_host_scan(source_folder, destination_folder, scan_rules, required_file_keywords,
+                                    cancel_event, scan_index, dir_cache)
+            with done:
+                first = job_key not in host_reports
+                if first:
+                    host_reports[job_key] = report
+                    if on_report is not None:
+                        reporting.add(job_key)
+                done.notify_all()
+            if not first:
+                return  # written off after a timeout; its replacement is already working the queue
+            if first and on_report is not None:
+                try:
+                    on_report(job_key, report)
+                finally:
+                    with done:
+                        reporting.discard(job_key)
+                        done.notify_all()
+
+    worker_names = itertools.count()
+
+    def start_worker():
+        threading.Thread(target=worker, name=f"host-scan-{next(worker_names)}", daemon=True).start()
+
+    for _ in range(max(1, min(max_workers, jobs.qsize()))):
+        start_worker()
+
+    while True:
+        timed_out = []
+        with done:
+            if len(host_reports) >= len(scan_jobs) and not reporting:
+                break
+            now = time.time()
+            for job_key, (start_time, cancel_event) in started.items():
+                if job_key in host_reports or now - start_time < host_timeout:
+                    continue
+                cancel_event.set()
+                source_folder = scan_jobs[job_key][0]
+                logging.error(f"Scan of source folder '{source_folder}' timed out after {host_timeout} seconds. Skipping...")
+                host_reports[job_key] = {"source_folder": source_folder, "status": "timeout",
+                                         "elapsed": now - start_time, "info": {}, "shmoo": [],
+                                         "skipped": [], "stats": None}
+                timed_out.append(job_key)
+                # The hung worker still holds its thread; without a replacement the jobs
+                # still queued would never start and could never time out
+                if not jobs.empty():
+                    start_worker()
+            if not timed_out:
+                done.wait(timeout=1.0)
+        if on_report is not None:
+            for job_key in timed_out:
+                on_report(job_key, host_reports[job_key])
+
+    for job_key in scan_jobs:
+        report = host_reports[job_key]
+        source_folder = report["source_folder"]
+        stats = report["stats"] or {}
+        fields = {"source_folder": source_folder, "status": report["status"], "elapsed": round(report["elapsed"], 3),
+                  "test_folders": len(report["info"]), "dirs_listed": stats.get("dirs_listed", 0),
+                  "dirs_pruned": stats.get("dirs_pruned", 0)}
+        add_host_totals("scan_host", source_folder, report["elapsed"], report["status"] != "ok",
+                        dirs_listed=stats.get("dirs_listed", 0))
+        count("dirs_listed", stats.get("dirs_listed", 0))
+        count({"ok": "hosts_scanned", "skipped": "hosts_unreachable"}.get(report["status"], "hosts_failed"))
+        if report["status"] == "ok":
+            log_event("scan_host", f"Completed processing source folder: {source_folder} in {report['elapsed']:.1f} s "
+                      f"({len(report['info'])} test folders, {stats['dirs_listed']} folders listed, {stats['dirs_pruned']} pruned)", **fields)
+        elif report["status"] != "skipped":
+            log_event("scan_host", f"Source folder '{source_folder}' finished with status '{report['status']}' after {report['elapsed']:.1f} s",
+                      logging.WARNING, **fields)
+    # Scans that timed out may still be running and using the cache; their calls are counted next time
+    count("dir_cache_hits", dir_cache.hits - hits_before)
+    count("dir_cache_misses", dir_cache.misses - misses_before)
+    return host_reports
+
+
+def scan_source_folders(source_folders, destination_folder, scan_rules, required_file_keywords,
+                        max_workers=4, host_timeout=600, scan_index=None):
+    """Scan all source folders of one destination in parallel (see scan_hosts).
+
+    Returns (latest_timestamp_info, host_reports) with host_reports keyed by source folder.
+    """
+    scan_jobs = {source_folder: (source_folder, destination_folder, scan_rules, required_file_keywords)
+                 for source_folder in source_folders}
+    host_reports = scan_hosts(scan_jobs, max_workers, host_timeout, scan_index)
+    return merge_host_results(host_reports, source_folders), host_reports
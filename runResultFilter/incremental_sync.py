@@ -0,0 +1,115 @@
+import os
+import shutil
+import hashlib
+import logging
+from copy_engine import get_copy_engine
+
+# Network shares (and FAT-formatted USB targets) may round mtimes to 2 seconds
+MTIME_TOLERANCE = 2.0
+
+
+def new_sync_stats():
+    """Return an empty counter dict filled in by sync_folder."""
+    return {"files_copied": 0, "bytes_copied": 0, "files_skipped": 0, "bytes_skipped": 0, "files_removed": 0}
+
+
+def build_manifest(folder_path, copy_filter=None):
+    """Return {relative_file_path: (size, mtime)} for every file below folder_path (allowed by copy_filter, if any)."""
+    manifest = {}
+    if not os.path.isdir(folder_path):
+        return manifest
+    pending = [(folder_path, "")]
+    while pending:
+        current, relative = pending.pop()
+        with os.scandir(current) as entries:
+            for entry in entries:
+                entry_relative = os.path.join(relative, entry.name) if relative else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append((entry.path, entry_relative))
+                elif entry.is_file():
+                    stat = entry.stat()
+                    if copy_filter is None or copy_filter.allows(entry.path, entry_relative, stat.st_size):
+                        manifest[entry_relative] = (stat.st_size, stat.st_mtime)
+    return manifest
+
+
+def file_is_current(source_entry, dest_entry, mtime_tolerance=MTIME_TOLERANCE):
+    """Check if a destination manifest entry matches the source entry by size and mtime."""
+    if dest_entry is None:
+        return False
+    source_size, source_mtime = source_entry
+    dest_size, dest_mtime = dest_entry
+    return source_size == dest_size and abs(source_mtime - dest_mtime) <= mtime_tolerance
+
+
+def file_digest(path, block_size=1024 * 1024):
+    """Return the SHA-1 hex digest of a file, read in large blocks."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def diff_manifests(source_manifest, dest_manifest, mtime_tolerance=MTIME_TOLERANCE):
+    """Compare two manifests and return (to_copy, unchanged, extra) lists of relative paths."""
+    to_copy, unchanged = [], []
+    for relative_path in sorted(source_manifest):
+        if file_is_current(source_manifest[relative_path], dest_manifest.get(relative_path), mtime_tolerance):
+            unchanged.append(relative_path)
+        else:
+            to_copy.append(relative_path)
+    extra = sorted(set(dest_manifest) - set(source_manifest))
+    return to_copy, unchanged, extra
+
+
+def sync_folder(source, dest, mirror=True, stats=None, mtime_tolerance=MTIME_TOLERANCE, timeout=None,
+                hash_check=False, copy_filter=None):
+    """Copy only new or changed files from source to dest.
+
+    Files are compared by relative name, size and mtime; changed files are copied on the
+    shared CopyEngine, which keeps the source mtime so the next run sees them as current.
+    With mirror=True, files that no longer exist in source are removed from dest so it
+    ends up identical to a fresh copytree. Copies still running after `timeout` seconds
+    are cancelled; whatever finished counts as current next time. With hash_check=True,
+    files that look current are also compared by content hash (reads both copies).
+    Source files rejected by copy_filter count as absent, so mirroring removes earlier
+    copies of them. Returns the stats dict.
+    """
+    stats = stats if stats is not None else new_sync_stats()
+    source_manifest = build_manifest(source, copy_filter)
+    dest_manifest = build_manifest(dest)
+    to_copy, unchanged, extra = diff_manifests(source_manifest, dest_manifest, mtime_tolerance)
+    if hash_check:
+        mismatched = [relative_path for relative_path in unchanged
+                      if file_digest(os.path.join(source, relative_path)) != file_digest(os.path.join(dest, relative_path))]
+        if mismatched:
+            logging.info(f"{len(mismatched)} files in '{dest}' match by size and mtime but not by content")
+            unchanged = [relative_path for relative_path in unchanged if relative_path not in set(mismatched)]
+            to_copy = sorted(to_copy + mismatched)
+
+    files = []
+    for relative_path in to_copy:
+        dest_path = os.path.join(dest, relative_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        size, mtime = source_manifest[relative_path]
+        files.append((os.path.join(source, relative_path), dest_path, size, mtime))
+    files_copied, bytes_copied, errors = get_copy_engine().copy_files(files, timeout)
+    stats["files_copied"] += files_copied
+    stats["bytes_copied"] += bytes_copied
+    if errors:
+        raise shutil.Error(errors)
+    for relative_path in unchanged:
+        stats["files_skipped"] += 1
+        stats["bytes_skipped"] += source_manifest[relative_path][0]
+    if mirror:
+        for relative_path in extra:
+            os.remove(os.path.join(dest, relative_path))
+            stats["files_removed"] += 1
+
+    if to_copy or (mirror and extra):
+        logging.debug(f"Synced '{os.path.basename(source)}' to '{dest}': {len(to_copy)} files copied, "
+                     f"{len(unchanged)} unchanged, {len(extra) if mirror else 0} removed")
+    else:
+        logging.debug(f"'{dest}' is already current ({len(unchanged)} files), nothing to copy")
+    return stats
@@ -0,0 +1,326 @@
+import os
+import re
+import sys
+import json
+import sqlite3
+import argparse
+import statistics
+from datetime import datetime
+
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "debuglog")
+# Kept with the other state files, out of the tracked debuglog folder
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), "filterfx", "run_history.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    path        TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    mtime       REAL NOT NULL,
+    format      TEXT NOT NULL,      -- 'text' (copy_log_*.log) or 'json' (copy_log_*.jsonl)
+    run_start   REAL,
+    run_end     REAL,
+    errors      INTEGER NOT NULL,
+    warnings    INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS host_scans (
+    log             TEXT NOT NULL,
+    source_folder   TEXT NOT NULL,
+    started         REAL,
+    elapsed         REAL,
+    status          TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS folder_copies (
+    log             TEXT NOT NULL,
+    source_folder   TEXT,
+    dest            TEXT NOT NULL,
+    started         REAL,
+    elapsed         REAL,
+    files           INTEGER,            -- only known for logs that report it
+    bytes           INTEGER,
+    status          TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS errors (
+    log         TEXT NOT NULL,
+    ts          REAL,
+    host        TEXT,
+    message     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_host_scans_log ON host_scans (log);
+CREATE INDEX IF NOT EXISTS idx_folder_copies_log ON folder_copies (log);
+CREATE INDEX IF NOT EXISTS idx_errors_log ON errors (log);
+"""
+
+# Text log lines look like '2026-03-18 08:00:09,829 - INFO - <message>'
+TEXT_LINE = re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) - (\w+) - (?:\[[^\]]*\] )?(.*)$")
+STARTED_SCAN = re.compile(r"^Started processing source folder: (.+)$")
+COMPLETED_SCAN = re.compile(r"^Completed processing source folder: (.+?)(?: in ([\d.]+) s \(.*\))?$")
+TIMED_OUT_SCAN = re.compile(r"^Scan of source folder '(.+)' timed out")
+SKIPPED_SCAN = re.compile(r"^Source folder '(.+)' is not accessible")
+PREPARING_COPY = re.compile(r"^Preparing to copy latest timestamp folder for '(.+)' from '(.+)'$")
+COMPLETED_COPY = re.compile(r"^Completed copy of '.+' to '(.+)'(?: \((\d+) files, (\d+) bytes in ([\d.]+) s\))?$")
+FAILED_COPY = re.compile(r"^(?:OSError while copying to|Permission denied while copying to|Unexpected error copying to) '(.+?)'")
+HOST = re.compile(r"//([A-Za-z0-9_.-]+)")
+
+
+def _parent(path):
+    """Return the folder a timestamp folder was copied into, for either path separator."""
+    path = path.rstrip("\\/")
+    return path[:max(path.rfind("\\"), path.rfind("/"))]
+
+
+def _host(text):
+    match = HOST.search(text)
+    return match.group(1).upper() if match else None
+
+
+def new_run(path, log_format):
+    return {"path": path, "format": log_format, "run_start": None, "run_end": None, "errors": 0, "warnings": 0,
+            "host_scans": [], "folder_copies": [], "error_messages": []}
+
+
+def parse_text_log(path):
+    """Parse a plain-text copy_log_*.log (every script version so far) into a run dict."""
+    run = new_run(path, "text")
+    scan_started = {}
+    copy_started = {}  # {dest_folder_path: (ts, source_folder)}
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            # Most lines are per-folder noise; skip them before running any regex
+            if "source folder" not in line and "copy" not in line and " - INFO - " in line:
+                if run["run_start"] is None:
+                    match = TEXT_LINE.match(line)
+                    if match:
+                        run["run_start"] = _timestamp(match)
+                last_line = line
+                continue
+            last_line = line
+            match = TEXT_LINE.match(line.rstrip("\n"))
+            if not match:
+                continue
+            ts = _timestamp(match)
+            level, message = match.group(3), match.group(4)
+            if run["run_start"] is None:
+                run["run_start"] = ts
+            if level == "ERROR":
+                run["errors"] += 1
+                run["error_messages"].append((ts, _host(message), message))
+                failed = FAILED_COPY.match(message)
+                if failed and failed.group(1) in copy_started:
+                    started, source_folder = copy_started.pop(failed.group(1))
+                    run["folder_copies"].append((source_folder, failed.group(1), started, ts - started, None, None, "failed"))
+                continue
+            if level == "WARNING":
+                run["warnings"] += 1
+            for pattern, handler in ((STARTED_SCAN, "started"), (COMPLETED_SCAN, "completed"), (TIMED_OUT_SCAN, "timeout"),
+                                     (SKIPPED_SCAN, "skipped"), (PREPARING_COPY, "preparing"), (COMPLETED_COPY, "copied")):
+                found = pattern.match(message)
+                if not found:
+                    continue
+                if handler == "started":
+                    scan_started[found.group(1)] = ts
+                elif handler == "completed":
+                    source_folder = found.group(1)
+                    started = scan_started.pop(source_folder, None)
+                    elapsed = float(found.group(2)) if found.group(2) else (ts - started if started else None)
+                    run["host_scans"].append((source_folder, started, elapsed, "ok"))
+                elif handler in ("timeout", "skipped"):
+                    started = scan_started.pop(found.group(1), None)
+                    run["host_scans"].append((found.group(1), started, ts - started if started else None, handler))
+                elif handler == "preparing":
+                    copy_started[found.group(1)] = (ts, found.group(2))
+                else:
+                    dest = found.group(1)
+                    dest_folder_path = _parent(dest)
+                    started, source_folder = copy_started.pop(dest_folder_path, (None, None))
+                    files = int(found.group(2)) if found.group(2) else None
+                    size = int(found.group(3)) if found.group(3) else None
+                    elapsed = float(found.group(4)) if found.group(4) else (ts - started if started else None)
+                    run["folder_copies"].append((source_folder, dest, started, elapsed, files, size, "ok"))
+                break
+    if run["run_start"] is not None:
+        match = TEXT_LINE.match(last_line.rstrip("\n"))
+        run["run_end"] = _timestamp(match) if match else None
+    return run
+
+
+def _timestamp(match):
+    return datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S").timestamp() + int(match.group(2)) / 1000.0
+
+
+def parse_json_log(path):
+    """Parse a structured copy_log_*.jsonl (see run_log.py) into a run dict."""
+    run = new_run(path, "json")
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            ts = record.get("ts")
+            if run["run_start"] is None:
+                run["run_start"] = ts
+            run["run_end"] = ts
+            level = record.get("level")
+            if level == "ERROR":
+                run["errors"] += 1
+                run["error_messages"].append((ts, _host(record.get("msg", "")), record.get("msg", "")))
+            elif level == "WARNING":
+                run["warnings"] += 1
+            event = record.get("event")
+            if event == "scan_host":
+                run["host_scans"].append((record["source_folder"], ts - record["elapsed"], record["elapsed"], record["status"]))
+            elif event == "span" and record.get("span") in ("copy_folder", "shmoo_folder"):
+                run["folder_copies"].append((record.get("source_folder"), record.get("dest"), ts - record["elapsed"],
+                                             record["elapsed"], record.get("files"), record.get("bytes"),
+                                             "ok" if record["status"] == "ok" else "failed"))
+    return run
+
+
+class RunHistory:
+    """SQLite table of parsed run logs; only new or changed log files are parsed again."""
+
+    def __init__(self, db_path):
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def update(self, log_dir):
+        """Parse every copy_log_* file of log_dir not yet in the table (or changed); return how many were parsed."""
+        known = {row[0]: (row[1], row[2]) for row in self.conn.execute("SELECT path, size, mtime FROM logs")}
+        parsed = 0
+        for name in sorted(os.listdir(log_dir)):
+            if not name.startswith("copy_log_") or not name.endswith((".log", ".jsonl")):
+                continue
+            path = os.path.join(log_dir, name)
+            stat = os.stat(path)
+            if known.get(name) == (stat.st_size, stat.st_mtime):
+                continue
+            run = parse_json_log(path) if name.endswith(".jsonl") else parse_text_log(path)
+            self._store(name, stat, run)
+            parsed += 1
+        self.conn.commit()
+        return parsed
+
+    def _store(self, name, stat, run):
+        for table in ("logs", "host_scans", "folder_copies", "errors"):
+            column = "path" if table == "logs" else "log"
+            self.conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (name,))
+        self.conn.execute("INSERT INTO logs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                          (name, stat.st_size, stat.st_mtime, run["format"], run["run_start"], run["run_end"],
+                           run["errors"], run["warnings"]))
+        self.conn.executemany("INSERT INTO host_scans VALUES (?, ?, ?, ?, ?)",
+                              [(name,) + row for row in run["host_scans"]])
+        self.conn.executemany("INSERT INTO folder_copies VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                              [(name,) + row for row in run["folder_copies"]])
+        self.conn.executemany("INSERT INTO errors VALUES (?, ?, ?, ?)",
+                              [(name,) + row for row in run["error_messages"]])
+
+    def query(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+
+def _median(values):
+    return statistics.median(values) if values else None
+
+
+def report(history, since=None, host=None, regression_factor=1.5, top=10):
+    """Return the printable analysis of every run since `since` (epoch seconds)."""
+    since = since or 0
+    lines = []
+    runs = history.query("SELECT path, run_start, run_end, errors, warnings FROM logs WHERE run_start >= ? ORDER BY run_start", (since,))
+    durations = [run_end - run_start for _, run_start, run_end, _, _ in runs if run_end and run_start]
+    lines.append(f"{len(runs)} runs, median duration {(_median(durations) or 0) / 60:.1f} min, "
+                 f"{sum(run[3] for run in runs)} errors, {sum(run[4] for run in runs)} warnings")
+
+    lines.append("")
+    lines.append(f"{'Source folder':<45} {'Scans':>5} {'Median s':>9} {'Max s':>8} {'Last s':>8} {'Not ok':>6}  Trend")
+    lines.append("=" * 100)
+    host_filter = f"%{host}%" if host else "%"
+    scans = history.query(
+        "SELECT s.source_folder, s.elapsed, s.status FROM host_scans s JOIN logs l ON l.path = s.log "
+        "WHERE l.run_start >= ? AND s.source_folder LIKE ? ORDER BY l.run_start", (since, host_filter))
+    by_host = {}
+    for source_folder, elapsed, status in scans:
+        by_host.setdefault(source_folder, []).append((elapsed, status))
+    for source_folder, entries in sorted(by_host.items(), key=lambda item: -(_median([e for e, s in item[1] if e is not None and s == "ok"]) or 0)):
+        times = [elapsed for elapsed, status in entries if elapsed is not None and status == "ok"]
+        not_ok = sum(1 for _, status in entries if status != "ok")
+        trend = ""
+        if len(times) >= 4:
+            baseline = _median(times[:-1])
+            if baseline and times[-1] > regression_factor * baseline and times[-1] - baseline > 5:
+                trend = f"REGRESSION x{times[-1] / baseline:.1f}"
+        median, longest, last = _median(times), max(times) if times else None, times[-1] if times else None
+        lines.append(f"{source_folder[-45:]:<45} {len(entries):>5} {_fmt(median):>9} {_fmt(longest):>8} {_fmt(last):>8} {not_ok:>6}  {trend}")
+
+    lines.append("")
+    copies = history.query(
+        "SELECT c.source_folder, c.dest, c.elapsed, c.files, c.bytes, c.status FROM folder_copies c "
+        "JOIN logs l ON l.path = c.log WHERE l.run_start >= ? AND IFNULL(c.source_folder, '') LIKE ?", (since, host_filter))
+    per_source = {}
+    for source_folder, dest, elapsed, files, size, status in copies:
+        entry = per_source.setdefault(source_folder or "(unknown)", {"copies": 0, "failed": 0, "seconds": 0.0, "bytes": 0, "timed_bytes": 0.0})
+        entry["copies"] += 1
+        entry["failed"] += status != "ok"
+        if elapsed is not None:
+            entry["seconds"] += elapsed
+            if size is not None:
+                entry["bytes"] += size
+                entry["timed_bytes"] += elapsed
+    lines.append(f"{'Source folder':<45} {'Copies':>6} {'Failed':>6} {'Median s/folder':>15} {'MB/s':>8}")
+    lines.append("=" * 100)
+    for source_folder, entry in sorted(per_source.items(), key=lambda item: -item[1]["seconds"]):
+        per_folder = [elapsed for src, _, elapsed, _, _, _ in copies if (src or "(unknown)") == source_folder and elapsed is not None]
+        rate = entry["bytes"] / entry["timed_bytes"] / 1024 / 1024 if entry["timed_bytes"] else None
+        lines.append(f"{source_folder[-45:]:<45} {entry['copies']:>6} {entry['failed']:>6} {_fmt(_median(per_folder)):>15} {_fmt(rate):>8}")
+
+    slowest = sorted((row for row in copies if row[2] is not None), key=lambda row: -row[2])[:top]
+    if slowest:
+        lines.append("")
+        lines.append("Slowest folder copies:")
+        for source_folder, dest, elapsed, files, size, status in slowest:
+            detail = f", {size / 1024 / 1024:.1f} MB" if size else ""
+            lines.append(f"  {elapsed:8.1f} s{detail}  {status:<6} {dest}")
+
+    errors = history.query(
+        "SELECT e.host, e.message FROM errors e JOIN logs l ON l.path = e.log WHERE l.run_start >= ?", (since,))
+    if errors:
+        lines.append("")
+        lines.append("Errors by host:")
+        by_error_host = {}
+        for error_host, message in errors:
+            by_error_host.setdefault(error_host or "(no host)", []).append(message)
+        for error_host, messages in sorted(by_error_host.items(), key=lambda item: -len(item[1]))[:top]:
+            lines.append(f"  {len(messages):>5}  {error_host}: {messages[-1][:100]}")
+    return "\n".join(lines)
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def main(argv=None):
+    """Load the debuglog archive into the run history table and print the analysis."""
+    parser = argparse.ArgumentParser(description="Analyze filterfx run logs.")
+    parser.add_argument("log_dir", nargs="?", default=DEFAULT_LOG_DIR, help="Folder with copy_log_* files (default: %(default)s)")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Run history database (default: %(default)s)")
+    parser.add_argument("--since", help="Only runs from this date on (YYYY-MM-DD)")
+    parser.add_argument("--host", help="Only source folders containing this text, e.g. PG07TCMV0081")
+    args = parser.parse_args(argv)
+
+    history = RunHistory(args.db)
+    parsed = history.update(args.log_dir)
+    since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    print(f"{parsed} new or changed log files parsed")
+    print(report(history, since, args.host))
+    history.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import os
+import re
+import json
+import time
+from copy_engine import host_key
+from run_log import run_totals
+
+PROM_NAME = "filterfx.prom"
+JSON_NAME = "filterfx_metrics.json"
+
+# Run counters that get their own HELP text; any other counter is exported as filterfx_<name>
+COUNTER_HELP = {
+    "hosts_scanned": "Source folders scanned successfully.",
+    "hosts_failed": "Source folder scans that failed or timed out.",
+    "hosts_unreachable": "Source folders that were not accessible.",
+    "dirs_listed": "Directories listed on the testers by the scan.",
+    "folders_selected": "Timestamp folders selected for copying.",
+    "folders_skipped": "Test folders skipped by the selection.",
+    "files_copied": "Files copied to the destination.",
+    "bytes_copied": "Bytes copied to the destination.",
+}
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _metric_name(name):
+    return "filterfx_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+class _Family:
+    """Lines of one gauge family in the text exposition format."""
+
+    def __init__(self, name, help_text):
+        self.lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        self.name = name
+
+    def add(self, value, **labels):
+        label_text = ",".join(f'{key}="{_label_value(label)}"' for key, label in labels.items())
+        self.lines.append(f"{self.name}{{{label_text}}} {value}" if labels else f"{self.name} {value}")
+
+
+def format_openmetrics(summary):
+    """Render a metrics summary (see build_summary) as an OpenMetrics text file, ending in '# EOF'."""
+    families = []
+
+    def family(name, help_text):
+        families.append(_Family(name, help_text))
+        return families[-1]
+
+    run = summary["run"]
+    family("filterfx_last_run_timestamp_seconds", "When the last run (or watch cycle) ended.").add(run["finished_at"])
+    family("filterfx_run_duration_seconds", "Duration of the last run.").add(round(run["finished_at"] - run["started_at"], 3))
+    family("filterfx_run_success", "1 if every profile of the last run succeeded, else 0.").add(int(not run["failed_profiles"]))
+    family("filterfx_run_info", "Kind of the last run (run, dry_run, resume or watch).").add(1, mode=run["mode"])
+    for name, value in sorted(summary["counters"].items()):
+        family(_metric_name(name), COUNTER_HELP.get(name, f"Run counter {name}.")).add(value)
+
+    phase_count = family("filterfx_phase_count", "Items timed per phase in the last run.")
+    phase_errors = family("filterfx_phase_errors", "Items per phase that ended in an error.")
+    phase_seconds = family("filterfx_phase_seconds", "Time spent per phase, summed over its items.")
+    phase_max = family("filterfx_phase_max_seconds", "Slowest item of each phase.")
+    for phase, totals in sorted(summary["phases"].items()):
+        phase_count.add(totals["count"], phase=phase)
+        phase_errors.add(totals["errors"], phase=phase)
+        phase_seconds.add(totals["total_s"], phase=phase)
+        phase_max.add(totals["max_s"], phase=phase)
+
+    host_seconds = family("filterfx_host_seconds", "Time spent per phase and source folder.")
+    host_errors = family("filterfx_host_errors", "Items per phase and source folder that ended in an error.")
+    host_bytes = family("filterfx_host_bytes", "Bytes copied per phase and source folder.")
+    host_rate = family("filterfx_host_bytes_per_second", "Copy throughput per phase and source folder.")
+    host_dirs = family("filterfx_host_dirs_listed", "Directories listed per source folder by the scan.")
+    for row in summary["hosts"]:
+        labels = {"phase": row["phase"], "host": row["host"], "source_folder": row["source_folder"]}
+        host_seconds.add(row["total_s"], **labels)
+        host_errors.add(row["errors"], **labels)
+        if "bytes" in row:
+            host_bytes.add(row["bytes"], **labels)
+            host_rate.add(round(row["bytes"] / row["total_s"], 1) if row["total_s"] else 0, **labels)
+        if "dirs_listed" in row:
+            host_dirs.add(row["dirs_listed"], **labels)
+
+    profile_success = family("filterfx_profile_success", "1 if the profile's last run succeeded, else 0.")
+    profile_seconds = family("filterfx_profile_duration_seconds", "Duration of the profile's last run.")
+    profile_hosts_ok = family("filterfx_profile_hosts_ok", "Source folders of the profile scanned successfully.")
+    profile_hosts = family("filterfx_profile_hosts", "Source folders of the profile.")
+    profile_copies = family("filterfx_profile_timestamp_copies", "Timestamp folders the profile selected.")
+    profile_incomplete = family("filterfx_profile_incomplete", "Folders of the profile left incomplete.")
+    for name, result in sorted(summary["profiles"].items()):
+        profile_success.add(int(result["status"] == "ok"), profile=name)
+        profile_seconds.add(round(result.get("elapsed", 0.0), 3), profile=name)
+        profile_hosts_ok.add(result["hosts_ok"], profile=name)
+        profile_hosts.add(result["hosts_total"], profile=name)
+        profile_copies.add(result["timestamp_copies"], profile=name)
+        profile_incomplete.add(result["incomplete"], profile=name)
+
+    return "\n".join(line for f in families if len(f.lines) > 2 for line in f.lines) + "\n# EOF\n"
+
+
+def build_summary(mode, started_at, results, failed_profiles=0):
+    """Collect the run's counters, phase and per-source-folder totals and profile results into one dict."""
+    counters, spans, hosts = run_totals()
+    return {
+        "run": {"mode": mode, "started_at": round(started_at, 3), "finished_at": round(time.time(), 3),
+                "failed_profiles": failed_profiles},
+        "counters": counters,
+        "phases": spans,
+        "hosts": [dict(totals, phase=phase, source_folder=source_folder, host=host_key(source_folder))
+                  for (phase, source_folder), totals in sorted(hosts.items())],
+        "profiles": {name: {key: value for key, value in result.items() if key != "estimate"}
+                     for name, result in results.items()},
+    }
+
+
+def _write_atomic(path, text):
+    # A scraper must never see a half-written file
+    with open(path + ".tmp", "w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+
+def write_metrics(metrics_dir, mode, started_at, results, failed_profiles=0):
+    """Write filterfx.prom (OpenMetrics, for a node_exporter textfile collector) and filterfx_metrics.json.
+
+    Both files are replaced at the end of every run; returns their paths.
+    """
+    os.makedirs(metrics_dir, exist_ok=True)
+    summary = build_summary(mode, started_at, results, failed_profiles)
+    prom_path = os.path.join(metrics_dir, PROM_NAME)
+    json_path = os.path.join(metrics_dir, JSON_NAME)
+    _write_atomic(prom_path, format_openmetrics(summary))
+    _write_atomic(json_path, json.dumps(summary, indent=1, default=str))
+    return prom_path, json_path
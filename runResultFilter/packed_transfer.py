@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tarfile
+import argparse
+import tempfile
+from copy_engine import PARTIAL_SUFFIX, build_file_list, get_copy_engine, copy_with_timeout
+from incremental_sync import build_manifest, diff_manifests
+
+# A packed timestamp folder holds only these two files
+ARCHIVE_NAMES = {None: "_filterfx_packed.tar", "gz": "_filterfx_packed.tar.gz"}
+INDEX_NAME = "_filterfx_packed.index.json"
+PACK_MODES = ("store",)
+
+
+def _check_deadline(source, deadline):
+    if deadline is not None and time.time() >= deadline:
+        raise TimeoutError(f"Packing '{source}' exceeded its deadline")
+
+
+class _ThrottledWriter:
+    """File object wrapper that passes every write through the copy governor and the deadline check."""
+
+    def __init__(self, raw, source, dest, governor, deadline):
+        self.raw = raw
+        self.source = source
+        self.dest = dest
+        self.governor = governor
+        self.deadline = deadline
+        self.written = 0
+
+    def write(self, data):
+        _check_deadline(self.source, self.deadline)
+        if self.governor is not None:
+            self.governor.throttle(self.source, self.dest, len(data))
+        self.raw.write(data)
+        self.written += len(data)
+        return len(data)
+
+
+class _DeadlineReader:
+    """Source file wrapper that checks the deadline before every read.
+
+    With compression the archive is written in bursts, so a slow source can be read for a
+    long time without a single write reaching _ThrottledWriter.
+    """
+
+    def __init__(self, raw, source, deadline):
+        self.raw = raw
+        self.source = source
+        self.deadline = deadline
+
+    def read(self, size=-1):
+        _check_deadline(self.source, self.deadline)
+        return self.raw.read(size)
+
+
+def find_archive(folder):
+    """Return the archive path of a packed folder, or None if the folder is not packed (or the pack is incomplete)."""
+    if not os.path.isfile(os.path.join(folder, INDEX_NAME)):
+        return None
+    for name in ARCHIVE_NAMES.values():
+        if os.path.isfile(os.path.join(folder, name)):
+            return os.path.join(folder, name)
+    return None
+
+
+def read_index(folder):
+    with open(os.path.join(folder, INDEX_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def pack_folder(source, dest, compression=None, timeout=None, copy_filter=None):
+    """Stream every file below source into one tar archive in dest and write its index next to it.
+
+    The destination sees two opens instead of one per file. The index lists each member
+    with its size, mtime and (for uncompressed archives) data offset, so single files can
+    be read back without unpacking. Only files allowed by copy_filter, if any, are packed.
+    Anything already in dest is removed first; an interrupted pack starts over.
+    Returns (files_packed, bytes_packed) counted on the source.
+    """
+    if compression not in ARCHIVE_NAMES:
+        raise ValueError(f"Unknown compression '{compression}'; use one of {sorted(filter(None, ARCHIVE_NAMES))} or none")
+    if os.path.isdir(dest):
+        shutil.rmtree(dest)
+    os.makedirs(dest)
+    deadline = time.time() + timeout if timeout else None
+    governor = get_copy_engine().governor
+    dirs, files = build_file_list(source, "", copy_filter)
+    archive_path = os.path.join(dest, ARCHIVE_NAMES[compression])
+    partial = archive_path + PARTIAL_SUFFIX
+    members = []
+    bytes_packed = 0
+    with open(partial, "wb") as raw:
+        writer = _ThrottledWriter(raw, source, dest, governor, deadline)
+        with tarfile.open(fileobj=writer, mode="w|" + (compression or "")) as tar:
+            for directory_source, relative in dirs[1:]:
+                tar.addfile(tar.gettarinfo(directory_source, arcname=relative.replace(os.sep, "/")))
+            for src, relative, size, mtime in files:
+                tarinfo = tar.gettarinfo(src, arcname=relative.replace(os.sep, "/"))
+                with open(src, "rb") as f:
+                    tar.addfile(tarinfo, _DeadlineReader(f, source, deadline))
+                # tar.offset now points past the member's data, which is padded to whole blocks
+                data_offset = tar.offset - -(-tarinfo.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+                members.append({"name": tarinfo.name, "size": tarinfo.size, "mtime": mtime,
+                                "offset": None if compression else data_offset})
+                bytes_packed += tarinfo.size
+    os.replace(partial, archive_path)
+    index = {"source": source, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "compression": compression,
+             "archive": os.path.basename(archive_path), "archive_bytes": writer.written, "members": members}
+    with open(os.path.join(dest, INDEX_NAME) + PARTIAL_SUFFIX, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    os.replace(os.path.join(dest, INDEX_NAME) + PARTIAL_SUFFIX, os.path.join(dest, INDEX_NAME))
+    shutil.copystat(source, dest)
+    return len(members), bytes_packed
+
+
+def expand_folder(folder):
+    """Unpack the archive of a packed folder in place and remove the archive and its index.
+
+    Meant for a local copy of a packed folder: on the share it would read the whole archive
+    back and write every file out again. Readers there use read_member instead.
+    """
+    archive_path = find_archive(folder)
+    if archive_path is None:
+        raise FileNotFoundError(f"'{folder}' is not a packed folder")
+    with tarfile.open(archive_path, "r|*") as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(folder, filter="data")
+        else:
+            tar.extractall(folder)
+    os.remove(archive_path)
+    os.remove(os.path.join(folder, INDEX_NAME))
+
+
+def packed_folder_current(source, folder, copy_filter=None):
+    """Check if a packed folder still holds exactly the files of source (allowed by copy_filter), by size and mtime."""
+    if find_archive(folder) is None:
+        return False
+    packed_manifest = {member["name"].replace("/", os.sep): (member["size"], member["mtime"])
+                       for member in read_index(folder)["members"]}
+    to_copy, _, extra = diff_manifests(build_manifest(source, copy_filter), packed_manifest)
+    return not to_copy and not extra
+
+
+def read_member(folder, name):
+    """Return the content of one file of a packed folder without unpacking the rest."""
+    index = read_index(folder)
+    name = name.replace(os.sep, "/")
+    member = next((member for member in index["members"] if member["name"] == name), None)
+    if member is None:
+        raise KeyError(f"'{name}' is not in the packed folder '{folder}'")
+    archive_path = os.path.join(folder, index["archive"])
+    if member["offset"] is not None:
+        with open(archive_path, "rb") as f:
+            f.seek(member["offset"])
+            return f.read(member["size"])
+    with tarfile.open(archive_path, "r:*") as tar:
+        return tar.extractfile(name).read()
+
+
+def benchmark(source, scratch, compression=None, timeout=3600):
+    """Transfer source into scratch with the copy engine and packed; return one row per method."""
+    rows = []
+    methods = [("copy engine", lambda dest: copy_with_timeout(source, dest, timeout)),
+               ("packed store", lambda dest: pack_folder(source, dest, compression, timeout))]
+    for number, (method, transfer) in enumerate(methods):
+        dest = os.path.join(scratch, f"filterfx_bench_{number}")
+        if os.path.exists(dest):
+            shutil.rmtree(dest)
+        start_time = time.time()
+        files, nbytes = transfer(dest)
+        elapsed = time.time() - start_time
+        rows.append({"method": method, "files": files, "bytes": nbytes, "seconds": elapsed,
+                     "files_per_sec": files / elapsed if elapsed else 0.0,
+                     "mb_per_sec": nbytes / elapsed / 1024 ** 2 if elapsed else 0.0})
+        shutil.rmtree(dest)
+    return rows
+
+
+def main(argv=None):
+    """List, read or expand packed timestamp folders, or benchmark packed against plain copies."""
+    parser = argparse.ArgumentParser(description="Work with timestamp folders copied in packed mode.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="List the files of a packed folder")
+    list_parser.add_argument("folder")
+    extract_parser = commands.add_parser("extract", help="Write one file of a packed folder to --output (default: stdout)")
+    extract_parser.add_argument("folder")
+    extract_parser.add_argument("member", help="Path inside the folder, e.g. UnitLogs/x/y.log")
+    extract_parser.add_argument("--output")
+    expand_parser = commands.add_parser("expand", help="Unpack a packed folder in place (a local copy, not one on the share)")
+    expand_parser.add_argument("folder")
+    bench_parser = commands.add_parser("bench", help="Time copy engine vs. packed transfer of one folder")
+    bench_parser.add_argument("source", help="Timestamp folder to transfer")
+    bench_parser.add_argument("--scratch", default=tempfile.gettempdir(),
+                              help="Folder to transfer into, ideally on the destination share (default: %(default)s)")
+    bench_parser.add_argument("--compression", choices=[name for name in ARCHIVE_NAMES if name])
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        index = read_index(args.folder)
+        for member in index["members"]:
+            print(f"{member['size']:>12}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(member['mtime']))}  {member['name']}")
+        print(f"{len(index['members'])} files, {sum(m['size'] for m in index['members'])} bytes "
+              f"in {index['archive']} ({index['archive_bytes']} bytes)")
+    elif args.command == "extract":
+        data = read_member(args.folder, args.member)
+        if args.output:
+            with open(args.output, "wb") as f:
+                f.write(data)
+        else:
+            sys.stdout.buffer.write(data)
+    elif args.command == "expand":
+        expand_folder(args.folder)
+    else:
+        print(f"{'method':<14} {'files':>7} {'MiB':>9} {'seconds':>9} {'files/s':>9} {'MiB/s':>8}")
+        for row in benchmark(args.source, args.scratch, args.compression):
+            print(f"{row['method']:<14} {row['files']:>7} {row['bytes'] / 1024 ** 2:>9.1f} {row['seconds']:>9.2f} "
+                  f"{row['files_per_sec']:>9.0f} {row['mb_per_sec']:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import queue
+import threading
+from work_plan import TimestampCopy
+
+_DONE = object()
+
+
+class CopyFeed:
+    """Hands one profile's timestamp folders to its copy phase while the scan is still running.
+
+    The scan calls host_done once per source folder of the profile. A destination folder
+    is released as soon as every source folder that could hold it has reported: those the
+    scan index saw holding it last time, or all of them for a folder the index does not
+    know. The released folder is the one the work plan would pick from the reports so far
+    (newest timestamp wins, ties keep the earlier source folder); if a source folder the
+    index did not expect reports a newer one later, that one is released too. Released
+    folders wait in a queue of at most maxsize items, so a scan that runs ahead of the
+    copy is held back instead of piling up work. Iterating the feed yields TimestampCopy items until
+    the scan is finished; host_reports then holds every source folder's report.
+    """
+
+    def __init__(self, source_folders, holders=None, maxsize=256):
+        self.source_folders = list(dict.fromkeys(source_folders))
+        # {dest_folder_path: {source_folder}}, limited to this profile's source folders
+        self.holders = {dest_folder_path: hosts & set(self.source_folders)
+                        for dest_folder_path, hosts in (holders or {}).items()}
+        self.host_reports = {}
+        self.pending = set()
+        self.released = {}  # {dest_folder_path: latest_folder released for it}
+        self.finished = False
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=max(1, maxsize))
+        self.abandoned = threading.Event()
+
+    def _select(self, dest_folder_path):
+        best = None
+        for source_folder in self.source_folders:
+            report = self.host_reports.get(source_folder)
+            if not report or report["status"] != "ok" or dest_folder_path not in report["info"]:
+                continue
+            latest_folder, latest_timestamp, _ = report["info"][dest_folder_path]
+            if best is None or latest_timestamp > best[1]:
+                best = (latest_folder, latest_timestamp, source_folder)
+        return TimestampCopy(dest_folder_path, best[2], best[0], best[1].isoformat())
+
+    def _put(self, item):
+        # Never blocks for good: once the copy side has given up, items are dropped
+        while not self.abandoned.is_set():
+            try:
+                self.queue.put(item, timeout=1.0)
+                return
+            except queue.Full:
+                continue
+
+    def _release(self, ready):
+        self.pending -= ready
+        for dest_folder_path in sorted(ready):
+            item = self._select(dest_folder_path)
+            # A folder reported again by a later source folder goes out again only if that changed the pick
+            if self.released.get(dest_folder_path) != item.latest_folder:
+                self.released[dest_folder_path] = item.latest_folder
+                self._put(item)
+
+    def host_done(self, source_folder, report):
+        """Take the (rebased) scan report of one source folder and release what it completes."""
+        with self.lock:
+            if self.finished or source_folder in self.host_reports:
+                return
+            self.host_reports[source_folder] = report
+            if report["status"] == "ok":
+                self.pending.update(report["info"])
+            if set(self.source_folders) <= set(self.host_reports):
+                self._finish()
+                return
+            reported = set(self.host_reports)
+            self._release({dest_folder_path for dest_folder_path in self.pending
+                           if self.holders.get(dest_folder_path) and self.holders[dest_folder_path] <= reported})
+
+    def _finish(self):
+        self.finished = True
+        self._release(set(self.pending))
+        self._put(_DONE)
+
+    def finish(self):
+        """Release everything still pending and end the feed; called once the scan is over."""
+        with self.lock:
+            if not self.finished:
+                self._finish()
+
+    def close(self):
+        """Stop accepting work from the scan (the copy side is done with the feed)."""
+        self.abandoned.set()
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                return
+            yield item
@@ -0,0 +1,355 @@
+import io
+import os
+import re
+import sys
+import time
+import sqlite3
+import logging
+import argparse
+from datetime import date, datetime, time as datetime_time
+from concurrent.futures import ProcessPoolExecutor
+from copy_engine import host_key
+from staged_swap import TRASH_DIR_NAME, STAGING_PREFIX
+from packed_transfer import INDEX_NAME, find_archive, read_index, read_member
+
+# Sheets read from a workbook, by the first key found in its name (case-insensitive, so
+# HotGNG.xlsx is read as GNG), and the columns kept from them (None keeps every column).
+# GNG workbooks keep their results on the Marionette sheet, as thermalProfilingGraphGenerator reads them
+DEFAULT_SHEETS = {
+    "GNG": {"ExecuteContent_Marionette_GNG": None},
+    "HotVmin": {"SearchVoltage Results": None},
+}
+DEFAULT_KEYWORDS = ("HotVmin.xlsx", "GNG.xlsx")
+ROLLUP_OUTPUTS = ("sqlite", "parquet")
+# Shmoo is walked: its HotVmin/GNG test folders are synced whole and hold results too
+SKIPPED_FOLDERS = {"UnitLogs", TRASH_DIR_NAME}
+KEY_COLUMNS = ("workbook_id", "host", "unit", "test", "timestamp", "row_number")
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workbooks (
+    id          INTEGER PRIMARY KEY,
+    path        TEXT UNIQUE NOT NULL,   -- workbook on the share (for packed folders: folder/member)
+    size        INTEGER NOT NULL,
+    mtime       REAL NOT NULL,
+    host        TEXT,                   -- tester the timestamp folder was copied from, if known
+    unit        TEXT NOT NULL,
+    test        TEXT NOT NULL,
+    timestamp   TEXT NOT NULL,
+    rows        INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_workbooks_unit ON workbooks (unit, test);
+"""
+
+
+def find_workbooks(destination_folder, keywords=DEFAULT_KEYWORDS):
+    """Yield (path, unit, test, timestamp, size, mtime, packed_folder) for every workbook below destination_folder.
+
+    A folder holding a workbook (or a packed archive) is a timestamp folder: its parent is
+    the test folder and the first folder below destination_folder the unit. Timestamp
+    folders, UnitLogs, the trash and staging folders are not walked into.
+    Workbooks of a packed folder are taken from its index, with packed_folder set.
+    """
+    def is_workbook(name):
+        return not name.startswith("~$") and any(keyword in name for keyword in keywords)
+
+    pending = [destination_folder]
+    while pending:
+        folder = pending.pop()
+        with os.scandir(folder) as entries:
+            entries = list(entries)
+        relative_parts = os.path.relpath(folder, destination_folder).split(os.sep)
+        keys = (relative_parts[0], relative_parts[-2], relative_parts[-1]) if len(relative_parts) >= 3 else None
+        if keys is not None and any(entry.name == INDEX_NAME for entry in entries) and find_archive(folder):
+            for member in read_index(folder)["members"]:
+                if "/" not in member["name"] and is_workbook(member["name"]):
+                    yield (os.path.join(folder, member["name"]), *keys, member["size"], member["mtime"], folder)
+            continue
+        workbooks = [entry for entry in entries if entry.is_file() and is_workbook(entry.name)]
+        if keys is not None and workbooks:
+            for entry in workbooks:
+                stat = entry.stat()
+                yield entry.path, *keys, stat.st_size, stat.st_mtime, None
+            continue
+        pending.extend(sorted((entry.path for entry in entries if entry.is_dir() and entry.name not in SKIPPED_FOLDERS
+                               and not entry.name.startswith(STAGING_PREFIX)), reverse=True))
+
+
+def _cell(value):
+    """Convert a cell to something both SQLite and Parquet store as is."""
+    if isinstance(value, (datetime, date, datetime_time)):
+        return value.isoformat()
+    return value
+
+
+def read_workbook(path, sheets, packed_folder=None):
+    """Read the wanted sheets of one workbook; return {sheet: (columns, rows)}.
+
+    openpyxl's read-only mode streams the sheet XML, so only the requested sheets are
+    parsed and only the kept columns are held in memory. Sheets missing from the
+    workbook are left out of the result.
+    """
+    from openpyxl import load_workbook  # only the rollup needs openpyxl
+
+    source = io.BytesIO(read_member(packed_folder, os.path.basename(path))) if packed_folder else path
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        result = {}
+        for sheet, wanted in sheets.items():
+            if sheet not in workbook.sheetnames:
+                continue
+            rows = workbook[sheet].iter_rows(values_only=True)
+            header = [str(name).strip() if name is not None else "" for name in next(rows, ())]
+            keep = [position for position, name in enumerate(header) if name and (wanted is None or name in wanted)]
+            columns = _unique_columns([header[position] for position in keep])
+            data = []
+            for row in rows:
+                values = [_cell(row[position]) if position < len(row) else None for position in keep]
+                if any(value is not None for value in values):
+                    data.append(values)
+            result[sheet] = (columns, data)
+        return result
+    finally:
+        workbook.close()
+
+
+def _unique_columns(names):
+    """Rename columns that repeat (ignoring case, as SQLite does) or clash with a key column: Test -> Test_2."""
+    used = set(KEY_COLUMNS)
+    columns = []
+    for name in names:
+        unique, number = name, 1
+        while unique.lower() in used:
+            number += 1
+            unique = f"{name}_{number}"
+        used.add(unique.lower())
+        columns.append(unique)
+    return columns
+
+
+def sheets_for(workbook_name, sheets):
+    """Return the {sheet: columns} of sheets (keyed by workbook name keyword) that apply to a workbook, or None."""
+    name = workbook_name.lower()
+    return next((wanted for keyword, wanted in sheets.items() if keyword.lower() in name), None)
+
+
+def _read_job(job):
+    path, sheets, packed_folder = job
+    try:
+        return path, read_workbook(path, sheets, packed_folder), None
+    except Exception as e:  # a broken workbook must not stop the rollup
+        return path, None, str(e)
+
+
+def _slug(name):
+    return re.sub(r"[^0-9A-Za-z]+", "_", name).strip("_").lower()
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class SqliteSink:
+    """Stores the rows of each sheet in a table of the state database (sheet_<name>), one row per sheet row."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.columns = {}
+
+    def _table(self, sheet, columns):
+        table = "sheet_" + _slug(sheet)
+        if table not in self.columns:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (workbook_id INTEGER NOT NULL, host TEXT, unit TEXT, "
+                              f"test TEXT, timestamp TEXT, row_number INTEGER)")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_workbook ON {table} (workbook_id)")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_unit ON {table} (unit, test)")
+            self.columns[table] = {row[1].lower() for row in self.conn.execute(f"PRAGMA table_info({table})")}
+        for column in columns:
+            if column.lower() not in self.columns[table]:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {_quote(column)}")
+                self.columns[table].add(column.lower())
+        return table
+
+    def remove(self, workbook_id, keys):
+        for (table,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'sheet_%'").fetchall():
+            self.conn.execute(f"DELETE FROM {table} WHERE workbook_id = ?", (workbook_id,))
+
+    def write(self, workbook_id, keys, sheet, columns, rows):
+        table = self._table(sheet, columns)
+        sql = (f"INSERT INTO {table} ({', '.join(KEY_COLUMNS + tuple(_quote(name) for name in columns))}) "
+               f"VALUES ({', '.join('?' * (len(KEY_COLUMNS) + len(columns)))})")
+        self.conn.executemany(sql, ((workbook_id, *keys, row_number, *row) for row_number, row in enumerate(rows, 1)))
+
+
+class ParquetSink:
+    """Writes one Parquet file per workbook and sheet under dataset_dir/<sheet>/unit=<unit>/test=<test>/.
+
+    Replacing a changed workbook rewrites only its own files. Needs pyarrow.
+    """
+
+    def __init__(self, dataset_dir):
+        import pyarrow  # noqa: F401 -- fail early if the optional dependency is missing
+        self.dataset_dir = dataset_dir
+
+    def _path(self, workbook_id, keys, sheet_slug):
+        _, unit, test, timestamp = keys
+        return os.path.join(self.dataset_dir, sheet_slug, f"unit={unit}", f"test={test}", f"wb{workbook_id}_{timestamp}.parquet")
+
+    def remove(self, workbook_id, keys):
+        if not os.path.isdir(self.dataset_dir):
+            return
+        for sheet_slug in os.listdir(self.dataset_dir):
+            path = self._path(workbook_id, keys, sheet_slug)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def write(self, workbook_id, keys, sheet, columns, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        host, unit, test, timestamp = keys
+        data = {"workbook_id": [workbook_id] * len(rows), "host": [host] * len(rows), "unit": [unit] * len(rows),
+                "test": [test] * len(rows), "timestamp": [timestamp] * len(rows),
+                "row_number": list(range(1, len(rows) + 1))}
+        for position, column in enumerate(columns):
+            values = [row[position] for row in rows]
+            kinds = {bool if isinstance(value, bool) else float if isinstance(value, (int, float)) else str
+                     for value in values if value is not None}
+            if len(kinds) > 1:
+                # Mixed columns are stored as text so every file of a sheet has a usable schema
+                values = [None if value is None else str(value) for value in values]
+            data[column] = values
+        path = self._path(workbook_id, keys, _slug(sheet))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # host is often unknown; give it a type so files with and without it share a schema
+        table = pa.table(data)
+        table = table.cast(table.schema.set(1, pa.field("host", pa.string())))
+        pq.write_table(table, path + ".partial", compression="zstd")
+        os.replace(path + ".partial", path)
+
+
+def _source_hosts(scan_index_path):
+    """Return {(unit, test, timestamp): tester host} from the scan index, to tag rows with the host they came from."""
+    if not scan_index_path or not os.path.exists(scan_index_path):
+        return {}
+    conn = sqlite3.connect(scan_index_path)
+    try:
+        return {(unit, test, os.path.basename(latest_folder)): host_key(source_folder)
+                for unit, test, latest_folder, source_folder in conn.execute(
+                    "SELECT unit, test, latest_folder, source_folder FROM test_folders WHERE latest_folder IS NOT NULL")}
+    finally:
+        conn.close()
+
+
+def compile_rollup(destination_folder, state_path, sheets=None, keywords=DEFAULT_KEYWORDS, output="sqlite",
+                   dataset_dir=None, scan_index_path=None, workers=None):
+    """Bring the rollup of destination_folder up to date and return a stats dict.
+
+    Workbooks are tracked by size and mtime in the state database; only new or changed
+    workbooks, and those that could not be read last time, are read (in parallel worker
+    processes), and rows of workbooks that left the
+    destination are dropped. sheets is {workbook name keyword: {sheet: columns}} (see
+    DEFAULT_SHEETS); a workbook that matches no keyword, or has none of its sheets, is
+    logged and counted in "no_sheet". output is "sqlite" (rows in the state database) or
+    "parquet" (files under dataset_dir, state still in the database).
+    """
+    sheets = sheets or DEFAULT_SHEETS
+    if os.path.dirname(state_path):
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    conn = sqlite3.connect(state_path)
+    conn.executescript(STATE_SCHEMA)
+    sink = SqliteSink(conn) if output == "sqlite" else ParquetSink(dataset_dir or os.path.splitext(state_path)[0] + "_parquet")
+    stats = {"workbooks": 0, "unchanged": 0, "ingested": 0, "removed": 0, "failed": 0, "no_sheet": 0, "rows": 0,
+             "elapsed": 0.0}
+    start_time = time.time()
+    hosts = _source_hosts(scan_index_path)
+
+    known = {row[1]: (row[0], row[2], row[3], row[4:])
+             for row in conn.execute("SELECT id, path, size, mtime, host, unit, test, timestamp FROM workbooks")}
+    # A workbook that could not be read (e.g. caught while the tester was still writing it) is
+    # tried again on every run, even if its size and mtime have not changed since
+    failed_before = {row[0] for row in conn.execute("SELECT path FROM workbooks WHERE error IS NOT NULL")}
+    seen = set()
+    jobs = {}
+    for path, unit, test, timestamp, size, mtime, packed_folder in find_workbooks(destination_folder, keywords):
+        stats["workbooks"] += 1
+        seen.add(path)
+        if path in known and known[path][1:3] == (size, mtime) and path not in failed_before:
+            stats["unchanged"] += 1
+            continue
+        host = hosts.get((unit, test, timestamp))
+        jobs[path] = ((path, sheets_for(os.path.basename(path), sheets) or {}, packed_folder),
+                      (host, unit, test, timestamp), size, mtime)
+
+    for path in set(known) - seen:
+        sink.remove(known[path][0], known[path][3])
+        conn.execute("DELETE FROM workbooks WHERE id = ?", (known[path][0],))
+        stats["removed"] += 1
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, data, error in pool.map(_read_job, [job for job, _, _, _ in jobs.values()], chunksize=4):
+                _, keys, size, mtime = jobs[path]
+                if path in known:
+                    sink.remove(known[path][0], known[path][3])
+                row_count = sum(len(rows) for _, rows in (data or {}).values())
+                workbook_id = conn.execute(
+                    "INSERT INTO workbooks (path, size, mtime, host, unit, test, timestamp, rows, error, ingested_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(path) DO UPDATE SET size = excluded.size, "
+                    "mtime = excluded.mtime, host = excluded.host, rows = excluded.rows, error = excluded.error, "
+                    "ingested_at = excluded.ingested_at RETURNING id",
+                    (path, size, mtime, *keys, row_count, error, time.time())).fetchone()[0]
+                if error is not None:
+                    logging.warning(f"Could not read workbook '{path}': {error}")
+                    stats["failed"] += 1
+                    continue
+                if not data:
+                    wanted = sheets_for(os.path.basename(path), sheets)
+                    logging.warning(f"Workbook '{path}' has none of the sheets "
+                                    f"{', '.join(wanted) if wanted else '(no sheets configured for its name)'}")
+                    stats["no_sheet"] += 1
+                for sheet, (columns, rows) in data.items():
+                    sink.write(workbook_id, keys, sheet, columns, rows)
+                stats["ingested"] += 1
+                stats["rows"] += row_count
+                conn.commit()
+    conn.commit()
+    conn.close()
+    stats["elapsed"] = time.time() - start_time
+    return stats
+
+
+def main(argv=None):
+    """Build or update the rollup of a destination folder."""
+    parser = argparse.ArgumentParser(description="Compile the HotVmin/GNG workbooks under a destination into a rollup dataset.")
+    parser.add_argument("destination_folder", help="Destination of a profile, e.g. U:/NVL/HX/B0/results_production")
+    parser.add_argument("--db", help="State (and, with --output sqlite, data) database (default: rollup.sqlite in the destination's parent)")
+    parser.add_argument("--output", choices=ROLLUP_OUTPUTS, default="sqlite")
+    parser.add_argument("--dataset", help="Parquet dataset folder (default: next to the database)")
+    parser.add_argument("--sheet", action="append",
+                        help="Sheet to read from every workbook (repeatable; default: %s)"
+                             % ", ".join(f"{sheet} for *{keyword}*" for keyword, wanted in DEFAULT_SHEETS.items() for sheet in wanted))
+    parser.add_argument("--columns", help="Comma-separated columns to keep from every sheet (default: all)")
+    parser.add_argument("--scan-index", default=os.path.expanduser("~/filterfx/scan_index.sqlite"),
+                        help="Scan index used to tag rows with their tester (default: %(default)s)")
+    parser.add_argument("--workers", type=int, help="Workbook reader processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    columns = [column.strip() for column in args.columns.split(",")] if args.columns else None
+    if args.sheet:
+        sheets = {"": {sheet: columns for sheet in args.sheet}}
+    else:
+        sheets = {keyword: {sheet: columns for sheet in wanted} for keyword, wanted in DEFAULT_SHEETS.items()}
+    state_path = args.db or os.path.join(os.path.dirname(os.path.normpath(args.destination_folder)), "rollup.sqlite")
+    stats = compile_rollup(args.destination_folder, state_path, sheets, output=args.output, dataset_dir=args.dataset,
+                           scan_index_path=args.scan_index, workers=args.workers)
+    logging.info(f"Rollup '{state_path}': {stats['workbooks']} workbooks, {stats['ingested']} read ({stats['rows']} rows), "
+                 f"{stats['unchanged']} unchanged, {stats['removed']} removed, {stats['failed']} unreadable, "
+                 f"{stats['no_sheet']} without their sheets in {stats['elapsed']:.1f} s")
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import os
+import re
+import json
+import time
+import errno
+import shutil
+import logging
+
+# OSErrors that a retry will not fix
+PERMANENT_ERRNOS = {errno.EACCES, errno.EPERM, errno.ENOSPC, errno.EROFS, errno.ENAMETOOLONG}
+# Windows error codes of the same failures, as they appear in "[WinError 112] ..." texts
+PERMANENT_WINERRORS = {5: errno.EACCES, 19: errno.EROFS, 39: errno.ENOSPC, 112: errno.ENOSPC, 206: errno.ENAMETOOLONG}
+_ERROR_CODE = re.compile(r"\[(Errno|WinError) (\d+)\]")
+
+
+def _wrapped_errnos(error):
+    """Return the errnos of the per-file errors a shutil.Error carries (as "src, dst, reason" texts)."""
+    errnos = set()
+    for entry in error.args[0] if error.args and isinstance(error.args[0], list) else ():
+        for kind, code in _ERROR_CODE.findall(str(entry[-1] if isinstance(entry, tuple) else entry)):
+            code = int(code)
+            errnos.add(code if kind == "Errno" else PERMANENT_WINERRORS.get(code))
+    return errnos
+
+
+def is_transient(error):
+    """Check if an OSError may go away on its own (a dropped share or tester, a timeout).
+
+    A shutil.Error (a folder copy with failed files) is transient only if none of the
+    files failed with a permanent error.
+    """
+    if isinstance(error, shutil.Error):
+        return not _wrapped_errnos(error) & PERMANENT_ERRNOS
+    return not isinstance(error, PermissionError) and getattr(error, "errno", None) not in PERMANENT_ERRNOS
+
+
+def retry(fn, attempts=3, base_delay=5.0, max_delay=120.0, what="operation"):
+    """Call fn(), retrying transient OSErrors with exponential backoff; return its result.
+
+    The delay doubles from base_delay up to max_delay. The last error, or any error
+    that is not transient, is raised to the caller.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn()
+        except OSError as e:
+            if attempt == attempts or not is_transient(e):
+                raise
+            delay = min(base_delay * 2 ** (attempt - 1), max_delay)
+            logging.warning(f"{what} failed (attempt {attempt} of {attempts}), retrying in {delay:g} s: {str(e)}")
+            time.sleep(delay)
+
+
+class RunJournal:
+    """Checkpoints of one profile's run: its work plan and every destination folder completed.
+
+    One JSON-lines file per profile in journal_dir. start() begins a new run; the journal
+    stays unfinished until finish() is called after a run in which every folder succeeded,
+    so `--resume` can carry on from the saved plan and skip the folders already done.
+    """
+
+    def __init__(self, path, run_stamp, plan_path, done=None):
+        self.path = path
+        self.run_stamp = run_stamp
+        self.plan_path = plan_path
+        self.done = set(done or ())
+
+    @staticmethod
+    def path_for(journal_dir, profile_name):
+        return os.path.join(journal_dir, f"run_{profile_name}.jsonl")
+
+    @classmethod
+    def start(cls, journal_dir, profile_name, run_stamp, plan_path):
+        """Begin a new journal for a run, replacing the journal of any earlier run."""
+        os.makedirs(journal_dir, exist_ok=True)
+        journal = cls(cls.path_for(journal_dir, profile_name), run_stamp, plan_path)
+        with open(journal.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"event": "start", "run": run_stamp, "plan": plan_path, "ts": time.time()}) + "\n")
+        return journal
+
+    @classmethod
+    def load_unfinished(cls, journal_dir, profile_name):
+        """Return the journal of the profile's last run if that run did not finish, else None."""
+        path = cls.path_for(journal_dir, profile_name)
+        if not os.path.exists(path):
+            return None
+        journal = None
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # last line cut off mid-write
+                if record["event"] == "start":
+                    journal = cls(path, record["run"], record["plan"])
+                elif record["event"] == "done" and journal is not None:
+                    journal.done.add(record["dest"])
+                elif record["event"] == "finished":
+                    return None
+        return journal
+
+    def is_done(self, dest):
+        return dest in self.done
+
+    def _append(self, record):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(dict(record, ts=time.time())) + "\n")
+
+    def record_done(self, dest):
+        self.done.add(dest)
+        self._append({"event": "done", "dest": dest})
+
+    def finish(self):
+        self._append({"event": "finished"})
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+import logging.handlers
+from contextlib import contextmanager
+
+# Counters and span totals of the current run, written out by log_summary()
+_counters = {}
+_spans = {}  # {name: {"count", "errors", "total_s", "max_s"}}
+_hosts = {}  # {(name, source_folder): {"count", "errors", "total_s", plus "files", "bytes", "dirs_listed" if given}}
+_lock = threading.Lock()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: time, level, thread, message, plus the event name and fields if any."""
+
+    def format(self, record):
+        data = {"ts": round(record.created, 3), "level": record.levelname, "thread": record.threadName,
+                "msg": record.getMessage()}
+        event = getattr(record, "event", None)
+        if event:
+            data["event"] = event
+            data.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class _NoSpans(logging.Filter):
+    """Keep per-item span records out of the console; they are only wanted in the JSON log."""
+
+    def filter(self, record):
+        return getattr(record, "event", None) != "span"
+
+
+def setup_run_logging(log_dir, prefix="copy_log", console_level=logging.INFO):
+    """Send all logging through a queue to a JSON-lines file in log_dir and to the console.
+
+    Callers only pay for putting the record on the queue; formatting and the writes to the
+    network log folder happen on the listener thread. Returns (log_filename, listener);
+    call listener.stop() at the end of the run to flush the queue.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    log_filename = os.path.join(log_dir, f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+    file_handler = logging.FileHandler(log_filename, encoding='utf-8')
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(JsonLinesFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    console_handler.addFilter(_NoSpans())
+
+    records = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(records, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    queue_handler = logging.handlers.QueueHandler(records)
+    # QueueHandler bakes the formatted text into the record; keep it to the bare message
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler], force=True)
+    return log_filename, listener
+
+
+def count(name, n=1):
+    """Add n to a run counter (used instead of logging one line per ignored or pruned folder)."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def _add_host_totals(name, source_folder, elapsed, error, amounts):
+    totals = _hosts.setdefault((name, source_folder), {"count": 0, "errors": 0, "total_s": 0.0})
+    totals["count"] += 1
+    totals["errors"] += bool(error)
+    totals["total_s"] += elapsed
+    for key in ("files", "bytes", "dirs_listed"):
+        if isinstance(amounts.get(key), int):
+            totals[key] = totals.get(key, 0) + amounts[key]
+
+
+def add_host_totals(name, source_folder, elapsed, error=False, **amounts):
+    """Add one timed item of a phase to the totals kept per source folder (spans with a source_folder field add theirs)."""
+    with _lock:
+        _add_host_totals(name, source_folder, elapsed, error, amounts)
+
+
+def log_event(event, message, level=logging.INFO, **fields):
+    """Log a message that also carries an event name and fields in the JSON log."""
+    logging.log(level, message, extra={"event": event, "fields": fields})
+
+
+@contextmanager
+def span(name, **fields):
+    """Time a block and log it as a 'span' record with its fields; the block may add fields to the yielded dict.
+
+    Span records go to the JSON log only. Failures are recorded with status 'error' and re-raised.
+    """
+    fields = dict(fields)
+    start_time = time.time()
+    status = "ok"
+    try:
+        yield fields
+    except BaseException as e:
+        status = "error"
+        fields.setdefault("error", str(e))
+        raise
+    finally:
+        elapsed = time.time() - start_time
+        with _lock:
+            totals = _spans.setdefault(name, {"count": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0})
+            totals["count"] += 1
+            totals["errors"] += status == "error"
+            totals["total_s"] += elapsed
+            totals["max_s"] = max(totals["max_s"], elapsed)
+            if "source_folder" in fields:
+                _add_host_totals(name, fields["source_folder"], elapsed, status == "error", fields)
+        logging.info(f"{name} {status} in {elapsed:.3f} s",
+                     extra={"event": "span", "fields": dict(fields, span=name, status=status, elapsed=round(elapsed, 3))})
+
+
+def run_totals():
+    """Return (counters, spans, hosts): copies of the run's counters, per-span totals and per-source-folder totals."""
+    with _lock:
+        counters = dict(_counters)
+        spans = {name: dict(totals, total_s=round(totals["total_s"], 3), max_s=round(totals["max_s"], 3))
+                 for name, totals in _spans.items()}
+        hosts = {key: dict(totals, total_s=round(totals["total_s"], 3)) for key, totals in _hosts.items()}
+    return counters, spans, hosts
+
+
+def reset_totals():
+    """Clear the counters and span totals, so the next summary covers only what runs after this."""
+    with _lock:
+        _counters.clear()
+        _spans.clear()
+        _hosts.clear()
+
+
+def log_summary(**fields):
+    """Log the counters and per-span totals of the run as one 'summary' record and return them."""
+    counters, spans, _ = run_totals()
+    parts = [f"{name}={value}" for name, value in sorted(counters.items())]
+    parts += [f"{name}: {totals['count']} in {totals['total_s']:.1f} s" for name, totals in sorted(spans.items())]
+    log_event("summary", "Run summary: " + ", ".join(parts), counters=counters, spans=spans, **fields)
+    return counters, spans
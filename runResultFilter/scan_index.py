@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS test_folders (
+    path                TEXT NOT NULL,      -- HotVmin/GNG folder on the tester
+    scan_key            TEXT NOT NULL,      -- scan rules and required file keywords it was probed with (see scan_key)
+    source_folder       TEXT NOT NULL,
+    unit                TEXT NOT NULL,
+    test                TEXT NOT NULL,
+    dest_folder_path    TEXT NOT NULL,
+    dir_mtime           REAL NOT NULL,      -- mtime of the test folder when it was last listed
+    latest_folder       TEXT,               -- selected latest timestamp folder
+    latest_timestamp    TEXT,               -- ISO timestamp parsed from its name
+    latest_mtime        REAL,
+    has_required_file   INTEGER NOT NULL,
+    selected_at         REAL NOT NULL,      -- when latest_folder last changed
+    scanned_at          REAL NOT NULL,
+    PRIMARY KEY (path, scan_key)
+);
+CREATE INDEX IF NOT EXISTS idx_test_folders_unit ON test_folders (unit);
+CREATE INDEX IF NOT EXISTS idx_test_folders_selected ON test_folders (selected_at);
+"""
+
+
+def scan_key(scan_rules, required_file_keywords):
+    """Return the key of the scan settings a selection depends on; profiles that differ in them never share entries."""
+    settings = json.dumps({"rules": scan_rules, "keywords": sorted(required_file_keywords)}, sort_keys=True)
+    return hashlib.sha1(settings.encode("utf-8")).hexdigest()[:16]
+
+
+class ScanIndex:
+    """SQLite index of tester test folders and their selected latest timestamp folder.
+
+    A test folder whose mtime has not changed since the last scan cannot have gained
+    a new timestamp folder, so its stored selection is reused without listing it or
+    walking the timestamp folder again. Only positive results (required file found)
+    are reused; folders still waiting for their workbook are always probed again. Entries
+    are kept per scan_key, since whether a folder has its required file depends on the
+    profile's keywords and rules.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        columns = [row["name"] for row in self.conn.execute("PRAGMA table_info(test_folders)")]
+        if columns and "scan_key" not in columns:
+            # Index from before entries were kept per scan_key; it is only a cache, so start over
+            self.conn.execute("DROP TABLE test_folders")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def lookup_test_folder(self, path, dir_mtime, key=""):
+        """Return (latest_folder, latest_timestamp, latest_mtime) if the entry stored under key is still valid, else None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT dir_mtime, latest_folder, latest_timestamp, latest_mtime, has_required_file "
+                "FROM test_folders WHERE path = ? AND scan_key = ?", (path, key)).fetchone()
+        if row is None or row["dir_mtime"] != dir_mtime or not row["has_required_file"] or not row["latest_folder"]:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row["latest_folder"], datetime.fromisoformat(row["latest_timestamp"]), row["latest_mtime"]
+
+    def record_test_folder(self, path, source_folder, dest_folder_path, dir_mtime,
+                           latest_folder, latest_timestamp, latest_mtime, has_required_file, key=""):
+        """Insert or update a test folder, under the scan_key it was probed with, after it has been probed on the network."""
+        relative_parts = os.path.normpath(os.path.relpath(path, source_folder)).split(os.sep)
+        unit, test = relative_parts[0], relative_parts[-1]
+        now = time.time()
+        latest_iso = latest_timestamp.isoformat() if latest_timestamp else None
+        with self.lock:
+            row = self.conn.execute("SELECT latest_folder, selected_at FROM test_folders WHERE path = ? AND scan_key = ?",
+                                    (path, key)).fetchone()
+            selected_at = row["selected_at"] if row is not None and row["latest_folder"] == latest_folder else now
+            self.conn.execute(
+                "INSERT OR REPLACE INTO test_folders (path, scan_key, source_folder, unit, test, dest_folder_path, dir_mtime, "
+                "latest_folder, latest_timestamp, latest_mtime, has_required_file, selected_at, scanned_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, key, source_folder, unit, test, dest_folder_path, dir_mtime, latest_folder, latest_iso,
+                 latest_mtime, int(bool(has_required_file)), selected_at, now))
+            self.conn.commit()
+
+    def test_folder_hosts(self):
+        """Return {dest_folder_path: {source_folder}}: which source folders held each test folder at the last scan."""
+        hosts = {}
+        with self.lock:
+            rows = self.conn.execute("SELECT dest_folder_path, source_folder FROM test_folders WHERE has_required_file = 1").fetchall()
+        for row in rows:
+            hosts.setdefault(row["dest_folder_path"], set()).add(row["source_folder"])
+        return hosts
+
+    def new_runs_since(self, since, test_keyword=None, unit=None):
+        """Return rows whose latest timestamp folder is newer than `since` (a datetime)."""
+        query = "SELECT * FROM test_folders WHERE has_required_file = 1 AND latest_timestamp >= ?"
+        params = [since.isoformat()]
+        if test_keyword:
+            query += " AND test LIKE ?"
+            params.append(f"%{test_keyword}%")
+        if unit:
+            query += " AND unit = ?"
+            params.append(unit)
+        query += " GROUP BY path ORDER BY unit, test"  # one row per folder, whichever profiles scanned it
+        with self.lock:
+            return self.conn.execute(query, params).fetchall()
+
+
+def main(argv=None):
+    """Query the scan index from the command line without touching the testers."""
+    parser = argparse.ArgumentParser(description="Query the filterfx scan index.")
+    parser.add_argument("db_path", help="Path to the scan index .sqlite file")
+    parser.add_argument("--since", help="Only runs newer than this date (YYYY-MM-DD[ HH:MM]); default is 24 hours ago")
+    parser.add_argument("--test", help="Only test folders containing this text, e.g. HotVmin or GNG")
+    parser.add_argument("--unit", help="Only this unit")
+    args = parser.parse_args(argv)
+
+    since = datetime.fromisoformat(args.since) if args.since else datetime.now() - timedelta(days=1)
+    index = ScanIndex(args.db_path)
+    rows = index.new_runs_since(since, args.test, args.unit)
+    index.close()
+    print(f"{'Unit':<20} {'Test':<45} {'Latest run':<22} {'Source':<40}")
+    print("=" * 130)
+    for row in rows:
+        print(f"{row['unit']:<20} {row['test']:<45} {row['latest_timestamp']:<22} {row['source_folder']:<40}")
+    print(f"{len(rows)} test folders with runs since {since:%Y-%m-%d %H:%M}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
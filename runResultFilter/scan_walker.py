@@ -0,0 +1,139 @@
+import os
+import fnmatch
+import logging
+from datetime import datetime
+from run_log import count
+from dir_cache import list_dir
+
+# Default traversal rules for a tester result tree:
+#   source_folder / <unit> / [Shmoo /] <*HotVmin|*GNG> / <timestamp> / UnitLogs / ...
+# Only the levels down to the HotVmin/GNG folders are ever listed.
+DEFAULT_SCAN_RULES = {
+    "unit_markers": ["U5", "U6"],                         # a path component must contain one of these
+    "test_keywords": ["HotVmin", "GNG"],                  # folder names treated as test folders
+    "exclude_names": ["99999999_999_+99_+99", "DOE"],     # substrings pruned together with their subtree
+    "include_globs": [],                                  # optional fnmatch patterns a test folder must match
+    "exclude_globs": [],                                  # optional fnmatch patterns pruned like exclude_names
+    "max_depth": 3,                                       # deepest level (source folder = 0) holding test folders
+}
+
+
+def make_scan_rules(**overrides):
+    """Return a copy of DEFAULT_SCAN_RULES with the given keys replaced."""
+    rules = {key: (list(value) if isinstance(value, list) else value) for key, value in DEFAULT_SCAN_RULES.items()}
+    for key, value in overrides.items():
+        if key not in rules:
+            raise KeyError(f"Unknown scan rule '{key}'")
+        rules[key] = value
+    return rules
+
+
+def new_scan_stats():
+    """Return an empty counter dict filled in by walk_scan_tree."""
+    return {"dirs_listed": 0, "dirs_pruned": 0, "list_errors": 0, "pruned_paths": []}
+
+
+def is_excluded_name(name, rules):
+    """Check if a folder name matches one of the exclude rules."""
+    if any(excluded in name for excluded in rules["exclude_names"]):
+        return True
+    return any(fnmatch.fnmatch(name, pattern) for pattern in rules["exclude_globs"])
+
+
+def is_test_folder_name(name, rules):
+    """Check if a folder name is a HotVmin/GNG test folder allowed by the include rules."""
+    if not any(keyword in name for keyword in rules["test_keywords"]):
+        return False
+    if rules["include_globs"]:
+        return any(fnmatch.fnmatch(name, pattern) for pattern in rules["include_globs"])
+    return True
+
+
+def is_timestamp_folder_name(name):
+    """Check if a folder name looks like '2025.07.25_19.28.10'."""
+    try:
+        datetime.strptime(name, "%Y.%m.%d_%H.%M.%S")
+        return True
+    except ValueError:
+        return False
+
+
+def has_unit_marker(relative_path, rules):
+    """Check if a relative path lies under a U5/U6 (or other configured marker) folder."""
+    return any(marker in relative_path for marker in rules["unit_markers"])
+
+
+def walk_scan_tree(source_folder, rules=None, stats=None, dir_cache=None):
+    """Walk a result tree top-down with os.scandir, pruning excluded and out-of-depth folders.
+
+    Yields (root, relative_path, dir_names) like os.walk. Test folders and timestamp
+    folders are reported in dir_names but never descended into, excluded folders are
+    dropped before they are listed, and nothing below rules['max_depth'] is listed.
+    Listings go through dir_cache (a DirCache) if one is given.
+    """
+    rules = rules or DEFAULT_SCAN_RULES
+    stats = stats if stats is not None else new_scan_stats()
+    pending = [(source_folder, ".", 0)]
+    while pending:
+        root, relative_path, depth = pending.pop()
+        try:
+            dir_names = sorted(entry.name for entry in list_dir(root, dir_cache) if entry.is_dir())
+        except OSError as e:
+            stats["list_errors"] += 1
+            logging.warning(f"Could not list folder '{root}': {str(e)}")
+            continue
+        stats["dirs_listed"] += 1
+
+        kept = []
+        for dir_name in dir_names:
+            if is_excluded_name(dir_name, rules):
+                stats["dirs_pruned"] += 1
+                stats["pruned_paths"].append(os.path.join(root, dir_name))
+                count("folders_pruned")
+                logging.debug(f"Pruned folder '{os.path.join(root, dir_name)}' and its subtrees (excluded name).")
+                continue
+            kept.append(dir_name)
+        yield root, relative_path, kept
+
+        if depth + 1 >= rules["max_depth"]:
+            continue
+        # Push in reverse so siblings are visited in sorted order
+        for dir_name in reversed(kept):
+            if is_test_folder_name(dir_name, rules) or is_timestamp_folder_name(dir_name):
+                continue
+            child_relative = dir_name if relative_path == "." else os.path.join(relative_path, dir_name)
+            pending.append((os.path.join(root, dir_name), child_relative, depth + 1))
+
+
+def iter_scan_targets(source_folder, rules=None, stats=None, shmoo_name="Shmoo", dir_cache=None):
+    """Yield (kind, root, dir_name, dir_full_path) for test folders ('test') and Shmoo folders ('shmoo').
+
+    All kinds come out of the same walk, so each folder is listed once per scan. Test
+    folders below a Shmoo folder come out as 'shmoo_test': the Shmoo sync copies them
+    whole, so they must not also get a latest timestamp folder selected (and the older
+    ones retired), but a watcher still needs their mtimes.
+    """
+    rules = rules or DEFAULT_SCAN_RULES
+    for root, relative_path, dir_names in walk_scan_tree(source_folder, rules, stats, dir_cache):
+        if not has_unit_marker(relative_path, rules):
+            continue
+        below_shmoo = shmoo_name in relative_path.split(os.sep)
+        for dir_name in dir_names:
+            if is_test_folder_name(dir_name, rules):
+                yield "shmoo_test" if below_shmoo else "test", root, dir_name, os.path.join(root, dir_name)
+            elif dir_name == shmoo_name:
+                yield "shmoo", root, dir_name, os.path.join(root, dir_name)
+
+
+def iter_test_folders(source_folder, rules=None, stats=None):
+    """Yield (root, dir_name, dir_full_path) for every HotVmin/GNG folder below a U5/U6 path."""
+    for kind, root, dir_name, dir_full_path in iter_scan_targets(source_folder, rules, stats):
+        if kind == "test":
+            yield root, dir_name, dir_full_path
+
+
+def iter_shmoo_folders(source_folder, rules=None, stats=None, shmoo_name="Shmoo"):
+    """Yield (root, shmoo_path) for every Shmoo folder directly below a U5/U6 path."""
+    for kind, root, dir_name, dir_full_path in iter_scan_targets(source_folder, rules, stats, shmoo_name):
+        if kind == "shmoo":
+            yield root, dir_full_path
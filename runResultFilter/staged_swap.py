@@ -0,0 +1,98 @@
+import os
+import time
+import queue
+import shutil
+import logging
+import threading
+from host_scan import parse_timestamp_folder_name
+from run_log import count, span
+
+# Both live on the destination share so that moving a folder in or out is a rename, not a copy
+TRASH_DIR_NAME = ".filterfx_trash"
+STAGING_PREFIX = ".staging_"
+
+
+def staging_path_for(dest_timestamp_folder):
+    """Return the staging folder a timestamp folder is copied into before it is renamed into place."""
+    parent, name = os.path.split(dest_timestamp_folder)
+    return os.path.join(parent, STAGING_PREFIX + name)
+
+
+class DeferredDeleter:
+    """Moves retired folders into a trash area and deletes them on a background thread.
+
+    Retiring a folder is a single rename on the share, so the slow rmtree is taken off
+    the copy phase. Whatever is still in the trash when the run ends (or from a run that
+    was killed) is deleted by the next run.
+    """
+
+    def __init__(self, destination_folder):
+        self.trash_dir = os.path.join(destination_folder, TRASH_DIR_NAME)
+        os.makedirs(self.trash_dir, exist_ok=True)
+        self.pending = queue.Queue()
+        self.counter = 0
+        self.deleted = 0
+        self.thread = threading.Thread(target=self._run, name="deferred-delete", daemon=True)
+        self.thread.start()
+        for leftover in sorted(os.listdir(self.trash_dir)):
+            self.pending.put(os.path.join(self.trash_dir, leftover))
+
+    def _run(self):
+        while True:
+            path = self.pending.get()
+            if path is None:
+                return
+            try:
+                with span("delete", path=path):
+                    shutil.rmtree(path)
+                self.deleted += 1
+            except OSError as e:
+                logging.warning(f"Could not delete retired folder '{path}', will retry next run: {str(e)}")
+
+    def retire(self, path):
+        """Move a folder into the trash and queue it for deletion."""
+        self.counter += 1
+        target = os.path.join(self.trash_dir, f"{time.strftime('%Y%m%d_%H%M%S')}_{self.counter}_{os.path.basename(path)}")
+        os.replace(path, target)
+        self.pending.put(target)
+        return target
+
+    def close(self, timeout=None):
+        """Wait up to timeout seconds for queued deletions; return True if the trash was emptied."""
+        self.pending.put(None)
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            logging.warning(f"Deferred deletion still running after {timeout} seconds; the rest is left in '{self.trash_dir}' for the next run")
+            return False
+        logging.info(f"Deferred deletion finished: {self.deleted} retired folders removed")
+        return True
+
+
+def retire_old_timestamp_folders(dest_folder_path, keep_name, deleter):
+    """Retire every timestamp (or stale staging) folder in dest_folder_path except keep_name."""
+    keep_staging = STAGING_PREFIX + keep_name
+    for item in os.listdir(dest_folder_path):
+        if item in (keep_name, keep_staging):
+            continue
+        name = item[len(STAGING_PREFIX):] if item.startswith(STAGING_PREFIX) else item
+        item_path = os.path.join(dest_folder_path, item)
+        if parse_timestamp_folder_name(name) and os.path.isdir(item_path):
+            deleter.retire(item_path)
+            count("folders_retired")
+            logging.debug(f"Retired timestamp folder '{item_path}'.")
+
+
+def staged_copy(source, dest_timestamp_folder, copy_fn, deleter):
+    """Copy source into a staging folder with copy_fn(source, staging), then rename it into place.
+
+    A previous version of the same folder is moved to the trash just before the rename,
+    so readers never see a half-copied folder and at most one rename goes by without it.
+    A staging folder left by an interrupted run is reused so its copy can resume.
+    Returns whatever copy_fn returned.
+    """
+    staging = staging_path_for(dest_timestamp_folder)
+    result = copy_fn(source, staging)
+    if os.path.exists(dest_timestamp_folder):
+        deleter.retire(dest_timestamp_folder)
+    os.replace(staging, dest_timestamp_folder)
+    return result
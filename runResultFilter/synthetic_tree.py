@@ -0,0 +1,96 @@
+import os
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta
+
+# Names as they appear on the NVL testers
+PRODUCT_PATH = os.path.join("c$", "Results", "NVL", "Hx", "B0")
+DECOY_NAME = "99999999_999_+99_+99"
+
+
+def _write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+
+
+def _timestamp_name(moment):
+    return moment.strftime("%Y.%m.%d_%H.%M.%S")
+
+
+def generate_tree(base, hosts=4, units=6, unit_markers=("U5", "U6"), tests_per_keyword=2,
+                  test_keywords=("HotVmin", "GNG"), timestamps=3, unitlog_files=20, file_size=2048,
+                  workbook_size=64 * 1024, shared_unit_rate=0.3, missing_workbook_rate=0.1, decoys=True,
+                  shmoo=True, seed=0):
+    """Build a tester result tree under base and return its source folders, one per host.
+
+    Every host gets `units` unit folders (names start with one of unit_markers; about
+    shared_unit_rate of them also exist on the next host, so the merge has ties to break),
+    each with tests_per_keyword test folders per keyword. Each test folder holds
+    `timestamps` timestamp folders with a workbook placeholder and a UnitLogs tree of
+    unitlog_files small files; the newest one lacks its workbook at missing_workbook_rate.
+    With decoys, every unit also gets a 99999999_999_+99_+99 and a DOE folder holding
+    test folders that the scan must prune. The same seed builds the same tree.
+    """
+    rng = random.Random(seed)
+    start = datetime(2025, 7, 1)
+    source_folders = []
+    previous_units = []
+    for host_number in range(hosts):
+        source_folder = os.path.join(base, f"PG07TCMV{host_number + 1:04d}", PRODUCT_PATH)
+        source_folders.append(source_folder)
+        shared = [unit for unit in previous_units if rng.random() < shared_unit_rate]
+        own = [f"{rng.choice(unit_markers)}{rng.randint(10, 99)}G{rng.randint(0, 99999999):08d}"
+               for _ in range(units - len(shared))]
+        previous_units = shared + own
+        for unit in previous_units:
+            unit_folder = os.path.join(source_folder, unit)
+            for keyword in test_keywords:
+                for test_number in range(tests_per_keyword):
+                    test_name = f"NVL_Hx816_CDIE_A{test_number + 1}_EFI_F1_{keyword}"
+                    moments = sorted(start + timedelta(minutes=rng.randint(0, 200000)) for _ in range(timestamps))
+                    for position, moment in enumerate(moments):
+                        timestamp_folder = os.path.join(unit_folder, test_name, _timestamp_name(moment))
+                        newest = position == len(moments) - 1
+                        if not (newest and rng.random() < missing_workbook_rate):
+                            _write(os.path.join(timestamp_folder, f"{test_name}_{keyword}.xlsx"), workbook_size)
+                        for file_number in range(unitlog_files):
+                            _write(os.path.join(timestamp_folder, "UnitLogs", "LotStartFlow", "UnitStartFlow",
+                                                f"unit_{file_number:04d}.log"), file_size)
+            if shmoo:
+                _write(os.path.join(unit_folder, "Shmoo", f"NVL_Shmoo_{test_keywords[0]}",
+                                    _timestamp_name(start), f"shmoo_{test_keywords[0]}.xlsx"), workbook_size)
+            if decoys:
+                for decoy in (DECOY_NAME, "DOE_sweep"):
+                    decoy_test = f"NVL_Decoy_{test_keywords[0]}"
+                    decoy_folder = os.path.join(unit_folder, decoy, decoy_test, _timestamp_name(start))
+                    _write(os.path.join(decoy_folder, f"{decoy_test}_{test_keywords[0]}.xlsx"), workbook_size)
+                    _write(os.path.join(decoy_folder, "UnitLogs", "decoy.log"), file_size)
+    return source_folders
+
+
+def main(argv=None):
+    """Generate a synthetic result tree for benchmarks and offline tests."""
+    parser = argparse.ArgumentParser(description="Build a synthetic tester result tree.")
+    parser.add_argument("base", help="Folder to create the hosts in")
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--units", type=int, default=6, help="Unit folders per host")
+    parser.add_argument("--tests", type=int, default=2, help="Test folders per keyword (HotVmin, GNG) per unit")
+    parser.add_argument("--timestamps", type=int, default=3, help="Timestamp folders per test folder")
+    parser.add_argument("--unitlog-files", type=int, default=20, help="UnitLogs files per timestamp folder")
+    parser.add_argument("--file-size", type=int, default=2048, help="Bytes per UnitLogs file")
+    parser.add_argument("--no-decoys", action="store_true", help="Leave out the 99999999 and DOE folders")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    source_folders = generate_tree(args.base, args.hosts, args.units, tests_per_keyword=args.tests,
+                                   timestamps=args.timestamps, unitlog_files=args.unitlog_files,
+                                   file_size=args.file_size, decoys=not args.no_decoys, seed=args.seed)
+    for source_folder in source_folders:
+        print(source_folder)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# The filter modules are run as scripts from runResultFilter/, not installed as a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def write_file(path, data=b"x", mtime=None):
+    """Create path (and its folders) with data; set its mtime if given. Returns path."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+@pytest.fixture
+def timestamp_folder(tmp_path):
+    """A source timestamp folder with a workbook, a nested UnitLogs file and a text file."""
+    folder = tmp_path / "src" / "2025.07.25_19.28.10"
+    write_file(str(folder / "unit_HotVmin.xlsx"), b"workbook" * 100, mtime=1_750_000_000)
+    write_file(str(folder / "UnitLogs" / "log1.txt"), b"log line\n" * 10, mtime=1_750_000_100)
+    write_file(str(folder / "notes.txt"), b"notes", mtime=1_750_000_200)
+    return str(folder)
@@ -0,0 +1,20 @@
+import os
+
+from benchmark import LatencyInjector
+from conftest import write_file
+
+
+def test_injector_counts_direntry_calls(tmp_path):
+    write_file(str(tmp_path / "U1" / "notes.txt"))
+    os.makedirs(tmp_path / "U1" / "NVL_HotVmin")
+    injector = LatencyInjector(str(tmp_path), 0.0)
+
+    with injector.active():
+        with os.scandir(tmp_path / "U1") as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    entry.stat()
+                    entry.stat()
+        os.stat(tmp_path)
+
+    assert injector.take_calls() == {"scandir": 1, "entry_is_dir": 2, "entry_stat": 2, "stat": 1}
@@ -0,0 +1,143 @@
+import os
+import time
+import shutil
+import builtins
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from copy_engine import PARTIAL_SUFFIX, CopyEngine, build_file_list, host_key, share_key
+from conftest import write_file
+from copy_filter import CopyFilter
+from throttle import Governor
+
+
+def test_share_and_host_keys():
+    assert share_key(r"\\PG07TCMV0021\c$\Results\NVL") == "//pg07tcmv0021/c$"
+    assert host_key(r"\\PG07TCMV0021\c$\Results\NVL") == "//pg07tcmv0021"
+    assert share_key("u:/NVL/HX") == "U:"
+    assert share_key("/tmp/results") == "local"
+
+
+def test_copy_tree_copies_data_and_mtimes(tmp_path, timestamp_folder):
+    dest = str(tmp_path / "dest" / "2025.07.25_19.28.10")
+    files_copied, bytes_copied = CopyEngine(max_workers=2).copy_tree(timestamp_folder, dest)
+
+    assert files_copied == 3
+    assert bytes_copied == 800 + 90 + 5
+    for relative_path in ("unit_HotVmin.xlsx", os.path.join("UnitLogs", "log1.txt"), "notes.txt"):
+        source, copied = os.path.join(timestamp_folder, relative_path), os.path.join(dest, relative_path)
+        with open(source, "rb") as f1, open(copied, "rb") as f2:
+            assert f1.read() == f2.read()
+        assert os.path.getmtime(copied) == os.path.getmtime(source)
+    assert not [name for _, _, names in os.walk(dest) for name in names if name.endswith(PARTIAL_SUFFIX)]
+
+
+def test_build_file_list_drops_filtered_files_and_empty_folders(timestamp_folder):
+    copy_filter = CopyFilter(exclude=["UnitLogs/*", "*.txt"], always=["HotVmin.xlsx"])
+    dirs, files = build_file_list(timestamp_folder, "/dest", copy_filter)
+
+    assert [os.path.basename(src) for src, _, _, _ in files] == ["unit_HotVmin.xlsx"]
+    assert dirs == [(timestamp_folder, "/dest")]
+    assert copy_filter.files_filtered == 2
+
+
+def test_failed_file_leaves_no_partial(tmp_path, timestamp_folder, monkeypatch):
+    dest = str(tmp_path / "dest")
+    os.makedirs(dest)
+    engine = CopyEngine(max_workers=1)
+    monkeypatch.setattr("copy_engine.shutil.copystat", lambda src, dst: (_ for _ in ()).throw(OSError("share dropped")))
+    with pytest.raises(OSError):
+        engine.copy_file(os.path.join(timestamp_folder, "notes.txt"), os.path.join(dest, "notes.txt"))
+    assert os.listdir(dest) == []
+
+
+def _hang_on(monkeypatch, suffix, seconds=10):
+    """Make every open() of a path ending in suffix sleep first, like a read on a dropped share."""
+    real_open = builtins.open
+
+    def slow_open(path, *args, **kwargs):
+        if str(path).endswith(suffix):
+            time.sleep(seconds)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr("copy_engine.open", slow_open, raising=False)
+
+
+def test_written_off_copies_are_stopped_and_keep_the_host_cap(tmp_path):
+    source, dest = str(tmp_path / "src"), str(tmp_path / "dest")
+    for number in range(6):
+        write_file(os.path.join(source, f"log{number}.txt"), b"x" * 64 * 1024)
+    os.makedirs(dest)
+    _, files = build_file_list(source, dest)
+    # 16 KiB/s for the whole tester: no file can finish before its 0.3 second deadline
+    governor = Governor(source_host_rate=16 * 1024)
+    active, peak, started = [0], [0], [0]
+    lock = threading.Lock()
+    open_files = governor.open_files
+
+    @contextmanager
+    def counting_open_files(count=2):
+        with open_files(count):
+            with lock:
+                active[0] += 1
+                started[0] += 1
+                peak[0] = max(peak[0], active[0])
+            try:
+                yield
+            finally:
+                with lock:
+                    active[0] -= 1
+
+    governor.open_files = counting_open_files
+    engine = CopyEngine(max_workers=4, per_source_host=2, buffer_size=16 * 1024, file_timeout=0.3, governor=governor)
+    files_copied, _, errors = engine.copy_files(files, timeout=30)
+    deadline = time.time() + 5
+    while active[0] and time.time() < deadline:
+        time.sleep(0.05)
+
+    assert files_copied == 0
+    assert {reason for _, _, reason in errors} == {"file deadline of 0.3 seconds exceeded"}
+    assert started[0] == 6 and active[0] == 0  # every written-off copy stopped instead of reading on
+    assert peak[0] <= 2
+    assert os.listdir(dest) == []  # and each removed its own partial file
+
+
+def test_folder_deadline_cancels_copies_waiting_for_a_slot(tmp_path, timestamp_folder, monkeypatch):
+    _hang_on(monkeypatch, "unit_HotVmin.xlsx")
+    dest = str(tmp_path / "dest")
+    dirs, files = build_file_list(timestamp_folder, dest)
+    for _, directory in dirs:
+        os.makedirs(directory, exist_ok=True)
+    engine = CopyEngine(max_workers=3, per_source_host=1, file_timeout=60)
+    files_copied, _, errors = engine.copy_files(sorted(files, key=lambda f: not f[0].endswith(".xlsx")), timeout=1)
+
+    assert files_copied == 0
+    assert len(errors) == 3
+    assert all("folder deadline of 1 seconds exceeded" in reason for _, _, reason in errors)
+
+
+def test_interrupted_copy_resumes_from_its_journal(tmp_path, timestamp_folder, monkeypatch):
+    dest = str(tmp_path / "dest")
+    journal_dir = str(tmp_path / "journal")
+    engine = CopyEngine(max_workers=1, journal_dir=journal_dir)
+    real_copy_file = engine.copy_file
+
+    def failing_copy_file(src, dst, *args):
+        if src.endswith("notes.txt"):
+            raise OSError("share dropped")
+        return real_copy_file(src, dst, *args)
+
+    monkeypatch.setattr(engine, "copy_file", failing_copy_file)
+    with pytest.raises(shutil.Error):
+        engine.copy_tree(timestamp_folder, dest)
+    assert len(os.listdir(journal_dir)) == 1
+
+    copied = []
+    monkeypatch.setattr(engine, "copy_file", lambda src, dst, *args: copied.append(src) or real_copy_file(src, dst, *args))
+    files_copied, _ = engine.copy_tree(timestamp_folder, dest)
+
+    assert files_copied == 1
+    assert [os.path.basename(src) for src in copied] == ["notes.txt"]
+    assert os.listdir(journal_dir) == []  # discarded once the folder is complete
@@ -0,0 +1,57 @@
+import os
+
+from conftest import write_file
+from dir_cache import DirCache, list_dir, stat_path
+
+
+def _listed(monkeypatch):
+    """Record every os.scandir and os.stat call dir_cache makes."""
+    calls = []
+    scandir, stat = os.scandir, os.stat
+    monkeypatch.setattr("dir_cache.os.scandir", lambda path: calls.append(("scandir", path)) or scandir(path))
+    monkeypatch.setattr("dir_cache.os.stat", lambda path: calls.append(("stat", path)) or stat(path))
+    return calls
+
+
+def test_each_folder_is_listed_once(tmp_path, monkeypatch):
+    write_file(str(tmp_path / "U1" / "NVL_HotVmin" / "2025.07.25_19.28.10" / "unit_HotVmin.xlsx"))
+    write_file(str(tmp_path / "U1" / "notes.txt"))
+    calls = _listed(monkeypatch)
+    dir_cache = DirCache()
+    folder = str(tmp_path / "U1")
+
+    first = sorted(entry.name for entry in list_dir(folder, dir_cache))
+    second = sorted(entry.name for entry in list_dir(folder, dir_cache))
+
+    assert first == second == ["NVL_HotVmin", "notes.txt"]
+    assert calls == [("scandir", folder)]
+    assert (dir_cache.hits, dir_cache.misses) == (1, 1)
+
+
+def test_stat_comes_from_the_parent_listing(tmp_path, monkeypatch):
+    test_folder = str(tmp_path / "U1" / "NVL_HotVmin")
+    write_file(os.path.join(test_folder, "2025.07.25_19.28.10", "unit_HotVmin.xlsx"))
+    os.utime(test_folder, (1_750_000_000, 1_750_000_000))
+    calls = _listed(monkeypatch)
+    dir_cache = DirCache()
+
+    list_dir(str(tmp_path / "U1"), dir_cache)
+    assert stat_path(test_folder, dir_cache).st_mtime == 1_750_000_000
+    assert calls == [("scandir", str(tmp_path / "U1"))]  # no separate stat of the test folder
+
+    # A folder whose parent was never listed is stat'ed directly
+    other = str(tmp_path / "U1" / "NVL_HotVmin" / "2025.07.25_19.28.10")
+    stat_path(other, dir_cache)
+    assert calls[-1] == ("stat", other)
+    assert (dir_cache.hits, dir_cache.misses) == (1, 2)
+
+
+def test_without_a_cache_every_call_goes_to_the_filesystem(tmp_path, monkeypatch):
+    write_file(str(tmp_path / "U1" / "notes.txt"))
+    calls = _listed(monkeypatch)
+
+    list_dir(str(tmp_path / "U1"))
+    list_dir(str(tmp_path / "U1"))
+    stat_path(str(tmp_path / "U1"))
+
+    assert [kind for kind, _ in calls] == ["scandir", "scandir", "stat"]
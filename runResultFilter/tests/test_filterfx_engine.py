@@ -0,0 +1,152 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+
+import pytest
+
+import verify
+from conftest import write_file
+from filterfx_engine import (DEFAULT_SETTINGS, Profile, build_scan_jobs, load_config, run_engine, run_profile,
+                             select_profiles)
+from pipeline import CopyFeed
+
+TIMESTAMP = "2025.07.25_19.28.10"
+
+
+@pytest.fixture
+def copy_job(tmp_path, timestamp_folder):
+    """A profile whose single test folder has an older timestamp folder already at the destination."""
+    destination = str(tmp_path / "share" / "results")
+    dest_folder_path = os.path.join(destination, "U538G05900992", "NVL_HotVmin")
+    write_file(os.path.join(dest_folder_path, "2025.07.01_10.00.00", "old_HotVmin.xlsx"))
+    source_folder = os.path.dirname(timestamp_folder)
+    profile = Profile("NVL", [source_folder], destination, required_file_keywords=["HotVmin.xlsx"])
+    host_reports = {source_folder: {
+        "source_folder": source_folder, "status": "ok", "elapsed": 0.0, "shmoo": [], "skipped": [], "stats": None,
+        "info": {dest_folder_path: (timestamp_folder, datetime(2025, 7, 25, 19, 28, 10), 0.0)}}}
+    return profile, host_reports, _settings(tmp_path, verify_copies="fast"), dest_folder_path
+
+
+def _settings(tmp_path, **overrides):
+    """DEFAULT_SETTINGS with every file the engine keeps placed under tmp_path."""
+    settings = dict(DEFAULT_SETTINGS, log_dir=str(tmp_path / "logs"), scan_index_path=None,
+                    copy_journal_dir=str(tmp_path / "copy_journal"), run_journal_dir=str(tmp_path / "run_journal"),
+                    throughput_history_path=str(tmp_path / "history.jsonl"), throttle_control_path=None,
+                    hash_cache_path=str(tmp_path / "hashes.sqlite"), metrics_dir=None, rollup_dir=None,
+                    retry_attempts=1, **overrides)
+    os.makedirs(settings["log_dir"], exist_ok=True)
+    return settings
+
+
+def _verify_results(monkeypatch, *results):
+    """Make Verifier.verify_folder return the given problem lists in turn (then pass)."""
+    pending = list(results)
+    monkeypatch.setattr(verify.Verifier, "verify_folder", lambda self, source, dest, copy_filter=None:
+                        pending.pop(0) if pending else [])
+
+
+def test_copy_verifies_and_retires_the_older_folder(copy_job):
+    profile, host_reports, settings, dest_folder_path = copy_job
+
+    result = run_profile(profile, host_reports, settings, "20250725_120000")
+
+    assert (result["status"], result["incomplete"], result["verify_failed"]) == ("ok", 0, 0)
+    assert os.listdir(dest_folder_path) == [TIMESTAMP]
+    assert sorted(os.listdir(os.path.join(dest_folder_path, TIMESTAMP))) == ["UnitLogs", "notes.txt", "unit_HotVmin.xlsx"]
+
+
+def test_failed_verification_is_recopied_once(copy_job, monkeypatch):
+    profile, host_reports, settings, dest_folder_path = copy_job
+    _verify_results(monkeypatch, ["content notes.txt"])
+
+    result = run_profile(profile, host_reports, settings, "20250725_120000")
+
+    assert (result["incomplete"], result["verify_failed"]) == (0, 1)
+    assert os.listdir(dest_folder_path) == [TIMESTAMP]
+
+
+def test_second_verification_failure_keeps_the_recopy(copy_job, monkeypatch):
+    profile, host_reports, settings, dest_folder_path = copy_job
+    _verify_results(monkeypatch, ["content notes.txt"], ["content notes.txt"])
+
+    result = run_profile(profile, host_reports, settings, "20250725_120000")
+
+    # Incomplete, but the test folder still holds the latest copy instead of nothing
+    assert (result["incomplete"], result["verify_failed"]) == (1, 1)
+    assert os.listdir(dest_folder_path) == [TIMESTAMP]
+    assert "unit_HotVmin.xlsx" in os.listdir(os.path.join(dest_folder_path, TIMESTAMP))
+
+
+def test_pipelined_copy_time_leaves_out_the_wait_for_the_scan(copy_job):
+    profile, host_reports, settings, _ = copy_job
+    source_folder = profile.source_folders[0]
+    feed = CopyFeed(profile.source_folders)
+    # The scan only reports after a second; the copy itself takes milliseconds
+    timer = threading.Timer(1.0, feed.host_done, (source_folder, host_reports[source_folder]))
+    timer.start()
+
+    result = run_profile(profile, {}, settings, "20250725_120000", feed=feed)
+    timer.join()
+
+    assert result["status"] == "ok"
+    with open(settings["throughput_history_path"], encoding="utf-8") as f:
+        record = json.loads(f.readline())
+    assert record["bytes"] == 800 + 90 + 5
+    assert record["seconds"] < 0.5
+
+def test_unchanged_shmoo_folder_is_not_copied_again(tmp_path, caplog):
+    source_folder = str(tmp_path / "h1")
+    unit = os.path.join(source_folder, "U538G05900992")
+    write_file(os.path.join(unit, "NVL_HotVmin", TIMESTAMP, "unit_HotVmin.xlsx"))
+    for timestamp in ("2025.07.01_10.00.00", TIMESTAMP):
+        write_file(os.path.join(unit, "Shmoo", "NVL_Shmoo_HotVmin", timestamp, "shmoo_HotVmin.xlsx"), b"s" * 1000)
+    destination = str(tmp_path / "share" / "results")
+    os.makedirs(destination)
+    profile = Profile("NVL", [source_folder], destination, required_file_keywords=["HotVmin.xlsx"])
+    settings = _settings(tmp_path)
+
+    run_engine([profile], settings, "20250725_120000")
+    with caplog.at_level(logging.INFO):
+        run_engine([profile], settings, "20250725_130000")
+
+    # The Shmoo test folder is synced whole, not treated as a test folder whose older runs are retired
+    assert sorted(os.listdir(os.path.join(destination, "U538G05900992", "Shmoo", "NVL_Shmoo_HotVmin"))) == \
+        ["2025.07.01_10.00.00", TIMESTAMP]
+    assert "[NVL] Shmoo sync: 0 bytes transferred (0 files)" in caplog.text
+
+
+def _write_config(tmp_path, profiles, settings=None):
+    path = tmp_path / "filterfx_profiles.json"
+    path.write_text(json.dumps({"settings": settings or {}, "profiles": profiles}), encoding="utf-8")
+    return str(path)
+
+
+def test_shared_source_folder_is_scanned_once_per_distinct_rules(tmp_path):
+    path = _write_config(tmp_path, [
+        {"name": "NVL", "source_folders": ["//h1/Results", "//h2/Results", "//h1/Results"], "destination_folder": "/d/NVL",
+         "inactive_source_folders": ["//h9/Results"]},
+        {"name": "NVL_GNG", "source_folders": ["//h1/Results"], "destination_folder": "/d/NVL_GNG"},
+        {"name": "PTL", "source_folders": ["//h1/Results"], "destination_folder": "/d/PTL", "enabled": False,
+         "scan_rules": {"max_depth": 4}},
+    ], {"metrics_dir": "~/m"})
+
+    settings, profiles = load_config(path)
+    scan_jobs, profile_jobs = build_scan_jobs(profiles)
+
+    assert settings["metrics_dir"] == os.path.expanduser("~/m")
+    assert [profile.name for profile in select_profiles(profiles)] == ["NVL", "NVL_GNG"]
+    # NVL and NVL_GNG share the //h1 scan; PTL's deeper rules need a scan of its own
+    assert sorted(source_folder for source_folder, _, _, _ in scan_jobs.values()) == \
+        ["//h1/Results", "//h1/Results", "//h2/Results"]
+    assert [source_folder for source_folder, _ in profile_jobs["NVL"]] == ["//h1/Results", "//h2/Results"]
+    assert profile_jobs["NVL"][0][1] == profile_jobs["NVL_GNG"][0][1] != profile_jobs["PTL"][0][1]
+
+
+def test_config_rejects_unknown_settings_and_duplicate_profiles(tmp_path):
+    profile = {"name": "NVL", "source_folders": ["//h1/Results"], "destination_folder": "/d/NVL"}
+    with pytest.raises(KeyError):
+        load_config(_write_config(tmp_path, [profile], {"copy_threads": 8}))
+    with pytest.raises(ValueError):
+        load_config(_write_config(tmp_path, [profile, dict(profile)]))
@@ -0,0 +1,73 @@
+import os
+import threading
+
+import host_scan
+from conftest import write_file
+from host_scan import scan_hosts, scan_source_folder
+from scan_walker import make_scan_rules, new_scan_stats
+
+
+def _test_folder(source_folder, unit, test, timestamp="2025.07.25_19.28.10"):
+    write_file(os.path.join(source_folder, unit, test, timestamp, f"{unit}_HotVmin.xlsx"))
+    return os.path.join(source_folder, unit, test)
+
+
+def test_unreadable_test_folder_is_skipped_not_the_host(tmp_path, monkeypatch):
+    source_folder = str(tmp_path / "h1")
+    good = _test_folder(source_folder, "U538G05900992", "NVL_HotVmin")
+    bad = _test_folder(source_folder, "U538G05900993", "NVL_HotVmin")
+    probe = host_scan.probe_test_folder
+
+    def flaky_probe(dir_full_path, *args):
+        if dir_full_path == bad:
+            raise PermissionError(13, "Access is denied")
+        return probe(dir_full_path, *args)
+
+    monkeypatch.setattr(host_scan, "probe_test_folder", flaky_probe)
+    host_info, _, skipped, scan_stats = scan_source_folder(source_folder, "/d", make_scan_rules(), ["HotVmin.xlsx"])
+
+    assert list(host_info) == [os.path.join("/d", "U538G05900992", "NVL_HotVmin")]
+    assert [path for path, reason in skipped if reason.startswith("not readable")] == [bad]
+    assert scan_stats["list_errors"] == 1
+    assert good not in [path for path, _ in skipped]
+
+
+def test_hung_scan_is_written_off_and_the_queue_keeps_moving(monkeypatch):
+    release = threading.Event()
+
+    def fake_scan(source_folder, *args):
+        if source_folder == "hung":
+            release.wait(10)
+        return {"source_folder": source_folder, "status": "ok", "elapsed": 0.0,
+                "info": {}, "shmoo": [], "skipped": [], "stats": new_scan_stats()}
+
+    monkeypatch.setattr(host_scan, "_run_host_scan", fake_scan)
+    scan_jobs = {key: (key, "", make_scan_rules(), ["HotVmin.xlsx"]) for key in ["hung", "h2", "h3"]}
+    try:
+        # A single worker: without a replacement, h2 and h3 would never start
+        host_reports = scan_hosts(scan_jobs, max_workers=1, host_timeout=0.2)
+    finally:
+        release.set()
+
+    assert {key: report["status"] for key, report in host_reports.items()} == \
+        {"hung": "timeout", "h2": "ok", "h3": "ok"}
+
+
+def test_missing_workbook_is_probed_again_once_the_negative_answer_expires(tmp_path, monkeypatch):
+    clock = [1_000.0]
+    monkeypatch.setattr("host_scan.time.time", lambda: clock[0])
+    monkeypatch.setattr(host_scan, "_required_file_cache", {})
+    timestamp_folder = str(tmp_path / "h1" / "U538G05900992" / "NVL_HotVmin" / "2025.07.25_19.28.10")
+    os.makedirs(os.path.join(timestamp_folder, "UnitLogs"))
+    assert host_scan.find_required_file(timestamp_folder, ["HotVmin.xlsx"]) is None
+
+    # The workbook lands in a subfolder, so the timestamp folder's mtime does not change
+    workbook = write_file(os.path.join(timestamp_folder, "UnitLogs", "U538G05900992_HotVmin.xlsx"))
+    clock[0] += host_scan.NEGATIVE_CACHE_SECONDS - 1
+    assert host_scan.find_required_file(timestamp_folder, ["HotVmin.xlsx"]) is None
+
+    clock[0] += 2
+    assert host_scan.find_required_file(timestamp_folder, ["HotVmin.xlsx"]) == workbook
+    os.remove(workbook)
+    clock[0] += host_scan.NEGATIVE_CACHE_SECONDS * 10
+    assert host_scan.find_required_file(timestamp_folder, ["HotVmin.xlsx"]) == workbook  # positive answers do not expire
@@ -0,0 +1,55 @@
+import os
+
+from conftest import write_file
+from incremental_sync import build_manifest, diff_manifests, file_is_current, sync_folder
+
+
+def test_file_is_current_allows_share_mtime_rounding():
+    assert file_is_current((10, 1000.0), (10, 1001.5))
+    assert not file_is_current((10, 1000.0), (10, 1003.0))
+    assert not file_is_current((10, 1000.0), (11, 1000.0))
+    assert not file_is_current((10, 1000.0), None)
+
+
+def test_diff_manifests_splits_copy_unchanged_and_extra():
+    source = {"a.xlsx": (5, 100.0), "b.txt": (3, 100.0), os.path.join("UnitLogs", "c.log"): (7, 100.0)}
+    dest = {"a.xlsx": (5, 101.0), "b.txt": (3, 50.0), "old.txt": (1, 1.0)}
+
+    to_copy, unchanged, extra = diff_manifests(source, dest)
+
+    assert to_copy == sorted([os.path.join("UnitLogs", "c.log"), "b.txt"])
+    assert unchanged == ["a.xlsx"]
+    assert extra == ["old.txt"]
+
+
+def test_build_manifest_lists_nested_files(timestamp_folder):
+    manifest = build_manifest(timestamp_folder)
+
+    assert sorted(manifest) == sorted(["unit_HotVmin.xlsx", os.path.join("UnitLogs", "log1.txt"), "notes.txt"])
+    assert manifest["notes.txt"] == (5, 1_750_000_200)
+    assert build_manifest(os.path.join(timestamp_folder, "missing")) == {}
+
+
+def test_sync_folder_copies_changes_and_mirrors_removals(tmp_path, timestamp_folder):
+    dest = str(tmp_path / "dest")
+    first = sync_folder(timestamp_folder, dest)
+    assert (first["files_copied"], first["files_skipped"]) == (3, 0)
+
+    write_file(os.path.join(timestamp_folder, "notes.txt"), b"changed notes", mtime=1_750_000_900)
+    os.remove(os.path.join(timestamp_folder, "UnitLogs", "log1.txt"))
+    second = sync_folder(timestamp_folder, dest)
+
+    assert (second["files_copied"], second["files_skipped"], second["files_removed"]) == (1, 1, 1)
+    assert build_manifest(dest) == build_manifest(timestamp_folder)
+
+
+def test_sync_folder_hash_check_catches_same_size_and_mtime(tmp_path, timestamp_folder):
+    dest = str(tmp_path / "dest")
+    sync_folder(timestamp_folder, dest)
+    # Same size and mtime, different content: only the hash check notices
+    write_file(os.path.join(dest, "notes.txt"), b"NOTES", mtime=1_750_000_200)
+
+    assert sync_folder(timestamp_folder, dest)["files_copied"] == 0
+    assert sync_folder(timestamp_folder, dest, hash_check=True)["files_copied"] == 1
+    with open(os.path.join(dest, "notes.txt"), "rb") as f:
+        assert f.read() == b"notes"
@@ -0,0 +1,68 @@
+import json
+from datetime import datetime
+
+from log_analyzer import parse_json_log, parse_text_log
+
+TEXT_LOG = """\
+2026-03-18 08:00:00,000 - INFO - Loaded 2 profiles
+2026-03-18 08:00:00,100 - INFO - Started processing source folder: //PG07TCMV0021/c$/Results
+2026-03-18 08:00:00,200 - INFO - Started processing source folder: //PG07TCMV0022/c$/Results
+2026-03-18 08:00:09,829 - INFO - Completed processing source folder: //PG07TCMV0021/c$/Results in 9.73 s (41 dirs listed)
+2026-03-18 08:00:30,200 - WARNING - Scan of source folder '//PG07TCMV0022/c$/Results' timed out after 30 s
+2026-03-18 08:00:31,000 - INFO - [NVL] Preparing to copy latest timestamp folder for '/d/U1/NVL_HotVmin' from '//PG07TCMV0021/c$/Results'
+2026-03-18 08:00:33,500 - INFO - [NVL] Completed copy of '//PG07TCMV0021/c$/Results/U1/NVL_HotVmin/2025.07.25_19.28.10' to '/d/U1/NVL_HotVmin/2025.07.25_19.28.10' (3 files, 4096 bytes in 2.50 s)
+2026-03-18 08:00:34,000 - INFO - [NVL] Preparing to copy latest timestamp folder for '/d/U2/NVL_GNG' from '//PG07TCMV0021/c$/Results'
+2026-03-18 08:00:35,000 - ERROR - [NVL] OSError while copying to '/d/U2/NVL_GNG': [Errno 5] Input/output error on //PG07TCMV0021
+2026-03-18 08:00:36,000 - INFO - Done
+"""
+
+
+def _ts(text):
+    return datetime.strptime(text, "%Y-%m-%d %H:%M:%S,%f").timestamp()
+
+
+def test_text_log_yields_scans_copies_and_errors(tmp_path):
+    path = tmp_path / "copy_log_20260318_080000.log"
+    path.write_text(TEXT_LOG, encoding="utf-8")
+
+    run = parse_text_log(str(path))
+
+    assert (run["run_start"], run["run_end"]) == (_ts("2026-03-18 08:00:00,000"), _ts("2026-03-18 08:00:36,000"))
+    assert (run["errors"], run["warnings"]) == (1, 1)
+    assert run["host_scans"] == [
+        ("//PG07TCMV0021/c$/Results", _ts("2026-03-18 08:00:00,100"), 9.73, "ok"),
+        ("//PG07TCMV0022/c$/Results", _ts("2026-03-18 08:00:00,200"), 30.0, "timeout"),
+    ]
+    copied, failed = run["folder_copies"]
+    assert copied == ("//PG07TCMV0021/c$/Results", "/d/U1/NVL_HotVmin/2025.07.25_19.28.10",
+                      _ts("2026-03-18 08:00:31,000"), 2.5, 3, 4096, "ok")
+    assert failed == ("//PG07TCMV0021/c$/Results", "/d/U2/NVL_GNG", _ts("2026-03-18 08:00:34,000"), 1.0, None, None, "failed")
+    assert [(host, message[:7]) for _, host, message in run["error_messages"]] == [("PG07TCMV0021", "OSError")]
+
+
+def test_json_log_yields_scan_host_events_and_copy_spans(tmp_path):
+    records = [
+        {"ts": 100.0, "level": "INFO", "thread": "MainThread", "msg": "Loaded 2 profiles"},
+        {"ts": 110.0, "level": "INFO", "thread": "scan_0", "msg": "scanned", "event": "scan_host",
+         "source_folder": "//PG07TCMV0021/c$/Results", "elapsed": 9.5, "status": "ok"},
+        {"ts": 115.0, "level": "INFO", "thread": "copy_0", "msg": "copied", "event": "span", "span": "copy_folder",
+         "source_folder": "//PG07TCMV0021/c$/Results", "dest": "/d/U1/NVL_HotVmin/2025.07.25_19.28.10",
+         "elapsed": 2.0, "files": 3, "bytes": 4096, "status": "ok"},
+        {"ts": 116.0, "level": "INFO", "thread": "MainThread", "msg": "scan", "event": "span", "span": "scan",
+         "elapsed": 12.0, "status": "ok"},
+        {"ts": 118.0, "level": "ERROR", "thread": "copy_1", "msg": "copy failed on //PG07TCMV0021", "event": "span",
+         "span": "shmoo_folder", "source_folder": "//PG07TCMV0021/c$/Results", "dest": "/d/U1/Shmoo",
+         "elapsed": 1.0, "status": "error"},
+    ]
+    path = tmp_path / "copy_log_20260318_080000.jsonl"
+    path.write_text("\n".join(json.dumps(record) for record in records) + "\nnot json\n", encoding="utf-8")
+
+    run = parse_json_log(str(path))
+
+    assert (run["run_start"], run["run_end"], run["errors"], run["warnings"]) == (100.0, 118.0, 1, 0)
+    assert run["host_scans"] == [("//PG07TCMV0021/c$/Results", 100.5, 9.5, "ok")]
+    assert run["folder_copies"] == [
+        ("//PG07TCMV0021/c$/Results", "/d/U1/NVL_HotVmin/2025.07.25_19.28.10", 113.0, 2.0, 3, 4096, "ok"),
+        ("//PG07TCMV0021/c$/Results", "/d/U1/Shmoo", 117.0, 1.0, None, None, "failed"),
+    ]
+    assert run["error_messages"] == [(118.0, "PG07TCMV0021", "copy failed on //PG07TCMV0021")]
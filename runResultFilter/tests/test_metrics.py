@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+from metrics import build_summary, write_metrics
+from run_log import add_host_totals, count, reset_totals, span
+
+
+@pytest.fixture(autouse=True)
+def fresh_totals():
+    reset_totals()
+    yield
+    reset_totals()
+
+
+def _run():
+    count("hosts_scanned", 2)
+    count("bytes_copied", 4096)
+    with span("scan", scans=2):
+        pass
+    with span("copy_folder", source_folder=r"\\PG07TCMV0021\c$\Results", files=3, bytes=4096):
+        pass
+    add_host_totals("scan_host", r"\\PG07TCMV0021\c$\Results", 2.0, dirs_listed=12)
+
+
+RESULTS = {"NVL": {"profile": "NVL", "status": "ok", "hosts_ok": 1, "hosts_total": 2, "timestamp_copies": 1,
+                   "incomplete": 0, "elapsed": 3.25, "estimate": {"bytes": 1}}}
+
+
+def test_build_summary_collects_the_run_totals():
+    _run()
+    summary = build_summary("run", 1_750_000_000.0, RESULTS)
+
+    assert summary["counters"] == {"hosts_scanned": 2, "bytes_copied": 4096}
+    assert sorted(summary["phases"]) == ["copy_folder", "scan"]
+    assert summary["phases"]["scan"]["count"] == 1
+    assert [(row["phase"], row["host"]) for row in summary["hosts"]] == \
+        [("copy_folder", "//pg07tcmv0021"), ("scan_host", "//pg07tcmv0021")]
+    assert summary["hosts"][1]["dirs_listed"] == 12
+    assert "estimate" not in summary["profiles"]["NVL"]
+
+
+def test_reset_totals_starts_the_next_summary_from_zero():
+    _run()
+    reset_totals()
+    count("hosts_scanned")
+
+    summary = build_summary("watch", 1_750_000_000.0, RESULTS)
+    assert (summary["counters"], summary["phases"], summary["hosts"]) == ({"hosts_scanned": 1}, {}, [])
+
+
+def test_write_metrics_writes_openmetrics_and_json(tmp_path):
+    _run()
+    prom_path, json_path = write_metrics(str(tmp_path / "metrics"), "run", 1_750_000_000.0, RESULTS, failed_profiles=1)
+
+    with open(prom_path, encoding="utf-8") as f:
+        prom = f.read()
+    assert prom.endswith("# EOF\n")
+    assert "# TYPE filterfx_hosts_scanned gauge\nfilterfx_hosts_scanned 2\n" in prom
+    assert "filterfx_run_success 0\n" in prom
+    assert 'filterfx_run_info{mode="run"} 1\n' in prom
+    assert 'filterfx_host_dirs_listed{phase="scan_host",host="//pg07tcmv0021",source_folder="\\\\\\\\PG07TCMV0021\\\\c$\\\\Results"} 12' in prom
+    assert 'filterfx_profile_duration_seconds{profile="NVL"} 3.25\n' in prom
+    with open(json_path, encoding="utf-8") as f:
+        assert json.load(f)["counters"]["bytes_copied"] == 4096
+    assert sorted(os.listdir(tmp_path / "metrics")) == ["filterfx.prom", "filterfx_metrics.json"]
@@ -0,0 +1,59 @@
+import os
+import itertools
+
+import pytest
+
+from conftest import write_file
+from packed_transfer import find_archive, pack_folder, packed_folder_current, read_index, read_member
+
+
+@pytest.fixture
+def packed(tmp_path, timestamp_folder):
+    dest = str(tmp_path / "packed" / os.path.basename(timestamp_folder))
+    pack_folder(timestamp_folder, dest)
+    return dest
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_index_offsets_point_at_each_members_data(timestamp_folder, packed):
+    index = read_index(packed)
+    archive = _read(find_archive(packed))
+
+    assert sorted(member["name"] for member in index["members"]) == ["UnitLogs/log1.txt", "notes.txt", "unit_HotVmin.xlsx"]
+    for member in index["members"]:
+        source = _read(os.path.join(timestamp_folder, *member["name"].split("/")))
+        assert member["size"] == len(source)
+        assert archive[member["offset"]:member["offset"] + member["size"]] == source
+    assert sorted(os.listdir(packed)) == ["_filterfx_packed.index.json", "_filterfx_packed.tar"]
+
+
+@pytest.mark.parametrize("compression", [None, "gz"])
+def test_read_member_returns_one_file(tmp_path, timestamp_folder, compression):
+    dest = str(tmp_path / "packed")
+    pack_folder(timestamp_folder, dest, compression)
+
+    assert read_member(dest, os.path.join("UnitLogs", "log1.txt")) == b"log line\n" * 10
+    assert read_member(dest, "notes.txt") == b"notes"
+    with pytest.raises(KeyError):
+        read_member(dest, "missing.txt")
+
+
+def test_packed_folder_is_current_until_the_source_changes(timestamp_folder, packed):
+    assert packed_folder_current(timestamp_folder, packed)
+    write_file(os.path.join(timestamp_folder, "UnitLogs", "log2.txt"))
+    assert not packed_folder_current(timestamp_folder, packed)
+
+
+def test_slow_source_read_hits_the_deadline(tmp_path, monkeypatch):
+    source = str(tmp_path / "src")
+    write_file(os.path.join(source, "UnitLogs", "big.log"), bytes(4 * 1024 * 1024))
+    clock = itertools.count(step=1.0)
+    monkeypatch.setattr("packed_transfer.time.time", lambda: next(clock))
+
+    # Compressed, the archive is written in a few bursts: only the reads can notice the deadline
+    with pytest.raises(TimeoutError):
+        pack_folder(source, str(tmp_path / "packed"), "gz", timeout=30)
@@ -0,0 +1,79 @@
+import threading
+from datetime import datetime
+
+from pipeline import CopyFeed
+
+
+def _report(info, status="ok"):
+    return {"status": status, "info": {dest: (folder, datetime(2025, 7, day), 0.0) for dest, (folder, day) in info.items()}}
+
+
+def _consume(feed):
+    items = []
+    thread = threading.Thread(target=lambda: items.extend(feed))
+    thread.start()
+    return items, thread
+
+
+def test_folder_is_released_once_its_known_holders_reported():
+    feed = CopyFeed(["h1", "h2", "h3"], holders={"/d/U1/T": {"h1"}, "/d/U2/T": {"h1", "h2"}})
+    feed.host_done("h1", _report({"/d/U1/T": ("/h1/U1/T/a", 1), "/d/U2/T": ("/h1/U2/T/a", 1)}))
+
+    assert [item.dest_folder_path for item in list(feed.queue.queue)] == ["/d/U1/T"]
+
+    feed.host_done("h2", _report({"/d/U2/T": ("/h2/U2/T/b", 2), "/d/U3/T": ("/h2/U3/T/b", 2)}))
+    assert [(item.dest_folder_path, item.source_folder) for item in list(feed.queue.queue)] == \
+        [("/d/U1/T", "h1"), ("/d/U2/T", "h2")]
+
+    items, thread = _consume(feed)
+    feed.host_done("h3", _report({}, status="timeout"))
+    thread.join(5)
+    # /d/U3/T was unknown to the index, so it waited for every source folder
+    assert [item.dest_folder_path for item in items] == ["/d/U1/T", "/d/U2/T", "/d/U3/T"]
+    assert sorted(feed.host_reports) == ["h1", "h2", "h3"]
+
+
+def test_newer_folder_from_an_unexpected_host_is_released_again():
+    feed = CopyFeed(["h1", "h2"], holders={"/d/U1/T": {"h1"}, "/d/U2/T": {"h1"}})
+    items, thread = _consume(feed)
+    feed.host_done("h1", _report({"/d/U1/T": ("/h1/U1/T/a", 1), "/d/U2/T": ("/h1/U2/T/a", 5)}))
+    feed.host_done("h2", _report({"/d/U1/T": ("/h2/U1/T/b", 3), "/d/U2/T": ("/h2/U2/T/b", 4)}))
+    thread.join(5)
+
+    # U1 moved to a newer run on h2 and goes out again; U2's older copy on h2 changes nothing
+    assert [(item.dest_folder_path, item.latest_folder) for item in items] == \
+        [("/d/U1/T", "/h1/U1/T/a"), ("/d/U2/T", "/h1/U2/T/a"), ("/d/U1/T", "/h2/U1/T/b")]
+
+
+def test_ties_keep_the_earlier_source_folder():
+    feed = CopyFeed(["h1", "h2"])
+    items, thread = _consume(feed)
+    feed.host_done("h2", _report({"/d/U1/T": ("/h2/U1/T/a", 1)}))
+    feed.host_done("h1", _report({"/d/U1/T": ("/h1/U1/T/a", 1)}))
+    thread.join(5)
+
+    assert [item.source_folder for item in items] == ["h1"]
+
+
+def test_finish_ends_the_feed_when_the_scan_stops_early():
+    feed = CopyFeed(["h1", "h2"])
+    items, thread = _consume(feed)
+    feed.host_done("h1", _report({"/d/U1/T": ("/h1/U1/T/a", 1)}))
+    feed.finish()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert [item.dest_folder_path for item in items] == ["/d/U1/T"]
+
+
+def test_full_queue_holds_the_scan_back_until_closed():
+    feed = CopyFeed(["h1", "h2"], holders={"/d/U1/T": {"h1"}, "/d/U2/T": {"h1"}}, maxsize=1)
+    scan = threading.Thread(target=feed.host_done,
+                            args=("h1", _report({"/d/U1/T": ("/h1/U1/T/a", 1), "/d/U2/T": ("/h1/U2/T/a", 1)})))
+    scan.start()
+    scan.join(0.3)
+    assert scan.is_alive()  # the second folder does not fit in the queue
+
+    feed.close()  # the copy side gave up; the scan must not wait forever
+    scan.join(5)
+    assert not scan.is_alive()
@@ -0,0 +1,62 @@
+import os
+import multiprocessing
+
+import pytest
+
+import rollup
+from conftest import write_file
+from rollup import DEFAULT_SHEETS, compile_rollup, find_workbooks, sheets_for
+
+
+def test_each_workbook_gets_the_sheet_of_its_keyword():
+    assert sheets_for("U538G05900992_NVL_GNG.xlsx", DEFAULT_SHEETS) == {"ExecuteContent_Marionette_GNG": None}
+    assert sheets_for("u538g05900992_hotvmin.xlsx", DEFAULT_SHEETS) == {"SearchVoltage Results": None}
+    assert sheets_for("summary.xlsx", DEFAULT_SHEETS) is None
+    assert sheets_for("anything.xlsx", {"": {"Sheet1": None}}) == {"Sheet1": None}
+
+
+def test_workbooks_below_shmoo_are_found_and_unit_logs_are_not(tmp_path):
+    destination = str(tmp_path / "results")
+    hot = write_file(os.path.join(destination, "U1", "NVL_HotVmin", "2025.07.25_19.28.10", "U1_HotVmin.xlsx"))
+    shmoo = write_file(os.path.join(destination, "U1", "Shmoo", "NVL_GNG", "2025.07.25_20.00.00", "U1_GNG.xlsx"))
+    write_file(os.path.join(destination, "U2", "NVL_HotVmin", "2025.07.25_19.28.10", "UnitLogs", "copy_HotVmin.xlsx"))
+
+    found = {row[0]: row[1:4] for row in find_workbooks(destination)}
+
+    assert found == {hot: ("U1", "NVL_HotVmin", "2025.07.25_19.28.10"),
+                     shmoo: ("U1", "NVL_GNG", "2025.07.25_20.00.00")}
+
+
+def test_unreadable_workbook_is_read_again_on_the_next_run(tmp_path, monkeypatch):
+    openpyxl = pytest.importorskip("openpyxl")
+    if multiprocessing.get_start_method() != "fork":
+        pytest.skip("the patched reader only reaches forked worker processes")
+    destination = str(tmp_path / "results")
+    path = os.path.join(destination, "U1", "NVL_HotVmin", "2025.07.25_19.28.10", "U1_HotVmin.xlsx")
+    os.makedirs(os.path.dirname(path))
+    workbook = openpyxl.Workbook()
+    workbook.active.title = "SearchVoltage Results"
+    workbook.active.append(["Pin", "Vmin"])
+    workbook.active.append(["VCC", 0.71])
+    workbook.save(path)
+    # Worker processes are forked, so they see the patched reader; it fails while the marker exists
+    locked = str(tmp_path / "locked")
+    write_file(locked)
+    read_workbook = rollup.read_workbook
+
+    def flaky_read_workbook(*args):
+        if os.path.exists(locked):
+            raise PermissionError(13, "The file is being written by the tester")
+        return read_workbook(*args)
+
+    monkeypatch.setattr(rollup, "read_workbook", flaky_read_workbook)
+    state_path = str(tmp_path / "rollup.sqlite")
+
+    first = compile_rollup(destination, state_path, workers=1)
+    os.remove(locked)
+    second = compile_rollup(destination, state_path, workers=1)
+    third = compile_rollup(destination, state_path, workers=1)
+
+    assert (first["failed"], first["ingested"]) == (1, 0)
+    assert (second["failed"], second["ingested"], second["rows"]) == (0, 1, 1)
+    assert (third["unchanged"], third["ingested"]) == (1, 0)
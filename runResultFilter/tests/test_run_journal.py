@@ -0,0 +1,99 @@
+import errno
+import shutil
+
+import pytest
+
+from run_journal import RunJournal, is_transient, retry
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr("run_journal.time.sleep", slept.append)
+    return slept
+
+
+def _failing(errors, result="ok"):
+    """Return a callable raising the given errors in turn, then returning result."""
+    errors = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    fn.calls = calls
+    return fn
+
+
+def test_is_transient():
+    assert is_transient(OSError(errno.ETIMEDOUT, "timed out"))
+    assert is_transient(ConnectionResetError())
+    assert not is_transient(PermissionError(errno.EACCES, "denied"))
+    assert not is_transient(OSError(errno.ENOSPC, "disk full"))
+
+
+def test_folder_copy_error_is_transient_only_without_permanent_file_errors():
+    assert is_transient(shutil.Error([("a", "b", "file deadline of 120 seconds exceeded"),
+                                      ("c", "d", "[Errno 110] Connection timed out")]))
+    assert not is_transient(shutil.Error([("a", "b", "file deadline of 120 seconds exceeded"),
+                                          ("c", "d", "[Errno 28] No space left on device: 'd'")]))
+    assert not is_transient(shutil.Error([("a", "b", "[WinError 5] Access is denied: 'b'")]))
+    assert not is_transient(shutil.Error([("a", "b", str(PermissionError(errno.EACCES, "Permission denied", "b")))]))
+
+
+def test_retry_gives_up_on_a_folder_that_filled_the_share(sleeps):
+    fn = _failing([shutil.Error([("a", "b", str(OSError(errno.ENOSPC, "No space left on device", "b")))])])
+
+    with pytest.raises(shutil.Error):
+        retry(fn, attempts=3)
+    assert len(fn.calls) == 1 and sleeps == []
+
+def test_retry_backs_off_exponentially_up_to_the_cap(sleeps):
+    fn = _failing([OSError(errno.ETIMEDOUT, "timed out")] * 4)
+
+    assert retry(fn, attempts=5, base_delay=2.0, max_delay=5.0) == "ok"
+    assert len(fn.calls) == 5
+    assert sleeps == [2.0, 4.0, 5.0, 5.0]
+
+
+def test_retry_raises_the_last_error_after_the_last_attempt(sleeps):
+    fn = _failing([OSError(errno.ETIMEDOUT, "first"), OSError(errno.ETIMEDOUT, "last")])
+
+    with pytest.raises(OSError, match="last"):
+        retry(fn, attempts=2, base_delay=1.0)
+    assert sleeps == [1.0]
+
+
+def test_retry_does_not_retry_permanent_errors(sleeps):
+    fn = _failing([PermissionError(errno.EACCES, "denied")])
+
+    with pytest.raises(PermissionError):
+        retry(fn, attempts=3)
+    assert len(fn.calls) == 1
+    assert sleeps == []
+
+
+def test_unfinished_journal_is_loaded_for_resume(tmp_path):
+    journal_dir = str(tmp_path / "journals")
+    journal = RunJournal.start(journal_dir, "NVL", "20250725_120000", "/logs/plan.json")
+    journal.record_done("/dest/U1/T/2025.07.25_19.28.10")
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"event": "done", "de')  # killed mid-write
+
+    resumed = RunJournal.load_unfinished(journal_dir, "NVL")
+
+    assert (resumed.run_stamp, resumed.plan_path) == ("20250725_120000", "/logs/plan.json")
+    assert resumed.is_done("/dest/U1/T/2025.07.25_19.28.10")
+    assert not resumed.is_done("/dest/U2/T/2025.07.25_19.28.10")
+
+
+def test_finished_journal_has_nothing_to_resume(tmp_path):
+    journal_dir = str(tmp_path / "journals")
+    assert RunJournal.load_unfinished(journal_dir, "NVL") is None
+    journal = RunJournal.start(journal_dir, "NVL", "20250725_120000", "/logs/plan.json")
+    journal.finish()
+
+    assert RunJournal.load_unfinished(journal_dir, "NVL") is None
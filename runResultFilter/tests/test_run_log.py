@@ -0,0 +1,48 @@
+import json
+import logging
+
+import pytest
+
+from run_log import JsonLinesFormatter, count, log_event, reset_totals, run_totals, span
+
+
+@pytest.fixture(autouse=True)
+def fresh_totals():
+    reset_totals()
+    yield
+    reset_totals()
+
+
+def _json_lines(caplog):
+    formatter = JsonLinesFormatter()
+    return [json.loads(formatter.format(record)) for record in caplog.records]
+
+
+def test_event_fields_go_into_the_json_line(caplog):
+    with caplog.at_level(logging.INFO):
+        log_event("scan_host", "Completed processing source folder: //h1/Results", source_folder="//h1/Results", elapsed=1.5)
+        logging.warning("plain message")
+
+    event, plain = _json_lines(caplog)
+    assert (event["level"], event["event"], event["source_folder"], event["elapsed"]) == \
+        ("INFO", "scan_host", "//h1/Results", 1.5)
+    assert event["msg"] == "Completed processing source folder: //h1/Results"
+    assert set(plain) == {"ts", "level", "thread", "msg"}
+
+
+def test_span_times_the_block_and_keeps_totals(caplog):
+    with caplog.at_level(logging.INFO):
+        with span("copy_folder", source_folder="//h1/Results", dest="/d/U1/T") as fields:
+            fields["files"] = 3
+        with pytest.raises(OSError):
+            with span("copy_folder", source_folder="//h1/Results", dest="/d/U2/T"):
+                raise OSError("share dropped")
+    count("files_copied", 3)
+
+    ok, failed = _json_lines(caplog)
+    assert (ok["event"], ok["span"], ok["status"], ok["files"]) == ("span", "copy_folder", "ok", 3)
+    assert (failed["status"], failed["error"]) == ("error", "share dropped")
+    counters, spans, hosts = run_totals()
+    assert counters == {"files_copied": 3}
+    assert (spans["copy_folder"]["count"], spans["copy_folder"]["errors"]) == (2, 1)
+    assert hosts[("copy_folder", "//h1/Results")]["files"] == 3
@@ -0,0 +1,46 @@
+import os
+import sqlite3
+from datetime import datetime
+
+from scan_index import ScanIndex, scan_key
+
+SOURCE = "/h1/Results"
+PATH = os.path.join(SOURCE, "U538G05900992", "NVL_HotVmin")
+LATEST = os.path.join(PATH, "2025.07.25_19.28.10")
+RUN = datetime(2025, 7, 25, 19, 28, 10)
+
+
+def test_scan_key_depends_on_rules_and_keywords_not_their_order():
+    rules = {"shmoo_keywords": ["Shmoo"]}
+    assert scan_key(rules, ["HotVmin.xlsx", "GNG"]) == scan_key(rules, ["GNG", "HotVmin.xlsx"])
+    assert scan_key(rules, ["HotVmin.xlsx"]) != scan_key(rules, ["GNG"])
+    assert scan_key(rules, ["HotVmin.xlsx"]) != scan_key({}, ["HotVmin.xlsx"])
+
+
+def test_selection_is_reused_only_for_the_same_key_and_mtime(tmp_path):
+    index = ScanIndex(str(tmp_path / "scan_index.sqlite"))
+    hot, gng = scan_key({}, ["HotVmin.xlsx"]), scan_key({}, ["GNG"])
+    index.record_test_folder(PATH, SOURCE, "/d/U538G05900992/NVL_HotVmin", 10.0, LATEST, RUN, 5.0, True, key=hot)
+    index.record_test_folder(PATH, SOURCE, "/d/U538G05900992/NVL_HotVmin", 10.0, None, None, None, False, key=gng)
+
+    assert index.lookup_test_folder(PATH, 10.0, key=hot) == (LATEST, RUN, 5.0)
+    assert index.lookup_test_folder(PATH, 11.0, key=hot) is None  # folder changed since
+    assert index.lookup_test_folder(PATH, 10.0, key=gng) is None  # still waiting for its workbook
+    assert (index.hits, index.misses) == (1, 2)
+    assert len(index.new_runs_since(datetime(2025, 7, 1))) == 1
+    index.close()
+
+
+def test_index_from_before_scan_keys_is_dropped(tmp_path):
+    db_path = str(tmp_path / "scan_index.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE test_folders (path TEXT PRIMARY KEY, dir_mtime REAL)")
+    conn.execute("INSERT INTO test_folders VALUES (?, ?)", (PATH, 10.0))
+    conn.commit()
+    conn.close()
+
+    index = ScanIndex(db_path)
+    assert index.lookup_test_folder(PATH, 10.0) is None
+    index.record_test_folder(PATH, SOURCE, "/d/U538G05900992/NVL_HotVmin", 10.0, LATEST, RUN, 5.0, True)
+    assert index.lookup_test_folder(PATH, 10.0) == (LATEST, RUN, 5.0)
+    index.close()
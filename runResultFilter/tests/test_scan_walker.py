@@ -0,0 +1,63 @@
+import os
+
+from conftest import write_file
+from scan_walker import iter_scan_targets, make_scan_rules, new_scan_stats, walk_scan_tree
+
+TIMESTAMP = "2025.07.25_19.28.10"
+
+
+def _tree(source_folder):
+    """A tester tree with a regular unit, the excluded decoys and a folder too deep to hold test folders."""
+    for relative in (os.path.join("U538G05900992", "NVL_HotVmin"),
+                     os.path.join("U538G05900992", "NVL_GNG"),
+                     os.path.join("U538G05900992", "Shmoo", "NVL_Shmoo_HotVmin"),
+                     os.path.join("99999999_999_+99_+99", "U538G05900993", "NVL_HotVmin"),
+                     os.path.join("U538G05900994", "DOE_sweep", "NVL_HotVmin"),
+                     os.path.join("U538G05900995", "a", "b", "NVL_HotVmin")):
+        write_file(os.path.join(source_folder, relative, TIMESTAMP, "UnitLogs", "log1.txt"))
+
+
+def _targets(source_folder, rules=None, stats=None):
+    return [(kind, os.path.relpath(path, source_folder))
+            for kind, _, _, path in iter_scan_targets(source_folder, rules, stats)]
+
+
+def test_excluded_and_too_deep_folders_are_never_listed(tmp_path):
+    source_folder = str(tmp_path / "h1")
+    _tree(source_folder)
+    listed = []
+    stats = new_scan_stats()
+
+    for root, _, _ in walk_scan_tree(source_folder, make_scan_rules(), stats):
+        listed.append(os.path.relpath(root, source_folder))
+
+    # Source folder, the four units, Shmoo and a/ (depth 2); never a decoy, a test folder or b/
+    assert listed == [".", "U538G05900992", os.path.join("U538G05900992", "Shmoo"),
+                      "U538G05900994", "U538G05900995", os.path.join("U538G05900995", "a")]
+    assert stats["dirs_listed"] == 6
+    assert stats["dirs_pruned"] == 2
+    assert sorted(os.path.relpath(path, source_folder) for path in stats["pruned_paths"]) == \
+        ["99999999_999_+99_+99", os.path.join("U538G05900994", "DOE_sweep")]
+
+
+def test_scan_targets_by_kind(tmp_path):
+    source_folder = str(tmp_path / "h1")
+    _tree(source_folder)
+
+    assert _targets(source_folder) == [
+        ("test", os.path.join("U538G05900992", "NVL_GNG")),
+        ("test", os.path.join("U538G05900992", "NVL_HotVmin")),
+        ("shmoo", os.path.join("U538G05900992", "Shmoo")),
+        ("shmoo_test", os.path.join("U538G05900992", "Shmoo", "NVL_Shmoo_HotVmin")),
+    ]
+
+
+def test_globs_and_depth_rules(tmp_path):
+    source_folder = str(tmp_path / "h1")
+    _tree(source_folder)
+
+    only_hot = make_scan_rules(include_globs=["*HotVmin"], exclude_globs=["Shmoo"])
+    assert _targets(source_folder, only_hot) == [("test", os.path.join("U538G05900992", "NVL_HotVmin"))]
+
+    deeper = make_scan_rules(max_depth=4)
+    assert ("test", os.path.join("U538G05900995", "a", "b", "NVL_HotVmin")) in _targets(source_folder, deeper)
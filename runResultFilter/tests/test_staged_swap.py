@@ -0,0 +1,53 @@
+import os
+
+from conftest import write_file
+from staged_swap import (TRASH_DIR_NAME, DeferredDeleter, retire_old_timestamp_folders, staged_copy,
+                         staging_path_for)
+
+
+def _copy_fn(files):
+    def copy(source, staging):
+        for name, data in files.items():
+            write_file(os.path.join(staging, name), data)
+        return len(files)
+    return copy
+
+
+def test_staged_copy_swaps_in_and_retires_the_old_version(tmp_path):
+    destination = str(tmp_path / "results")
+    dest_timestamp_folder = os.path.join(destination, "U1", "T_HotVmin", "2025.07.25_19.28.10")
+    write_file(os.path.join(dest_timestamp_folder, "old.txt"), b"old")
+    deleter = DeferredDeleter(destination)
+
+    assert staged_copy("unused", dest_timestamp_folder, _copy_fn({"new.txt": b"new"}), deleter) == 1
+    assert deleter.close(timeout=10)
+
+    assert os.listdir(dest_timestamp_folder) == ["new.txt"]
+    assert not os.path.exists(staging_path_for(dest_timestamp_folder))
+    assert os.listdir(os.path.join(destination, TRASH_DIR_NAME)) == []
+
+
+def test_retire_old_timestamp_folders_keeps_the_latest_and_other_folders(tmp_path):
+    destination = str(tmp_path / "results")
+    test_folder = os.path.join(destination, "U1", "T_HotVmin")
+    for name in ("2025.07.01_10.00.00", "2025.07.02_10.00.00", ".staging_2025.07.01_09.00.00",
+                 "2025.07.25_19.28.10", "Notes"):
+        os.makedirs(os.path.join(test_folder, name))
+    deleter = DeferredDeleter(destination)
+
+    retire_old_timestamp_folders(test_folder, "2025.07.25_19.28.10", deleter)
+    assert deleter.close(timeout=10)
+
+    assert sorted(os.listdir(test_folder)) == ["2025.07.25_19.28.10", "Notes"]
+    assert os.listdir(os.path.join(destination, TRASH_DIR_NAME)) == []
+
+
+def test_deferred_deleter_empties_trash_left_by_an_earlier_run(tmp_path):
+    destination = str(tmp_path / "results")
+    write_file(os.path.join(destination, TRASH_DIR_NAME, "20250101_000000_1_old", "f.txt"))
+
+    deleter = DeferredDeleter(destination)
+    assert deleter.close(timeout=10)
+
+    assert deleter.deleted == 1
+    assert os.listdir(os.path.join(destination, TRASH_DIR_NAME)) == []
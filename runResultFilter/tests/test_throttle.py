@@ -0,0 +1,88 @@
+import json
+import logging
+import threading
+
+import pytest
+
+from throttle import Governor, TokenBucket, parse_rate
+
+
+def test_parse_rate():
+    assert parse_rate("20MB") == 20 * 1024 ** 2
+    assert parse_rate("512k/s") == 512 * 1024
+    assert parse_rate("1048576") == 1048576
+    assert parse_rate(1000) == 1000
+    assert parse_rate("off") is None
+    assert parse_rate(None) is None
+    with pytest.raises(ValueError):
+        parse_rate("5 parsecs")
+
+
+def test_token_bucket_waits_for_tokens(monkeypatch):
+    clock = [100.0]
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr("throttle.time.monotonic", lambda: clock[0])
+    monkeypatch.setattr("throttle.time.sleep", sleep)
+    bucket = TokenBucket(rate=1000, max_slice=10)
+
+    assert bucket.consume(1000) == 0.0  # the one-second burst
+    assert bucket.consume(500) == pytest.approx(0.5)
+    assert TokenBucket(rate=None).consume(10 ** 9) == 0.0
+
+
+def test_token_bucket_wait_is_cancellable():
+    bucket = TokenBucket(rate=1, max_slice=0.05)
+    bucket.consume(1)
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(TimeoutError):
+        bucket.consume(1, cancel_event)
+
+
+def test_live_control_file_overrides_profile_rates(tmp_path):
+    control_path = str(tmp_path / "throttle.json")
+    governor = Governor(source_host_rate="10MB", control_path=control_path)
+    governor.set_source_host_rate(r"\\PG07TCMV0021\c$\Results", "2MB", "NVL")
+
+    assert governor._setting("source_host_bytes_per_sec", "//pg07tcmv0021") == 2 * 1024 ** 2
+    assert governor._setting("source_host_bytes_per_sec", "//pg07tcmv0099") == 10 * 1024 ** 2
+    with open(control_path, "w", encoding="utf-8") as f:
+        json.dump({"hosts": {"//pg07tcmv0021": "1MB"}}, f)
+    assert governor.poll_control_file()
+    assert governor._setting("source_host_bytes_per_sec", "//pg07tcmv0021") == 1024 ** 2
+
+
+def test_conflicting_profile_rates_keep_the_lower_one(caplog):
+    governor = Governor()
+    with caplog.at_level(logging.WARNING):
+        governor.set_dest_rate("U:/S16C/results", "50MB", "S16C")
+        governor.set_dest_rate("U:/ARL/results", "20MB", "ARL")
+        governor.set_dest_rate("U:/NVL/results", "80MB", "NVL")
+        governor.set_source_host_rate(r"\\PG07TCMV0088\c$\S16C", None, "S16C")
+        governor.set_source_host_rate(r"\\PG07TCMV0088\c$\ARL", "5MB", "ARL")
+
+    assert governor._setting("dest_bytes_per_sec", "U:") == 20 * 1024 ** 2
+    assert governor._setting("source_host_bytes_per_sec", "//pg07tcmv0088") == 5 * 1024 ** 2
+    assert len(caplog.records) == 3
+    assert "NVL" in caplog.records[1].getMessage() and "keeping 20MB" in caplog.records[1].getMessage()
+
+
+def test_open_files_cap_blocks_until_a_slot_frees():
+    governor = Governor(max_open_files=2)
+    entered = threading.Event()
+
+    def second():
+        with governor.open_files():
+            entered.set()
+
+    with governor.open_files():
+        thread = threading.Thread(target=second)
+        thread.start()
+        assert not entered.wait(0.2)
+    thread.join(5)
+    assert entered.is_set()
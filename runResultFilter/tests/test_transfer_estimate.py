@@ -0,0 +1,41 @@
+import json
+
+from transfer_estimate import ThroughputHistory, format_estimate, new_transfer_estimate
+
+MB = 1024 * 1024
+
+
+def test_history_takes_the_median_of_the_profiles_own_runs(tmp_path):
+    history = ThroughputHistory(str(tmp_path / "history" / "throughput.jsonl"))
+    history.record("NVL", 10 * MB, 10)
+    history.record("NVL", 30 * MB, 10)
+    history.record("NVL", 60 * MB, 10)
+    history.record("NVL", 100, 0.01)  # too small to say anything about throughput
+    history.record("NVL", 10 * MB, 0)  # not recorded at all
+    history.record("ARL", 100 * MB, 1)
+
+    assert history.bytes_per_second("NVL") == 3 * MB
+    assert history.bytes_per_second("S16C") == 4.5 * MB  # no runs of its own: the median over every profile
+    with open(history.path, encoding="utf-8") as f:
+        assert [json.loads(line)["profile"] for line in f] == ["NVL", "NVL", "NVL", "NVL", "ARL"]
+
+
+def test_history_without_a_file_has_no_rate(tmp_path):
+    assert ThroughputHistory(str(tmp_path / "missing.jsonl")).bytes_per_second("NVL") is None
+    assert ThroughputHistory(None).bytes_per_second("NVL") is None
+
+
+def test_format_estimate_reports_time_and_top_folders():
+    estimate = new_transfer_estimate()
+    estimate.update(files=30, bytes=120 * MB, files_current=5, bytes_current=MB,
+                    by_host={"//h1/Results": [20, 90 * MB], "//h2/Results": [10, 30 * MB]},
+                    by_unit={"U538G05900992": [30, 120 * MB]},
+                    largest=[(90 * MB, 20, "//h1/Results/U538G05900992/NVL_HotVmin/2025.07.25_19.28.10", "/d")])
+
+    report = format_estimate(estimate, bytes_per_second=2 * MB)
+
+    assert "30 files (120.0 MB) to transfer, 5 files (1.0 MB) already current" in report
+    assert "estimated copy time 1.0 min at 2.0 MB/s" in report
+    assert report.index("//h1/Results") < report.index("//h2/Results")
+    assert "75.0%" in report
+    assert "no throughput history yet" in format_estimate(estimate)
@@ -0,0 +1,75 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import write_file
+from packed_transfer import pack_folder
+from verify import HashCache, Verifier
+
+
+@pytest.fixture
+def copied(tmp_path, timestamp_folder):
+    dest = str(tmp_path / "dest" / os.path.basename(timestamp_folder))
+    shutil.copytree(timestamp_folder, dest)
+    return dest
+
+
+@pytest.mark.parametrize("mode", ["fast", "strict"])
+def test_identical_copy_passes(timestamp_folder, copied, mode):
+    verifier = Verifier(mode, workers=2)
+    try:
+        assert verifier.verify_folder(timestamp_folder, copied) == []
+    finally:
+        verifier.close()
+
+
+def test_fast_mode_reports_missing_extra_and_size(timestamp_folder, copied):
+    os.remove(os.path.join(copied, "notes.txt"))
+    write_file(os.path.join(copied, "stray.tmp"))
+    write_file(os.path.join(copied, "unit_HotVmin.xlsx"), b"short", mtime=1_750_000_000)
+
+    problems = Verifier("fast").verify_folder(timestamp_folder, copied)
+
+    assert problems == ["missing notes.txt", "size unit_HotVmin.xlsx: 5 bytes, source has 800", "extra stray.tmp"]
+
+
+def test_only_strict_mode_reads_contents(timestamp_folder, copied):
+    write_file(os.path.join(copied, "notes.txt"), b"NOTES", mtime=1_750_000_200)
+
+    assert Verifier("fast").verify_folder(timestamp_folder, copied) == []
+    verifier = Verifier("strict", workers=2)
+    try:
+        assert verifier.verify_folder(timestamp_folder, copied) == ["content notes.txt"]
+    finally:
+        verifier.close()
+
+
+def test_hash_cache_reuses_source_hashes(tmp_path, timestamp_folder, copied):
+    hash_cache = HashCache(str(tmp_path / "hashes.sqlite"))
+    verifier = Verifier("strict", workers=2, hash_cache=hash_cache)
+    try:
+        verifier.verify_folder(timestamp_folder, copied)
+        verifier.verify_folder(timestamp_folder, copied)
+    finally:
+        verifier.close()
+        hash_cache.close()
+
+    assert (hash_cache.misses, hash_cache.hits) == (3, 3)
+
+
+def test_packed_folder_is_checked_against_its_index_and_archive(tmp_path, timestamp_folder):
+    packed = str(tmp_path / "packed" / os.path.basename(timestamp_folder))
+    pack_folder(timestamp_folder, packed)
+    verifier = Verifier("strict", workers=2)
+    try:
+        assert verifier.verify_folder(timestamp_folder, packed) == []
+        write_file(os.path.join(timestamp_folder, "notes.txt"), b"NOTES", mtime=1_750_000_200)
+        assert verifier.verify_folder(timestamp_folder, packed) == ["content notes.txt"]
+    finally:
+        verifier.close()
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        Verifier("paranoid")
@@ -0,0 +1,83 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import write_file
+from scan_walker import make_scan_rules
+from watch import HostWatcher
+
+UNIT = "U538G05900992"
+
+
+@pytest.fixture
+def source_folder(tmp_path):
+    folder = str(tmp_path / "h1")
+    write_file(os.path.join(folder, UNIT, "NVL_HotVmin", "2025.07.25_19.28.10", "unit_HotVmin.xlsx"))
+    write_file(os.path.join(folder, "U538G05900993", "NVL_GNG", "2025.07.25_19.28.10", "unit_GNG.xlsx"))
+    return folder
+
+
+def _touch(path, mtime):
+    os.utime(path, (mtime, mtime))
+
+
+def test_new_timestamp_folder_reports_its_unit(source_folder):
+    watcher = HostWatcher(source_folder, make_scan_rules())
+    assert watcher.poll() == set()  # baseline
+    assert watcher.poll() == set()
+
+    test_folder = os.path.join(source_folder, UNIT, "NVL_HotVmin")
+    os.makedirs(os.path.join(test_folder, "2025.07.26_08.00.00"))
+    _touch(test_folder, 1_760_000_000)
+
+    assert watcher.poll() == {UNIT}
+    assert watcher.poll() == set()
+
+
+def test_pending_folder_is_watched_for_its_workbook(source_folder):
+    test_folder = os.path.join(source_folder, UNIT, "NVL_HotVmin")
+    timestamp_folder = os.path.join(test_folder, "2025.07.26_08.00.00")
+    os.makedirs(timestamp_folder)
+    watcher = HostWatcher(source_folder, make_scan_rules())
+    watcher.poll()
+    watcher.set_pending([test_folder])
+    assert watcher.poll() == set()  # becoming pending is not a change
+
+    # The workbook lands in the timestamp folder; the test folder's own mtime stays the same
+    write_file(os.path.join(timestamp_folder, "unit_HotVmin.xlsx"))
+    _touch(timestamp_folder, 1_760_000_000)
+
+    assert watcher.poll() == {UNIT}
+
+
+def test_unreachable_source_backs_off_then_reports_every_unit(source_folder, monkeypatch):
+    clock = [1_000.0]
+    monkeypatch.setattr("watch.time.time", lambda: clock[0])
+    watcher = HostWatcher(source_folder, make_scan_rules(), poll_interval=10, max_backoff=50)
+    watcher.poll()
+    moved = source_folder + "_offline"
+    os.rename(source_folder, moved)
+
+    next_polls = []
+    for _ in range(3):
+        assert watcher.poll() is None
+        next_polls.append(watcher.next_poll - clock[0])
+    assert next_polls == [20, 40, 50]
+    assert not watcher.due()
+    assert watcher.needs_full_scan
+
+    os.rename(moved, source_folder)
+    clock[0] += 50
+    assert watcher.due()
+    assert watcher.poll() == {UNIT, "U538G05900993"}
+    assert (watcher.failures, watcher.needs_full_scan, watcher.next_poll) == (0, False, clock[0] + 10)
+    assert watcher.poll() == set()
+
+
+def test_removed_unit_is_reported(source_folder):
+    watcher = HostWatcher(source_folder, make_scan_rules())
+    watcher.poll()
+    shutil.rmtree(os.path.join(source_folder, "U538G05900993"))
+
+    assert watcher.poll() == {"U538G05900993"}
@@ -0,0 +1,44 @@
+import os
+from datetime import datetime
+
+from scan_walker import new_scan_stats
+from work_plan import WorkPlan, build_work_plan
+
+HOST_1, HOST_2 = "//h1/Results", "//h2/Results"
+DEST = os.path.join("/d", "U1", "NVL_HotVmin")
+
+
+def _plan():
+    newer = (os.path.join(HOST_2, "U1", "NVL_HotVmin", "2025.07.26_08.00.00"), datetime(2025, 7, 26, 8, 0, 0), HOST_2)
+    older = (os.path.join(HOST_1, "U1", "NVL_HotVmin", "2025.07.25_19.28.10"), datetime(2025, 7, 25, 19, 28, 10), HOST_1)
+    stats = dict(new_scan_stats(), dirs_listed=12)
+    host_reports = {
+        HOST_1: {"status": "ok", "elapsed": 1.23456, "stats": stats, "info": {DEST: older},
+                 "shmoo": [(os.path.join(HOST_1, "U1", "Shmoo"), os.path.join("/d", "U1", "Shmoo"))],
+                 "skipped": [(os.path.join(HOST_1, "U1", "NVL_GNG"), "no required file")]},
+        HOST_2: {"status": "ok", "elapsed": 0.5, "stats": stats, "info": {DEST: newer}, "shmoo": [], "skipped": []},
+        "//h3/Results": {"status": "timeout", "elapsed": 600.0},
+    }
+    return build_work_plan({DEST: newer}, host_reports, [HOST_1, HOST_2, "//h3/Results"], "/d")
+
+
+def test_plan_picks_the_newest_folder_and_records_the_loser():
+    plan = _plan()
+
+    assert [(item.source_folder, item.latest_timestamp) for item in plan.timestamp_copies] == [(HOST_2, "2025-07-26T08:00:00")]
+    assert plan.timestamp_copies[0].dest_timestamp_folder == os.path.join(DEST, "2025.07.26_08.00.00")
+    assert [(item.source_folder, item.reason) for item in plan.skipped] == [
+        (HOST_1, "no required file"), (HOST_1, f"superseded by 2025.07.26_08.00.00 from {HOST_2}")]
+    assert [(host.status, host.elapsed, host.dirs_listed) for host in plan.hosts] == \
+        [("ok", 1.235, 12), ("ok", 0.5, 12), ("timeout", 600.0, 0)]
+
+
+def test_saved_plan_loads_back_unchanged(tmp_path):
+    plan = _plan()
+
+    path = plan.save(str(tmp_path / "plans" / "work_plan.json"))
+    loaded = WorkPlan.load(path)
+
+    assert loaded == plan
+    assert loaded.summary() == plan.summary()
+    assert "  skipped     1  superseded" in loaded.summary()
@@ -0,0 +1,275 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from copy_engine import host_key, share_key
+
+# Live overrides written by `python throttle.py set ...` and picked up by running jobs
+DEFAULT_CONTROL_PATH = os.path.join(os.path.expanduser("~"), "filterfx", "throttle.json")
+
+RATE_UNITS = {"": 1, "K": 1024, "KB": 1024, "M": 1024 ** 2, "MB": 1024 ** 2, "G": 1024 ** 3, "GB": 1024 ** 3}
+
+
+def parse_rate(text):
+    """Parse '20MB', '512K' or '1048576' (bytes per second) into an int; 'off', '0' or None mean unlimited."""
+    if text is None or isinstance(text, (int, float)):
+        return int(text) if text else None
+    text = text.strip().upper().replace("/S", "")
+    if text in ("", "OFF", "NONE", "0"):
+        return None
+    number = text.rstrip("KMGB")
+    unit = text[len(number):]
+    if unit not in RATE_UNITS:
+        raise ValueError(f"Unknown rate unit in '{text}'")
+    return int(float(number) * RATE_UNITS[unit])
+
+
+class TokenBucket:
+    """Bytes-per-second limiter with a one-second burst; a rate of None lets everything through.
+
+    A block larger than the burst is let through once the bucket is full and leaves it in
+    debt, which delays the next blocks accordingly. Waits are taken in short slices so a
+    rate changed by set_rate (e.g. a live override) applies to callers already waiting.
+    """
+
+    def __init__(self, rate=None, max_slice=0.5):
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.tokens = float(rate or 0)
+        self.updated = time.monotonic()
+        self.max_slice = max_slice
+
+    def _refill(self, now):
+        if self.rate:
+            self.tokens = min(float(self.rate), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self.tokens = min(self.tokens, float(rate)) if rate else 0.0
+
+    def consume(self, nbytes, cancel_event=None):
+        """Take nbytes, sleeping until the bucket allows it; return the seconds slept."""
+        slept = 0.0
+        while True:
+            with self.lock:
+                if not self.rate:
+                    return slept
+                self._refill(time.monotonic())
+                needed = min(float(nbytes), float(self.rate))
+                if self.tokens >= needed:
+                    self.tokens -= nbytes
+                    return slept
+                wait = min((needed - self.tokens) / self.rate, self.max_slice)
+            if cancel_event is not None:
+                if cancel_event.wait(wait):
+                    raise TimeoutError("Copy cancelled while throttled")
+            else:
+                time.sleep(wait)
+            slept += wait
+
+
+class Governor:
+    """Bandwidth and open-file limits for the copy phase, shared by every copy of the process.
+
+    Each source host and each destination share gets its own token bucket. Rates come from
+    the defaults, then per-host/per-share entries (set from profiles), and finally from the
+    live control file, which is re-read every poll_interval seconds while the job runs.
+    Profiles that share a host or share also share its bucket; when they set different
+    rates for it, the lower one applies and a warning says so.
+    """
+
+    def __init__(self, source_host_rate=None, dest_rate=None, max_open_files=None, control_path=None,
+                 poll_interval=5.0):
+        self.base = {"source_host_bytes_per_sec": source_host_rate, "dest_bytes_per_sec": dest_rate,
+                     "max_open_files": max_open_files, "hosts": {}, "dests": {}}
+        self.live = {}
+        self.control_path = control_path
+        self.control_mtime = None
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.rate_owners = {}  # {(group, key): [profile names that set the base rate]}
+        self.open_condition = threading.Condition()
+        self.open_count = 0
+        self.max_open_files = max_open_files
+        self.throttled_seconds = 0.0
+        self.stop_event = threading.Event()
+        self.watcher = None
+
+    def _setting(self, name, key=None):
+        group = "hosts" if name == "source_host_bytes_per_sec" else "dests"
+        for layer in (self.live, self.base):
+            if key is not None and key in layer.get(group, {}):
+                return parse_rate(layer[group][key])
+            if name in layer:
+                return parse_rate(layer[name])
+        return None
+
+    def _refresh(self):
+        with self.lock:
+            for (kind, key), bucket in self.buckets.items():
+                bucket.set_rate(self._setting(kind, key))
+        limit = self.live.get("max_open_files", self.base["max_open_files"])
+        with self.open_condition:
+            self.max_open_files = int(limit) if limit else None
+            self.open_condition.notify_all()
+
+    def _set_base_rate(self, group, key, rate, owner):
+        # One bucket per host or share, because that is the link being protected. Two
+        # profiles asking for different rates on the same one cannot both get theirs,
+        # so the lower rate is kept and the conflict is logged instead of silently
+        # letting the last profile win
+        owners = self.rate_owners.setdefault((group, key), [])
+        if key in self.base[group] and parse_rate(rate) != parse_rate(self.base[group][key]):
+            current = self.base[group][key]
+            kept = min((value for value in (rate, current) if parse_rate(value)), key=parse_rate, default=None)
+            text = lambda value: value if parse_rate(value) else "unlimited"
+            logging.warning(f"Throttle for '{key}' is {text(rate)} in {owner or 'one profile'} but {text(current)} in "
+                            f"{', '.join(owners) or 'another profile'}; they share one limit, keeping {text(kept)}")
+            rate = kept
+        if owner and owner not in owners:
+            owners.append(owner)
+        self.base[group][key] = rate
+        self._refresh()
+
+    def set_source_host_rate(self, source_path, rate, owner=None):
+        """Set the base rate of the source host of source_path (owner names the profile, for conflict warnings)."""
+        self._set_base_rate("hosts", host_key(source_path), rate, owner)
+
+    def set_dest_rate(self, dest_path, rate, owner=None):
+        """Set the base rate of the destination share of dest_path (owner names the profile, for conflict warnings)."""
+        self._set_base_rate("dests", share_key(dest_path), rate, owner)
+
+    def _bucket(self, kind, key):
+        with self.lock:
+            if (kind, key) not in self.buckets:
+                self.buckets[(kind, key)] = TokenBucket(self._setting(kind, key))
+            return self.buckets[(kind, key)]
+
+    def throttle(self, src, dst, nbytes, cancel_event=None):
+        """Wait until both the source host and the destination share allow nbytes more."""
+        slept = self._bucket("source_host_bytes_per_sec", host_key(src)).consume(nbytes, cancel_event)
+        slept += self._bucket("dest_bytes_per_sec", share_key(dst)).consume(nbytes, cancel_event)
+        if slept:
+            with self.lock:
+                self.throttled_seconds += slept
+
+    @contextmanager
+    def open_files(self, count=2):
+        """Hold count open-file slots (a copy has its source and destination open) while in the block."""
+        with self.open_condition:
+            # A request larger than the cap still runs, alone
+            while self.max_open_files and self.open_count and self.open_count + count > self.max_open_files:
+                self.open_condition.wait()
+            self.open_count += count
+        try:
+            yield
+        finally:
+            with self.open_condition:
+                self.open_count -= count
+                self.open_condition.notify_all()
+
+    def poll_control_file(self):
+        """Reload the live overrides if the control file changed; return True when they did."""
+        if not self.control_path:
+            return False
+        try:
+            mtime = os.path.getmtime(self.control_path)
+        except OSError:
+            mtime = None
+        if mtime == self.control_mtime:
+            return False
+        self.control_mtime = mtime
+        live = {}
+        if mtime is not None:
+            try:
+                with open(self.control_path, encoding="utf-8") as f:
+                    live = json.load(f)
+            except ValueError as e:
+                logging.warning(f"Ignoring unreadable throttle control file '{self.control_path}': {str(e)}")
+                return False
+        self.live = live
+        self._refresh()
+        logging.info(f"Throttle settings {'updated from' if live else 'reset, no overrides in'} '{self.control_path}': {json.dumps(live)}")
+        return True
+
+    def start(self):
+        """Read the control file now and keep watching it on a daemon thread."""
+        self.poll_control_file()
+
+        def watch():
+            while not self.stop_event.wait(self.poll_interval):
+                self.poll_control_file()
+
+        self.watcher = threading.Thread(target=watch, name="throttle-control", daemon=True)
+        self.watcher.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.throttled_seconds:
+            logging.info(f"Throttle: copies waited {self.throttled_seconds:.1f} s in total for bandwidth")
+
+
+def read_control_file(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_control_file(path, data):
+    """Replace the control file atomically so a running job never reads half of it."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(temporary, path)
+
+
+def main(argv=None):
+    """Show or change the throttle of running filterfx jobs from the command line."""
+    parser = argparse.ArgumentParser(description="Adjust the copy throttle of running filterfx jobs.")
+    parser.add_argument("--control", default=DEFAULT_CONTROL_PATH, help="Control file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("show", help="Print the current overrides")
+    commands.add_parser("clear", help="Remove every override; jobs go back to their configured limits")
+    set_parser = commands.add_parser("set", help="Change overrides, e.g. set --host-rate 20MB --open-files 32")
+    set_parser.add_argument("--host-rate", help="Bytes/s per source host for every host ('off' for unlimited)")
+    set_parser.add_argument("--dest-rate", help="Bytes/s per destination share ('off' for unlimited)")
+    set_parser.add_argument("--open-files", type=int, help="Cap on files open at once (0 for unlimited)")
+    set_parser.add_argument("--host", action="append", default=[], metavar="HOST=RATE",
+                            help="Bytes/s for one source host, e.g. //pg07tcmv0021=5MB")
+    set_parser.add_argument("--dest", action="append", default=[], metavar="SHARE=RATE",
+                            help="Bytes/s for one destination share, e.g. U:=50MB")
+    args = parser.parse_args(argv)
+
+    if args.command == "clear":
+        write_control_file(args.control, {})
+    elif args.command == "set":
+        data = read_control_file(args.control)
+        if args.host_rate is not None:
+            data["source_host_bytes_per_sec"] = parse_rate(args.host_rate)
+        if args.dest_rate is not None:
+            data["dest_bytes_per_sec"] = parse_rate(args.dest_rate)
+        if args.open_files is not None:
+            data["max_open_files"] = args.open_files or None
+        for group, pairs, normalize in (("hosts", args.host, host_key), ("dests", args.dest, share_key)):
+            for pair in pairs:
+                key, _, rate = pair.partition("=")
+                data.setdefault(group, {})[normalize(key)] = parse_rate(rate)
+        write_control_file(args.control, data)
+    print(json.dumps(read_control_file(args.control), indent=1))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
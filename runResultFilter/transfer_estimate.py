@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import logging
+import statistics
+from incremental_sync import build_manifest, diff_manifests
+
+# Throughput of this many recent runs is used for the time estimate
+HISTORY_RUNS = 20
+
+
+def new_transfer_estimate():
+    """Return an empty estimate dict filled in by estimate_work_plan."""
+    return {"files": 0, "bytes": 0, "files_current": 0, "bytes_current": 0, "files_filtered": 0, "bytes_filtered": 0,
+            "by_host": {}, "by_unit": {}, "largest": []}
+
+
+def _add(totals, key, files, size):
+    entry = totals.setdefault(key, [0, 0])
+    entry[0] += files
+    entry[1] += size
+
+
+def estimate_folder(source, dest, incremental_sync=True, copy_filter=None):
+    """Return (files, bytes, files_current, bytes_current) a copy of source to dest would move.
+
+    With incremental_sync, files already current at dest are not counted as moved, the
+    same way sync_folder would skip them; otherwise the whole source folder is counted.
+    Files rejected by copy_filter are not counted at all.
+    """
+    source_manifest = build_manifest(source, copy_filter)
+    if incremental_sync and os.path.isdir(dest):
+        to_copy, unchanged, _ = diff_manifests(source_manifest, build_manifest(dest))
+    else:
+        to_copy, unchanged = list(source_manifest), []
+    return (len(to_copy), sum(source_manifest[path][0] for path in to_copy),
+            len(unchanged), sum(source_manifest[path][0] for path in unchanged))
+
+
+def estimate_work_plan(plan, incremental_sync=True, largest_count=10, copy_filter=None):
+    """List the source folders of a WorkPlan (no data is read) and total what executing it would move.
+
+    Totals are broken down by source folder ('by_host') and by unit folder ('by_unit'),
+    and the largest single folders are kept in 'largest' as (bytes, files, source, dest).
+    copy_filter applies to the timestamp folders; what it leaves out is totalled in
+    'files_filtered' and 'bytes_filtered'.
+    """
+    estimate = new_transfer_estimate()
+    items = [(item.source_folder, item.latest_folder, item.dest_timestamp_folder, item.dest_folder_path, incremental_sync,
+              copy_filter) for item in plan.timestamp_copies]
+    # Shmoo folders are always synced file by file, unfiltered
+    items += [(item.source_folder, item.shmoo_source, item.dest_shmoo_path, item.dest_shmoo_path, True, None)
+              for item in plan.shmoo_syncs]
+    for source_folder, source, dest, dest_folder_path, incremental, folder_filter in items:
+        try:
+            files, size, files_current, bytes_current = estimate_folder(source, dest, incremental, folder_filter)
+        except OSError as e:
+            logging.warning(f"Could not list '{source}' for the estimate: {str(e)}")
+            continue
+        unit = os.path.relpath(dest_folder_path, plan.destination_folder).replace("\\", "/").split("/")[0]
+        estimate["files"] += files
+        estimate["bytes"] += size
+        estimate["files_current"] += files_current
+        estimate["bytes_current"] += bytes_current
+        _add(estimate["by_host"], source_folder, files, size)
+        _add(estimate["by_unit"], unit, files, size)
+        if size:
+            estimate["largest"].append((size, files, source, dest))
+    estimate["largest"] = sorted(estimate["largest"], reverse=True)[:largest_count]
+    if copy_filter is not None:
+        estimate["files_filtered"], estimate["bytes_filtered"] = copy_filter.files_filtered, copy_filter.bytes_filtered
+    return estimate
+
+
+class ThroughputHistory:
+    """JSON-lines record of how many bytes past copy phases moved and how long they took."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def record(self, profile_name, bytes_copied, seconds):
+        if not self.path or seconds <= 0:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"profile": profile_name, "at": time.time(), "bytes": bytes_copied,
+                                "seconds": round(seconds, 3)}) + "\n")
+
+    def bytes_per_second(self, profile_name=None):
+        """Return the median throughput of the recent runs of a profile (all profiles if it has none), or None."""
+        if not self.path or not os.path.exists(self.path):
+            return None
+        records = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        # Runs that barely copied anything say more about latency than throughput
+        records = [record for record in records if record["bytes"] >= 1024 * 1024 and record["seconds"] > 0]
+        own = [record for record in records if record["profile"] == profile_name]
+        records = (own or records)[-HISTORY_RUNS:]
+        if not records:
+            return None
+        return statistics.median(record["bytes"] / record["seconds"] for record in records)
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024.0
+
+
+def format_estimate(estimate, bytes_per_second=None, top=5):
+    """Return a printable report of an estimate, with the time it should take at bytes_per_second."""
+    lines = [f"  {estimate['files']} files ({format_size(estimate['bytes'])}) to transfer, "
+             f"{estimate['files_current']} files ({format_size(estimate['bytes_current'])}) already current"]
+    if estimate["files_filtered"]:
+        lines.append(f"  {estimate['files_filtered']} files ({format_size(estimate['bytes_filtered'])}) left out by the copy filter")
+    if bytes_per_second:
+        lines.append(f"  estimated copy time {estimate['bytes'] / bytes_per_second / 60:.1f} min "
+                     f"at {format_size(bytes_per_second)}/s (median of recent runs)")
+    else:
+        lines.append("  no throughput history yet, copy time cannot be estimated")
+    for title, totals in (("source folders", estimate["by_host"]), ("units", estimate["by_unit"])):
+        ranked = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        lines.append(f"  top {title} by bytes:")
+        for key, (files, size) in ranked:
+            share = 100.0 * size / estimate["bytes"] if estimate["bytes"] else 0.0
+            lines.append(f"    {format_size(size):>10} {share:5.1f}%  {files:>7} files  {key}")
+    if estimate["largest"]:
+        lines.append("  largest folders:")
+        for size, files, source, _ in estimate["largest"][:top]:
+            lines.append(f"    {format_size(size):>10}  {files:>7} files  {source}")
+    return "\n".join(lines)
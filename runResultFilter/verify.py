@@ -0,0 +1,173 @@
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import tarfile
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from incremental_sync import build_manifest, file_digest, file_is_current
+from packed_transfer import INDEX_NAME, find_archive, read_index
+
+VERIFY_MODES = ("fast", "strict")
+
+HASH_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path        TEXT PRIMARY KEY,   -- source file on the tester
+    size        INTEGER NOT NULL,
+    mtime       REAL NOT NULL,
+    sha1        TEXT NOT NULL,
+    hashed_at   REAL NOT NULL
+);
+"""
+
+
+class HashCache:
+    """SQLite cache of source file hashes, keyed by path and valid while size and mtime are unchanged.
+
+    Strict verification hashes every copied file on both sides; with the cache, a source
+    file that was already hashed (in this run or an earlier one) is not read again.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.executescript(HASH_CACHE_SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def digest(self, path, size, mtime):
+        """Return the SHA-1 of a source file, from the cache if its size and mtime still match."""
+        with self.lock:
+            row = self.conn.execute("SELECT size, mtime, sha1 FROM file_hashes WHERE path = ?", (path,)).fetchone()
+        if row is not None and (row[0], row[1]) == (size, mtime):
+            self.hits += 1
+            return row[2]
+        self.misses += 1
+        sha1 = file_digest(path)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO file_hashes (path, size, mtime, sha1, hashed_at) VALUES (?, ?, ?, ?, ?)",
+                              (path, size, mtime, sha1, time.time()))
+            self.conn.commit()
+        return sha1
+
+
+def _compare_manifests(source_manifest, dest_manifest):
+    """Return (problems, matching relative paths) for a copy compared by file list, size and mtime."""
+    problems = []
+    matching = []
+    for relative_path, source_entry in sorted(source_manifest.items()):
+        dest_entry = dest_manifest.get(relative_path)
+        if dest_entry is None:
+            problems.append(f"missing {relative_path}")
+        elif dest_entry[0] != source_entry[0]:
+            problems.append(f"size {relative_path}: {dest_entry[0]} bytes, source has {source_entry[0]}")
+        elif not file_is_current(source_entry, dest_entry):
+            problems.append(f"mtime {relative_path}: {time.ctime(dest_entry[1])}, source has {time.ctime(source_entry[1])}")
+        else:
+            matching.append(relative_path)
+    problems += [f"extra {relative_path}" for relative_path in sorted(set(dest_manifest) - set(source_manifest))]
+    return problems, matching
+
+
+class Verifier:
+    """Checks that a copied timestamp folder matches its source.
+
+    "fast" compares the file lists, sizes and mtimes (one listing of each side). "strict"
+    also compares the SHA-1 of every file, hashing on a thread pool of `workers`; source
+    hashes come from the HashCache when one is given. Packed folders are checked against
+    their index, and in strict mode by streaming the archive once.
+    """
+
+    def __init__(self, mode="fast", workers=4, hash_cache=None):
+        if mode not in VERIFY_MODES:
+            raise ValueError(f"Unknown verify mode '{mode}'; use one of {', '.join(VERIFY_MODES)}")
+        self.mode = mode
+        self.hash_cache = hash_cache
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="verify") if mode == "strict" else None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def _source_digest(self, path, size, mtime):
+        return self.hash_cache.digest(path, size, mtime) if self.hash_cache is not None else file_digest(path)
+
+    def verify_folder(self, source, dest, copy_filter=None):
+        """Compare dest with source (the files copy_filter allows, if any); return a list of problems, empty if it matches."""
+        source_manifest = build_manifest(source, copy_filter)
+        if find_archive(dest) is not None:
+            return self._verify_packed(source, dest, source_manifest)
+        problems, matching = _compare_manifests(source_manifest, build_manifest(dest))
+        if self.mode == "strict":
+            def compare(relative_path):
+                source_digest = self._source_digest(os.path.join(source, relative_path), *source_manifest[relative_path])
+                return None if file_digest(os.path.join(dest, relative_path)) == source_digest else f"content {relative_path}"
+            problems += [problem for problem in self.pool.map(compare, matching) if problem]
+        return problems
+
+    def _verify_packed(self, source, dest, source_manifest):
+        index = read_index(dest)
+        packed_manifest = {member["name"].replace("/", os.sep): (member["size"], member["mtime"]) for member in index["members"]}
+        problems, matching = _compare_manifests(source_manifest, packed_manifest)
+        archive_path = os.path.join(dest, index["archive"])
+        extra = sorted(set(os.listdir(dest)) - {index["archive"], INDEX_NAME})
+        problems += [f"extra {name}" for name in extra]
+        if os.path.getsize(archive_path) != index["archive_bytes"]:
+            problems.append(f"size {index['archive']}: {os.path.getsize(archive_path)} bytes, index has {index['archive_bytes']}")
+            return problems
+        if self.mode == "strict":
+            source_digests = {relative_path: self.pool.submit(self._source_digest, os.path.join(source, relative_path),
+                                                              *source_manifest[relative_path])
+                              for relative_path in matching}
+            with tarfile.open(archive_path, "r|*") as tar:
+                for member in tar:
+                    relative_path = member.name.replace("/", os.sep)
+                    if not member.isfile() or relative_path not in source_digests:
+                        continue
+                    digest = hashlib.sha1()
+                    f = tar.extractfile(member)
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(block)
+                    if digest.hexdigest() != source_digests[relative_path].result():
+                        problems.append(f"content {relative_path}")
+        return problems
+
+
+def main(argv=None):
+    """Verify one copied timestamp folder against its source from the command line."""
+    parser = argparse.ArgumentParser(description="Check that a copied timestamp folder matches its source.")
+    parser.add_argument("source", help="Timestamp folder on the tester")
+    parser.add_argument("dest", help="Copied timestamp folder (plain or packed)")
+    parser.add_argument("--strict", action="store_true", help="Also compare file contents by SHA-1")
+    parser.add_argument("--workers", type=int, default=4, help="Hashing threads in strict mode")
+    parser.add_argument("--hash-cache", default=os.path.expanduser("~/filterfx/hash_cache.sqlite"),
+                        help="Cache of source hashes (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    hash_cache = HashCache(args.hash_cache) if args.strict else None
+    verifier = Verifier("strict" if args.strict else "fast", args.workers, hash_cache)
+    try:
+        problems = verifier.verify_folder(args.source, args.dest)
+    finally:
+        verifier.close()
+        if hash_cache is not None:
+            hash_cache.close()
+    for problem in problems:
+        print(problem)
+    print(f"'{args.dest}': {'OK' if not problems else f'{len(problems)} problems'}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import os
+import time
+import logging
+import threading
+from scan_walker import iter_scan_targets
+from host_scan import get_latest_timestamp_folder
+from dir_cache import DirCache, stat_path
+
+
+class HostWatcher:
+    """Detects which unit folders of one source folder changed, from directory mtimes only.
+
+    A poll lists the same levels as the scan walk (source folder, units, Shmoo) and takes
+    each test folder's mtime from its unit's listing (a DirCache per poll); a new timestamp
+    folder changes its test folder's mtime. Test folders
+    still waiting for their workbook (set with set_pending) also have their newest timestamp
+    folder stat'ed, since a file landing in it does not touch the test folder.
+    Unreachable testers are polled with exponential backoff. A poll that overran its
+    timeout may still be running in its thread when set_pending is called, so the
+    pending set and the stored fingerprints are only touched under the lock.
+    """
+
+    def __init__(self, source_folder, scan_rules, poll_interval=120, max_backoff=1800):
+        self.source_folder = source_folder
+        self.scan_rules = scan_rules
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.fingerprints = None  # {unit: {test_folder_path: mtimes}}
+        self.pending = frozenset()
+        self.failures = 0
+        self.next_poll = 0.0
+        self.needs_full_scan = False  # set after a failure; the next good poll reports every unit
+        self.lock = threading.Lock()
+
+    def _unit_of(self, root):
+        return os.path.normpath(os.path.relpath(root, self.source_folder)).split(os.sep)[0]
+
+    def _mtimes(self, dir_full_path, pending, dir_cache=None):
+        mtimes = (stat_path(dir_full_path, dir_cache).st_mtime,)
+        if dir_full_path in pending:
+            latest_folder, _ = get_latest_timestamp_folder(dir_full_path, dir_cache)
+            mtimes += (stat_path(latest_folder, dir_cache).st_mtime,) if latest_folder else (None,)
+        return mtimes
+
+    def _fingerprint(self):
+        fingerprints = {}
+        dir_cache = DirCache()
+        with self.lock:
+            pending = self.pending
+        for kind, root, dir_name, dir_full_path in iter_scan_targets(self.source_folder, self.scan_rules, dir_cache=dir_cache):
+            fingerprints.setdefault(self._unit_of(root), {})[dir_full_path] = self._mtimes(dir_full_path, pending, dir_cache)
+        return fingerprints
+
+    def set_pending(self, test_folder_paths):
+        """Replace the pending test folders, refreshing their stored fingerprints so the change is not reported."""
+        pending = frozenset(test_folder_paths)
+        with self.lock:
+            changed = self.pending.symmetric_difference(pending)
+            self.pending = pending
+            fingerprints = self.fingerprints or {}
+            stale = [(unit, path) for unit, unit_fingerprints in fingerprints.items()
+                     for path in changed.intersection(unit_fingerprints)]
+        refreshed = {}
+        for unit, path in stale:
+            try:
+                refreshed[(unit, path)] = self._mtimes(path, pending)
+            except OSError:
+                pass  # left as is; the next poll reports the unit
+        with self.lock:
+            # A poll that finished meanwhile replaced them; at worst the next poll reports the unit once more
+            if self.fingerprints is fingerprints:
+                for (unit, path), mtimes in refreshed.items():
+                    fingerprints[unit][path] = mtimes
+
+    def due(self, now=None):
+        return (now or time.time()) >= self.next_poll
+
+    def record_failure(self, reason):
+        """Push the next poll out exponentially after a failed poll or scan."""
+        self.failures += 1
+        self.needs_full_scan = True
+        delay = min(self.poll_interval * 2 ** self.failures, self.max_backoff)
+        self.next_poll = time.time() + delay
+        logging.warning(f"Source folder '{self.source_folder}' unreachable ({reason}); next try in {delay:.0f} s")
+
+    def poll(self):
+        """Return the set of unit folders (relative to the source folder) that changed since the last poll.
+
+        The first poll only records the baseline and returns an empty set; the first good poll
+        after a failure returns every unit. Returns None if the source folder could not be
+        read (the backoff is already applied).
+        """
+        if not os.path.isdir(self.source_folder):
+            self.record_failure("not accessible")
+            return None
+        try:
+            fingerprints = self._fingerprint()
+        except OSError as e:
+            self.record_failure(str(e))
+            return None
+        if self.failures:
+            logging.info(f"Source folder '{self.source_folder}' reachable again after {self.failures} failed polls")
+        self.failures = 0
+        self.next_poll = time.time() + self.poll_interval
+        with self.lock:
+            previous, self.fingerprints = self.fingerprints, fingerprints
+        if self.needs_full_scan:
+            self.needs_full_scan = False
+            return set(fingerprints)
+        if previous is None:
+            return set()
+        return {unit for unit in set(previous) | set(fingerprints) if previous.get(unit) != fingerprints.get(unit)}
@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import time
+from dataclasses import dataclass, field, asdict
+
+
+@dataclass
+class TimestampCopy:
+    """Latest timestamp folder selected for one destination HotVmin/GNG folder."""
+    dest_folder_path: str
+    source_folder: str
+    latest_folder: str
+    latest_timestamp: str      # ISO format, e.g. '2025-07-25T19:28:10'
+
+    @property
+    def dest_timestamp_folder(self):
+        return os.path.join(self.dest_folder_path, os.path.basename(self.latest_folder))
+
+
+@dataclass
+class ShmooSync:
+    """Shmoo folder on a tester to be synced into the destination."""
+    source_folder: str
+    shmoo_source: str
+    dest_shmoo_path: str
+
+
+@dataclass
+class SkippedFolder:
+    """Folder seen during the scan that will not be copied, with the reason why."""
+    source_folder: str
+    path: str
+    reason: str
+
+
+@dataclass
+class HostSummary:
+    source_folder: str
+    status: str
+    elapsed: float
+    dirs_listed: int = 0
+
+
+@dataclass
+class WorkPlan:
+    """Everything a filter run will do, built from one scan of every host."""
+    destination_folder: str
+    created_at: str = field(default_factory=lambda: time.strftime("%Y-%m-%dT%H:%M:%S"))
+    timestamp_copies: list = field(default_factory=list)
+    shmoo_syncs: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    hosts: list = field(default_factory=list)
+
+    def save(self, path):
+        """Write the plan as JSON so it can be inspected after the run."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=1)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            destination_folder=data["destination_folder"],
+            created_at=data["created_at"],
+            timestamp_copies=[TimestampCopy(**item) for item in data["timestamp_copies"]],
+            shmoo_syncs=[ShmooSync(**item) for item in data["shmoo_syncs"]],
+            skipped=[SkippedFolder(**item) for item in data["skipped"]],
+            hosts=[HostSummary(**item) for item in data["hosts"]],
+        )
+
+    def summary(self):
+        reasons = {}
+        for item in self.skipped:
+            key = item.reason.split(" by ")[0]
+            reasons[key] = reasons.get(key, 0) + 1
+        lines = [f"Work plan for '{self.destination_folder}' created {self.created_at}",
+                 f"  {len(self.timestamp_copies)} timestamp folders to copy, {len(self.shmoo_syncs)} Shmoo folders to sync"]
+        for host in self.hosts:
+            lines.append(f"  {host.source_folder}: {host.status} in {host.elapsed:.1f} s ({host.dirs_listed} folders listed)")
+        for reason, count in sorted(reasons.items()):
+            lines.append(f"  skipped {count:>5}  {reason}")
+        return "\n".join(lines)
+
+
+def build_work_plan(latest_timestamp_info, host_reports, source_folders, destination_folder):
+    """Turn merged scan results and per-host reports into a WorkPlan.
+
+    Test folders that lost to a newer timestamp on another host are recorded as skipped.
+    """
+    plan = WorkPlan(destination_folder=destination_folder)
+    for dest_folder_path, (latest_folder, latest_timestamp, source_folder) in latest_timestamp_info.items():
+        plan.timestamp_copies.append(TimestampCopy(dest_folder_path, source_folder, latest_folder,
+                                                   latest_timestamp.isoformat()))
+    for source_folder in dict.fromkeys(source_folders):
+        report = host_reports.get(source_folder)
+        if report is None:
+            continue
+        stats = report.get("stats") or {}
+        plan.hosts.append(HostSummary(source_folder, report["status"], round(report["elapsed"], 3),
+                                      stats.get("dirs_listed", 0)))
+        if report["status"] != "ok":
+            continue
+        for shmoo_source, dest_shmoo_path in report["shmoo"]:
+            plan.shmoo_syncs.append(ShmooSync(source_folder, shmoo_source, dest_shmoo_path))
+        for path, reason in report["skipped"]:
+            plan.skipped.append(SkippedFolder(source_folder, path, reason))
+        for dest_folder_path, (latest_folder, latest_timestamp, _) in sorted(report["info"].items()):
+            selected = latest_timestamp_info.get(dest_folder_path)
+            if selected is not None and selected[0] != latest_folder:
+                plan.skipped.append(SkippedFolder(
+                    source_folder, latest_folder,
+                    f"superseded by {os.path.basename(selected[0])} from {selected[2]}"))
+    return plan
+
+
+def main(argv=None):
+    """Print the summary of a saved work plan, optionally with every item."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: python work_plan.py <plan.json> [--items]")
+        return 2
+    plan = WorkPlan.load(argv[0])
+    print(plan.summary())
+    if "--items" in argv:
+        for item in plan.timestamp_copies:
+            print(f"COPY   {item.latest_folder} -> {item.dest_timestamp_folder}")
+        for item in plan.shmoo_syncs:
+            print(f"SHMOO  {item.shmoo_source} -> {item.dest_shmoo_path}")
+        for item in plan.skipped:
+            print(f"SKIP   {item.path} ({item.reason})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())